@@ -0,0 +1,99 @@
+#!/usr/bin/env python2
+
+# Compares parsing a directory of files with a BatchParser and no cache, a
+# first run that also fills a tree cache, a rerun in which no file changed,
+# with and without loading every tree from the cache, and a rerun in which a
+# tenth of the files changed. Then parses the files along with three copies
+# of each, which are parsed once.
+#
+# usage: batch.py [files] [methods] [repeat]
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import plyj.parser
+from plyj.batch import BatchParser
+
+from traversal import best_of, generate_source
+
+
+def write(path, text, mtime):
+    with open(path, 'w') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+
+def main(argv):
+    files = int(argv[1]) if len(argv) > 1 else 200
+    methods = int(argv[2]) if len(argv) > 2 else 20
+    repeat = int(argv[3]) if len(argv) > 3 else 3
+
+    parser = plyj.parser.Parser()
+    directory = tempfile.mkdtemp()
+    try:
+        source = generate_source(methods)
+        paths = []
+        for i in range(files):
+            path = os.path.join(directory, 'C{0}.java'.format(i))
+            write(path, source.replace('class Generated', 'class C{0}'.format(i)), 1000000000)
+            paths.append(path)
+        cache = os.path.join(directory, 'trees.db')
+
+        def cold():
+            if os.path.exists(cache):
+                os.remove(cache)
+            batch = BatchParser(parser, cache)
+            batch.parse_files(paths)
+            batch.cache.close()
+
+        def rerun():
+            batch = BatchParser(parser, cache)
+            batch.parse_files(paths)
+            batch.cache.close()
+            return batch.stats
+
+        def loaded():
+            batch = BatchParser(parser, cache)
+            trees = [result.tree for result in batch.parse_files(paths)]
+            batch.cache.close()
+            return trees
+
+        def changed():
+            for i, path in enumerate(paths[::10]):
+                write(path, source.replace('class Generated', 'class D{0}'.format(i)), time.time())
+            return rerun()
+
+        copies = []
+        for i in range(files * 3):
+            path = os.path.join(directory, 'Copy{0}.java'.format(i))
+            shutil.copyfile(paths[i % files], path)
+            copies.append(path)
+
+        def duplicated():
+            batch = BatchParser(parser)
+            batch.parse_files(paths + copies)
+            return batch.stats
+
+        full, _ = best_of(repeat, lambda: BatchParser(parser).parse_files(paths))
+        first, _ = best_of(repeat, cold)
+        unchanged, stats = best_of(repeat, rerun)
+        load, _ = best_of(repeat, loaded)
+        tenth, _ = best_of(1, changed)
+        four, four_stats = best_of(repeat, duplicated)
+        print('{0} files of {1} bytes'.format(files, len(source)))
+        print('parse                {0:8.4f}s'.format(full))
+        print('parse and cache      {0:8.4f}s  ({1:.0f} KB cache)'.format(
+            first, os.path.getsize(cache) / 1024.0))
+        print('no-change rerun      {0:8.4f}s  ({1:.0f}x faster, {2})'.format(unchanged, full / unchanged, stats))
+        print('  and every tree     {0:8.4f}s  ({1:.0f}x faster)'.format(load, full / load))
+        print('10% changed rerun    {0:8.4f}s  ({1:.1f}x faster)'.format(tenth, full / tenth))
+        print('with 3 copies each   {0:8.4f}s  ({1:.1f}x faster than parsing all, {2} duplicates, {3} KB)'.format(
+            four, 4 * full / four, four_stats.duplicates, four_stats.duplicate_bytes // 1024))
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python2
+
+# Measures what a parse with a token and time budget costs over one without
+# and how long a pathological file, a huge array initializer, takes to parse
+# in full and to be abandoned for going over a time budget.
+#
+# usage: budget.py [methods] [elements] [seconds] [repeat]
+
+import sys
+
+import plyj.parser
+from plyj.diagnostics import BudgetExceeded
+
+from traversal import best_of, generate_source
+
+
+def abandoned(parser, source, seconds):
+    try:
+        parser.parse_string(source, max_seconds=seconds)
+    except BudgetExceeded as e:
+        return e.reason
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    elements = int(argv[2]) if len(argv) > 2 else 20000
+    seconds = float(argv[3]) if len(argv) > 3 else 0.5
+    repeat = int(argv[4]) if len(argv) > 4 else 3
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+    huge = 'class Table { int[] values = {' + ', '.join(str(i) for i in range(elements)) + '}; }'
+
+    plain, _ = best_of(repeat, lambda: parser.parse_string(source))
+    budgeted, _ = best_of(repeat, lambda: parser.parse_string(source, max_tokens=10 ** 9, max_seconds=3600))
+    full, _ = best_of(1, lambda: parser.parse_string(huge))
+    cut, reason = best_of(1, lambda: abandoned(parser, huge, seconds))
+    after, _ = best_of(repeat, lambda: parser.parse_string(source))
+    print('parse                 {0:8.4f}s'.format(plain))
+    print('with a budget         {0:8.4f}s  ({1:+.1f}%)'.format(budgeted, 100 * (budgeted / plain - 1)))
+    print('huge initializer      {0:8.4f}s'.format(full))
+    print('  abandoned           {0:8.4f}s  ({1})'.format(cut, reason))
+    print('parse after abandon   {0:8.4f}s'.format(after))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,208 @@
+#!/usr/bin/env python2
+
+# Generates a synthetic Java corpus for the benchmark suite. The same seed
+# gives the same files under every Python version, since only random() is
+# used, whose sequence for a seed has not changed. Files mix the constructs
+# real code is made of: generic classes, interfaces and enums, annotations,
+# fields with initializers, nested and anonymous classes, and methods with
+# loops, switches, try blocks and expressions of varying depth.
+#
+# usage: corpus.py directory [files] [methods] [seed]
+
+import os
+import random
+import sys
+
+_TYPES = ['int', 'long', 'double', 'boolean', 'String', 'Object', 'List<String>', 'Map<String, Integer>',
+          'int[]', 'byte[]']
+_NAMES = ['count', 'index', 'value', 'result', 'total', 'name', 'items', 'buffer', 'offset', 'limit', 'key',
+          'entry', 'node', 'state', 'size']
+_METHODS = ['get', 'put', 'add', 'remove', 'size', 'apply', 'compute', 'check', 'update', 'find', 'load']
+_OPERATORS = ['+', '-', '*', '/', '%', '&', '|', '^', '<<', '>>']
+_COMPARISONS = ['<', '>', '<=', '>=', '==', '!=']
+_ANNOTATIONS = ['@Override', '@Deprecated', '@SuppressWarnings("unchecked")', '@Nullable',
+                '@Inject', '@Test(timeout = 100)']
+
+
+class Generator(object):
+    """Writes Java source from a seeded random sequence."""
+
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+
+    def below(self, n):
+        return int(self.random.random() * n)
+
+    def chance(self, p):
+        return self.random.random() < p
+
+    def pick(self, seq):
+        return seq[self.below(len(seq))]
+
+    def name(self):
+        return self.pick(_NAMES) + str(self.below(10))
+
+    def expression(self, depth=0):
+        roll = self.below(10)
+        if depth > 2 or roll < 3:
+            return self.pick([self.name(), str(self.below(1000)), '"s{0}"'.format(self.below(100)),
+                              'null', 'true', '{0}.{1}'.format(self.name(), self.name())])
+        if roll < 6:
+            return '{0} {1} {2}'.format(self.expression(depth + 1), self.pick(_OPERATORS),
+                                        self.expression(depth + 1))
+        if roll < 8:
+            arguments = ', '.join(self.expression(depth + 1) for _ in range(self.below(3)))
+            return '{0}.{1}({2})'.format(self.name(), self.pick(_METHODS), arguments)
+        if roll < 9:
+            return '({0}) ? {1} : {2}'.format(self.condition(depth + 1), self.expression(depth + 1),
+                                              self.expression(depth + 1))
+        return 'new {0}[{1}]'.format(self.pick(['int', 'Object', 'String']), self.expression(depth + 1))
+
+    def condition(self, depth=0):
+        condition = '{0} {1} {2}'.format(self.expression(depth + 1), self.pick(_COMPARISONS),
+                                         self.expression(depth + 1))
+        if self.chance(0.3):
+            condition += ' && ' + self.name() + ' != null'
+        return condition
+
+    def statements(self, indent, depth=0):
+        lines = []
+        for _ in range(1 + self.below(4 - depth)):
+            lines.extend(self.statement(indent, depth))
+        return lines
+
+    def statement(self, indent, depth):
+        pad = '    ' * indent
+        roll = self.below(12) if depth < 2 else self.below(6)
+        if roll < 4:
+            return [pad + '{0} {1} = {2};'.format(self.pick(_TYPES), self.name(), self.expression())]
+        if roll < 6:
+            return [pad + '{0} {1}= {2};'.format(self.name(), self.pick(['', '+', '-', '|']), self.expression())]
+        if roll < 7:
+            return [pad + 'if ({0}) {{'.format(self.condition())] + self.statements(indent + 1, depth + 1) + \
+                   [pad + '} else {'] + self.statements(indent + 1, depth + 1) + [pad + '}']
+        if roll < 8:
+            i = self.name()
+            return [pad + 'for (int {0} = 0; {0} < {1}; {0}++) {{'.format(i, self.name())] + \
+                   self.statements(indent + 1, depth + 1) + [pad + '}']
+        if roll < 9:
+            return [pad + 'while ({0}) {{'.format(self.condition())] + self.statements(indent + 1, depth + 1) + \
+                   [pad + '    break;', pad + '}']
+        if roll < 10:
+            lines = [pad + 'switch ({0}) {{'.format(self.name())]
+            for case in range(1 + self.below(4)):
+                lines.append(pad + 'case {0}:'.format(case))
+                lines.extend(self.statements(indent + 1, depth + 1))
+                lines.append(pad + '    break;')
+            return lines + [pad + 'default:', pad + '    break;', pad + '}']
+        if roll < 11:
+            return [pad + 'try {'] + self.statements(indent + 1, depth + 1) + \
+                   [pad + '}} catch ({0} e) {{'.format(self.pick(['IOException', 'RuntimeException'])),
+                    pad + '    throw new IllegalStateException(e);', pad + '} finally {'] + \
+                   self.statements(indent + 1, depth + 1) + [pad + '}']
+        return [pad + '// ' + self.name(),
+                pad + '{0}.{1}({2});'.format(self.name(), self.pick(_METHODS), self.expression())]
+
+    def method(self, index):
+        lines = ['']
+        if self.chance(0.2):
+            lines.append('    /**')
+            lines.append('     * Computes the {0} of {1}.'.format(self.pick(_METHODS), self.name()))
+            lines.append('     */')
+        if self.chance(0.3):
+            lines.append('    ' + self.pick(_ANNOTATIONS))
+        modifiers = self.pick(['public ', 'private ', 'protected ', '', 'public static ', 'final '])
+        parameters = ', '.join('{0} {1}'.format(self.pick(_TYPES), self.name() + str(i))
+                               for i in range(self.below(4)))
+        throws = ' throws IOException' if self.chance(0.2) else ''
+        lines.append('    {0}void method{1}({2}){3} {{'.format(modifiers, index, parameters, throws))
+        lines.extend(self.statements(2))
+        lines.append('    }')
+        return lines
+
+    def type_declaration(self, name, methods):
+        lines = []
+        kind = self.below(10)
+        if kind == 0:
+            lines.append('public interface {0}<T> extends Comparable<T> {{'.format(name))
+            for i in range(methods):
+                lines.append('    {0} method{1}(T value, int {2}) throws Exception;'.format(
+                    self.pick(_TYPES), i, self.name()))
+            lines.append('    int LIMIT = {0};'.format(self.below(100)))
+            lines.append('}')
+            return lines
+        if kind == 1:
+            constants = ', '.join('C{0}({1})'.format(i, self.below(100)) for i in range(2 + self.below(6)))
+            lines.append('public enum {0} {{'.format(name))
+            lines.append('    {0};'.format(constants))
+            lines.append('    private final int code;')
+            lines.append('    {0}(int code) {{ this.code = code; }}'.format(name))
+        else:
+            if self.chance(0.3):
+                lines.append(self.pick(_ANNOTATIONS))
+            lines.append('public class {0}<K extends Comparable<K>, V> extends Base implements Runnable {{'.format(
+                name))
+            for _ in range(1 + self.below(4)):
+                lines.append('    private {0} {1} = {2};'.format(self.pick(_TYPES), self.name(), self.expression()))
+            lines.append('    static final int[] TABLE = {{{0}}};'.format(
+                ', '.join(str(self.below(256)) for _ in range(self.below(20)))))
+        for i in range(methods):
+            lines.extend(self.method(i))
+        if self.chance(0.5):
+            lines.append('')
+            lines.append('    private final Runnable task = new Runnable() {')
+            lines.append('        public void run() {')
+            lines.extend(self.statements(3))
+            lines.append('        }')
+            lines.append('    };')
+        if self.chance(0.3):
+            lines.append('')
+            lines.append('    static class Inner {')
+            lines.extend(self.method(0))
+            lines.append('    }')
+        lines.append('}')
+        return lines
+
+    def compilation_unit(self, index, methods):
+        lines = ['/*', ' * Generated file {0}.'.format(index), ' */',
+                 'package bench.generated.p{0};'.format(index % 10), '']
+        for imported in ['java.io.IOException', 'java.util.List', 'java.util.Map', 'java.util.*']:
+            if self.chance(0.7):
+                lines.append('import {0};'.format(imported))
+        lines.append('')
+        lines.extend(self.type_declaration('Generated{0}'.format(index), methods))
+        return '\n'.join(lines) + '\n'
+
+
+def generate_corpus(files=50, methods=10, seed=1):
+    """Returns a list of (name, source) of files generated from seed."""
+    generator = Generator(seed)
+    return [('Generated{0}.java'.format(i), generator.compilation_unit(i, 1 + generator.below(2 * methods)))
+            for i in range(files)]
+
+
+def load_samples(directory=None):
+    """Returns a list of (name, source) of the checked-in sample files."""
+    if directory is None:
+        directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'samples')
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.java'):
+            with open(os.path.join(directory, name)) as f:
+                samples.append((name, f.read()))
+    return samples
+
+
+def main(argv):
+    directory = argv[1]
+    files = int(argv[2]) if len(argv) > 2 else 50
+    methods = int(argv[3]) if len(argv) > 3 else 10
+    seed = int(argv[4]) if len(argv) > 4 else 1
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    for name, source in generate_corpus(files, methods, seed):
+        with open(os.path.join(directory, name), 'w') as f:
+            f.write(source)
+
+if __name__ == '__main__':
+    main(sys.argv)
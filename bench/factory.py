@@ -0,0 +1,41 @@
+#!/usr/bin/env python2
+
+# Measures what a node factory costs: parsing with the model as is, with
+# the model passed as the factory (actions rebound, same classes) and with
+# a factory that builds every node through an extra function call.
+#
+# usage: factory.py [methods] [repeat]
+
+import sys
+
+import plyj.parser
+import plyj.model as m
+
+from traversal import best_of, generate_source
+
+
+class Delegating(object):
+
+    def __getattr__(self, name):
+        node_class = getattr(m, name)
+
+        def build(*args, **kwargs):
+            return node_class(*args, **kwargs)
+        return build
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    source = generate_source(methods)
+    model, tree = best_of(repeat, lambda: plyj.parser.Parser().parse_string(source))
+    print('model            {0:8.4f}s'.format(model))
+    for label, factory in [('model as factory', m), ('delegating', Delegating())]:
+        parser = plyj.parser.Parser(factory=factory)
+        elapsed, built = best_of(repeat, lambda: parser.parse_string(source))
+        assert built == tree
+        print('{0:16} {1:8.4f}s  ({2:+.1f}%)'.format(label, elapsed, 100 * (elapsed - model) / model))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,31 @@
+#!/usr/bin/env python2
+
+# Compares extracting the package and imports of a big file by a full parse
+# with a header scan, which stops reading at the first type declaration.
+#
+# usage: header.py [methods] [repeat]
+
+import io
+import sys
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    imports = ''.join('import java.util.Class{0};\n'.format(i) for i in range(30))
+    source = generate_source(methods).replace('\n\n', '\n\n' + imports, 1)
+
+    full, tree = best_of(repeat, lambda: parser.parse_file(io.StringIO(source)))
+    header, header_tree = best_of(repeat, lambda: parser.parse_header_file(io.StringIO(source)))
+    assert header_tree.import_declarations == tree.import_declarations
+    print('parse_file         {0:8.4f}s'.format(full))
+    print('parse_header_file  {0:8.4f}s  ({1:.0f}x faster)'.format(header, full / header))
+
+if __name__ == '__main__':
+    main(sys.argv)
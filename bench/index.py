@@ -0,0 +1,35 @@
+#!/usr/bin/env python2
+
+# Measures the parse time overhead of building the node type index and the
+# time of a type query answered from the index versus by traversal.
+#
+# usage: index.py [methods] [repeat]
+
+import sys
+
+import plyj.parser
+import plyj.model as m
+
+from traversal import best_of, generate_source
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+
+    plain, tree = best_of(repeat, lambda: parser.parse_string(source))
+    indexed, indexed_tree = best_of(repeat, lambda: parser.parse_string(source, index=True))
+    print('parse          {0:8.4f}s'.format(plain))
+    print('parse, index   {0:8.4f}s  ({1:+.1f}%)'.format(indexed, 100 * (indexed - plain) / plain))
+
+    query = (m.MethodInvocation, m.Literal)
+    traversal, _ = best_of(repeat, lambda: tree.find_all(*query))
+    lookup, _ = best_of(repeat, lambda: indexed_tree.nodes_of_type(*query))
+    print('find_all       {0:8.4f}s'.format(traversal))
+    print('nodes_of_type  {0:8.4f}s'.format(lookup))
+
+if __name__ == '__main__':
+    main(sys.argv)
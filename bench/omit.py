@@ -0,0 +1,48 @@
+#!/usr/bin/env python2
+
+# Compares a full parse of annotated methods with parses omitting
+# annotations, modifiers and literals, in time and, where tracemalloc is
+# available, in memory retained by the tree.
+#
+# usage: omit.py [methods] [repeat]
+
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def retained_memory(f):
+    tracemalloc.start()
+    try:
+        tree = f()  # kept alive while measuring
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods).replace(
+        '    int method', '    @Override @SuppressWarnings("unchecked") public final int method')
+
+    for omit in [(), ('annotations',), ('modifiers',), ('literals',), ('modifiers', 'literals')]:
+        parse = lambda: parser.parse_string(source, omit=omit)
+        elapsed, _ = best_of(repeat, parse)
+        label = ', '.join(omit) or 'nothing omitted'
+        line = '{0:22} {1:8.4f}s'.format(label, elapsed)
+        if tracemalloc is not None:
+            line += '  {0:6.1f} MB retained'.format(retained_memory(parse) / 1e6)
+        print(line)
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python2
+
+# Compares a full parse with an outline parse, which skips method bodies,
+# with an outline parse followed by parsing every body on demand and with a
+# lazy parse of which every tenth method body is used.
+#
+# usage: outline.py [methods] [repeat]
+
+import sys
+
+import plyj.parser
+import plyj.model as m
+
+from traversal import best_of, generate_source
+
+
+def parse_bodies(parser, tree):
+    return [parser.parse_body(body) for body in tree.find_all(m.UnparsedBody)]
+
+
+def lazy_parse(parser, source):
+    tree = parser.parse_string(source, lazy=True)
+    # not find_all(), which would walk into every body
+    for method in tree.type_declarations[0].body[::10]:
+        len(method.body)
+    return tree
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+
+    full, _ = best_of(repeat, lambda: parser.parse_string(source))
+    outline, tree = best_of(repeat, lambda: parser.parse_string(source, outline=True))
+    bodies, _ = best_of(repeat, lambda: parse_bodies(parser, tree))
+    lazy, _ = best_of(repeat, lambda: lazy_parse(parser, source))
+    print('parse             {0:8.4f}s'.format(full))
+    print('outline           {0:8.4f}s  ({1:.1f}x faster)'.format(outline, full / outline))
+    print('outline + bodies  {0:8.4f}s'.format(outline + bodies))
+    print('lazy, 10% used    {0:8.4f}s  ({1:.1f}x faster)'.format(lazy, full / lazy))
+
+if __name__ == '__main__':
+    main(sys.argv)
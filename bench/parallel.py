@@ -0,0 +1,33 @@
+#!/usr/bin/env python2
+
+# Compares a sequential parse of a large class with parallel parses of its
+# members in 2, 4 and as many processes as there are CPUs, checking that
+# every result is the sequential tree.
+#
+# usage: parallel.py [methods] [repeat]
+
+import multiprocessing
+import sys
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 5000
+    repeat = int(argv[2]) if len(argv) > 2 else 3
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+
+    sequential, expected = best_of(repeat, lambda: parser.parse_string(source))
+    print('{0} CPUs'.format(multiprocessing.cpu_count()))
+    print('sequential  {0:8.4f}s'.format(sequential))
+    for workers in sorted(set([2, 4, max(2, multiprocessing.cpu_count())])):
+        elapsed, tree = best_of(repeat, lambda: parser.parse_string(source, workers=workers))
+        assert tree == expected
+        print('{0:2} workers  {1:8.4f}s  ({2:.1f}x faster)'.format(workers, elapsed, sequential / elapsed))
+
+if __name__ == '__main__':
+    main(sys.argv)
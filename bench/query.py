@@ -0,0 +1,76 @@
+#!/usr/bin/env python2
+
+# Compares compiled queries with hand-written visitors answering the same
+# question over a big synthetic compilation unit.
+#
+# usage: query.py [methods] [repeat]
+
+import sys
+
+import plyj.parser
+import plyj.model as m
+import plyj.query
+
+from traversal import best_of, generate_source
+
+
+class CallsInMethods(m.Visitor):
+    # MethodDeclaration MethodInvocation[name="foo"]
+
+    def __init__(self):
+        super(CallsInMethods, self).__init__()
+        self.depth = 0
+        self.found = []
+
+    def visit_MethodDeclaration(self, method_decl):
+        self.depth += 1
+        return True
+
+    def leave_MethodDeclaration(self, method_decl):
+        self.depth -= 1
+
+    def visit_MethodInvocation(self, invocation):
+        if self.depth and invocation.name == 'foo':
+            self.found.append(invocation)
+        return True
+
+
+class ComparedLiterals(m.Visitor):
+    # Relational > Literal
+
+    def __init__(self):
+        super(ComparedLiterals, self).__init__()
+        self.found = []
+
+    def visit_Relational(self, relational):
+        for operand in (relational.lhs, relational.rhs):
+            if isinstance(operand, m.Literal):
+                self.found.append(operand)
+        return True
+
+
+def visit(tree, visitor_class):
+    visitor = visitor_class()
+    tree.accept(visitor)
+    return visitor.found
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 1000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    tree = plyj.parser.Parser().parse_string(generate_source(methods))
+
+    cases = [('MethodDeclaration MethodInvocation[name="foo"]', CallsInMethods),
+             ('Relational > Literal', ComparedLiterals)]
+    for source, visitor_class in cases:
+        query = plyj.query.compile(source)
+        by_visitor, found = best_of(repeat, lambda: visit(tree, visitor_class))
+        by_query, matches = best_of(repeat, lambda: query.matches(tree))
+        assert [match.node for match in matches] == found
+        print(source)
+        print('    visitor {0:8.4f}s'.format(by_visitor))
+        print('    query   {0:8.4f}s  ({1} matches)'.format(by_query, len(matches)))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python2
+
+# Compares lexing a file with updating its TokenStream after each of the
+# keystrokes typing a statement into a method in its middle.
+#
+# usage: relex.py [methods] [repeat]
+
+import sys
+import time
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 1000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+    typed = 'x = foo("a, b", 1.5e3); // done\n'
+    at = source.index('return x;', len(source) // 2)
+
+    def type_statement():
+        tokens = parser.lex_string(source)
+        start = time.time()
+        for i, char in enumerate(typed):
+            tokens.edit(at + i, at + i, char)
+        return (time.time() - start) / len(typed)
+
+    full, tokens = best_of(repeat, lambda: parser.lex_string(source))
+    keystroke = min(type_statement() for _ in range(repeat))
+    print('{0} tokens'.format(len(tokens)))
+    print('lex        {0:8.4f}s'.format(full))
+    print('keystroke  {0:8.6f}s  ({1:.0f}x faster)'.format(keystroke, full / keystroke))
+
+if __name__ == '__main__':
+    main(sys.argv)
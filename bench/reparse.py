@@ -0,0 +1,42 @@
+#!/usr/bin/env python2
+
+# Compares parsing a file again after an edit adding a character to a
+# statement of a method near its top and in its middle with
+# Parser.reparse(), for files of growing size. The time a reparse takes should not grow with the
+# file: the offsets of the nodes after the edit are only moved when used.
+#
+# usage: reparse.py [repeat]
+
+import sys
+import time
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def main(argv):
+    repeat = int(argv[1]) if len(argv) > 1 else 5
+
+    parser = plyj.parser.Parser()
+    for methods in [10, 100, 1000, 4000]:
+        source = generate_source(methods)
+        tree = parser.parse_string(source)
+        for where, at in [('top', source.index('baz.qux') + 3),
+                          ('middle', source.index('baz.qux', len(source) // 2) + 3)]:
+
+            def reparse():
+                start = time.time()
+                parser.reparse(tree, at, at + 1, 'QQ')
+                elapsed = time.time() - start
+                # back to the text the next run edits
+                parser.reparse(tree, at, at + 2, source[at])
+                return elapsed
+
+            full, _ = best_of(repeat, lambda: parser.parse_string(source[:at] + 'QQ' + source[at + 1:]))
+            incremental = min(reparse() for _ in range(repeat))
+            print('{0:5} methods  {1:6}  parse {2:8.4f}s  reparse {3:8.4f}s  ({4:.0f}x faster)'.format(
+                methods, where, full, incremental, full / incremental))
+
+if __name__ == '__main__':
+    main(sys.argv)
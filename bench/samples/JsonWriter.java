@@ -0,0 +1,199 @@
+package org.example.json;
+
+import java.io.Closeable;
+import java.io.IOException;
+import java.io.Writer;
+import java.util.ArrayDeque;
+import java.util.Collection;
+import java.util.Deque;
+import java.util.Map;
+
+/**
+ * Writes JSON text to a Writer, one value at a time.
+ */
+public final class JsonWriter implements Closeable {
+
+    private enum Scope { EMPTY_ARRAY, ARRAY, EMPTY_OBJECT, OBJECT, NAME }
+
+    private static final String[] REPLACEMENTS = new String[128];
+
+    static {
+        for (int i = 0; i < 0x20; i++) {
+            REPLACEMENTS[i] = String.format("\\u%04x", i);
+        }
+        REPLACEMENTS['"'] = "\\\"";
+        REPLACEMENTS['\\'] = "\\\\";
+        REPLACEMENTS['\t'] = "\\t";
+        REPLACEMENTS['\b'] = "\\b";
+        REPLACEMENTS['\n'] = "\\n";
+        REPLACEMENTS['\r'] = "\\r";
+        REPLACEMENTS['\f'] = "\\f";
+    }
+
+    private final Writer out;
+    private final Deque<Scope> stack = new ArrayDeque<Scope>();
+    private String indent = "";
+
+    public JsonWriter(Writer out) {
+        if (out == null) {
+            throw new NullPointerException("out == null");
+        }
+        this.out = out;
+    }
+
+    public void setIndent(String indent) {
+        this.indent = indent;
+    }
+
+    public JsonWriter beginArray() throws IOException {
+        return open(Scope.EMPTY_ARRAY, '[');
+    }
+
+    public JsonWriter endArray() throws IOException {
+        return close(Scope.EMPTY_ARRAY, Scope.ARRAY, ']');
+    }
+
+    public JsonWriter beginObject() throws IOException {
+        return open(Scope.EMPTY_OBJECT, '{');
+    }
+
+    public JsonWriter endObject() throws IOException {
+        return close(Scope.EMPTY_OBJECT, Scope.OBJECT, '}');
+    }
+
+    public JsonWriter name(String name) throws IOException {
+        Scope scope = stack.peek();
+        if (scope == Scope.OBJECT) {
+            out.write(',');
+        } else if (scope != Scope.EMPTY_OBJECT) {
+            throw new IllegalStateException("nesting problem: " + scope);
+        }
+        newline();
+        string(name);
+        out.write(indent.isEmpty() ? ":" : ": ");
+        replaceTop(Scope.NAME);
+        return this;
+    }
+
+    @SuppressWarnings("unchecked")
+    public JsonWriter value(Object value) throws IOException {
+        if (value == null) {
+            beforeValue();
+            out.write("null");
+        } else if (value instanceof Number || value instanceof Boolean) {
+            beforeValue();
+            out.write(value.toString());
+        } else if (value instanceof Map) {
+            beginObject();
+            for (Map.Entry<String, ?> entry : ((Map<String, ?>) value).entrySet()) {
+                name(entry.getKey()).value(entry.getValue());
+            }
+            endObject();
+        } else if (value instanceof Collection) {
+            beginArray();
+            for (Object element : (Collection<?>) value) {
+                value(element);
+            }
+            endArray();
+        } else {
+            beforeValue();
+            string(value.toString());
+        }
+        return this;
+    }
+
+    private JsonWriter open(Scope empty, char bracket) throws IOException {
+        beforeValue();
+        stack.push(empty);
+        out.write(bracket);
+        return this;
+    }
+
+    private JsonWriter close(Scope empty, Scope nonempty, char bracket) throws IOException {
+        Scope scope = stack.pop();
+        if (scope != nonempty && scope != empty) {
+            throw new IllegalStateException("nesting problem: " + scope);
+        }
+        if (scope == nonempty) {
+            newline();
+        }
+        out.write(bracket);
+        return this;
+    }
+
+    private void beforeValue() throws IOException {
+        if (stack.isEmpty()) {
+            return;
+        }
+        switch (stack.peek()) {
+        case NAME:
+            replaceTop(Scope.OBJECT);
+            break;
+        case ARRAY:
+            out.write(',');
+            newline();
+            break;
+        case EMPTY_ARRAY:
+            replaceTop(Scope.ARRAY);
+            newline();
+            break;
+        default:
+            throw new IllegalStateException("nesting problem");
+        }
+    }
+
+    private void replaceTop(Scope scope) {
+        stack.pop();
+        stack.push(scope);
+    }
+
+    private void newline() throws IOException {
+        if (indent.isEmpty()) {
+            return;
+        }
+        out.write('\n');
+        for (int i = 1; i < stack.size(); i++) {
+            out.write(indent);
+        }
+    }
+
+    private void string(String value) throws IOException {
+        out.write('"');
+        int last = 0;
+        int length = value.length();
+        for (int i = 0; i < length; i++) {
+            char c = value.charAt(i);
+            String replacement;
+            if (c < 128) {
+                replacement = REPLACEMENTS[c];
+                if (replacement == null) {
+                    continue;
+                }
+            } else if (c == '\u2028' || c == '\u2029') {
+                replacement = c == '\u2028' ? "\\u2028" : "\\u2029";
+            } else {
+                continue;
+            }
+            if (last < i) {
+                out.write(value, last, i - last);
+            }
+            out.write(replacement);
+            last = i + 1;
+        }
+        if (last < length) {
+            out.write(value, last, length - last);
+        }
+        out.write('"');
+    }
+
+    @Override
+    public void close() throws IOException {
+        try {
+            out.close();
+        } finally {
+            if (!stack.isEmpty()) {
+                throw new IOException("incomplete document");
+            }
+        }
+    }
+}
@@ -0,0 +1,115 @@
+package org.example.cache;
+
+import java.util.HashMap;
+import java.util.Map;
+
+/**
+ * A map of at most a fixed number of entries that evicts the least
+ * recently used one when it is full.
+ */
+public class LruCache<K, V> {
+
+    private static final class Node<K, V> {
+        final K key;
+        V value;
+        Node<K, V> previous;
+        Node<K, V> next;
+
+        Node(K key, V value) {
+            this.key = key;
+            this.value = value;
+        }
+    }
+
+    private final Map<K, Node<K, V>> nodes = new HashMap<>();
+    private final int capacity;
+    private Node<K, V> head;
+    private Node<K, V> tail;
+    private long hits;
+    private long misses;
+
+    public LruCache(int capacity) {
+        if (capacity <= 0) {
+            throw new IllegalArgumentException("capacity must be positive: " + capacity);
+        }
+        this.capacity = capacity;
+    }
+
+    public synchronized V get(K key) {
+        Node<K, V> node = nodes.get(key);
+        if (node == null) {
+            misses++;
+            return null;
+        }
+        hits++;
+        moveToFront(node);
+        return node.value;
+    }
+
+    public synchronized V put(K key, V value) {
+        Node<K, V> node = nodes.get(key);
+        if (node != null) {
+            V old = node.value;
+            node.value = value;
+            moveToFront(node);
+            return old;
+        }
+        if (nodes.size() == capacity) {
+            nodes.remove(tail.key);
+            unlink(tail);
+        }
+        node = new Node<>(key, value);
+        nodes.put(key, node);
+        linkFirst(node);
+        return null;
+    }
+
+    public synchronized double hitRate() {
+        long total = hits + misses;
+        return total == 0 ? 0.0 : (double) hits / total;
+    }
+
+    private void moveToFront(Node<K, V> node) {
+        if (node != head) {
+            unlink(node);
+            linkFirst(node);
+        }
+    }
+
+    private void linkFirst(Node<K, V> node) {
+        node.next = head;
+        node.previous = null;
+        if (head != null) {
+            head.previous = node;
+        }
+        head = node;
+        if (tail == null) {
+            tail = node;
+        }
+    }
+
+    private void unlink(Node<K, V> node) {
+        if (node.previous != null) {
+            node.previous.next = node.next;
+        } else {
+            head = node.next;
+        }
+        if (node.next != null) {
+            node.next.previous = node.previous;
+        } else {
+            tail = node.previous;
+        }
+    }
+
+    @Override
+    public synchronized String toString() {
+        StringBuilder builder = new StringBuilder("{");
+        for (Node<K, V> node = head; node != null; node = node.next) {
+            builder.append(node.key).append('=').append(node.value);
+            if (node.next != null) {
+                builder.append(", ");
+            }
+        }
+        return builder.append('}').toString();
+    }
+}
@@ -0,0 +1,169 @@
+package org.example.concurrent;
+
+import java.util.ArrayList;
+import java.util.List;
+import java.util.PriorityQueue;
+import java.util.concurrent.TimeUnit;
+import java.util.concurrent.atomic.AtomicLong;
+
+/**
+ * Runs tasks at or after their due time on a fixed number of threads.
+ */
+public class TaskScheduler implements AutoCloseable {
+
+    public interface Task {
+        void run() throws Exception;
+    }
+
+    public interface Listener {
+        void failed(Task task, Throwable cause);
+    }
+
+    public enum State {
+        NEW, RUNNING, SHUTTING_DOWN, TERMINATED;
+
+        boolean accepts() {
+            return this == NEW || this == RUNNING;
+        }
+    }
+
+    private static final class Entry implements Comparable<Entry> {
+        final Task task;
+        final long due;
+        final long sequence;
+        final long period;
+
+        Entry(Task task, long due, long sequence, long period) {
+            this.task = task;
+            this.due = due;
+            this.sequence = sequence;
+            this.period = period;
+        }
+
+        @Override
+        public int compareTo(Entry other) {
+            if (due != other.due) {
+                return due < other.due ? -1 : 1;
+            }
+            return Long.compare(sequence, other.sequence);
+        }
+    }
+
+    private final PriorityQueue<Entry> queue = new PriorityQueue<>();
+    private final List<Thread> threads = new ArrayList<>();
+    private final AtomicLong sequence = new AtomicLong();
+    private final Listener listener;
+    private volatile State state = State.NEW;
+
+    public TaskScheduler(int threadCount, Listener listener) {
+        this.listener = listener != null ? listener : new Listener() {
+            @Override
+            public void failed(Task task, Throwable cause) {
+                cause.printStackTrace();
+            }
+        };
+        for (int i = 0; i < threadCount; i++) {
+            Thread thread = new Thread(new Runnable() {
+                @Override
+                public void run() {
+                    work();
+                }
+            }, "scheduler-" + i);
+            thread.setDaemon(true);
+            threads.add(thread);
+        }
+    }
+
+    public synchronized void start() {
+        if (state != State.NEW) {
+            throw new IllegalStateException("already started");
+        }
+        state = State.RUNNING;
+        for (Thread thread : threads) {
+            thread.start();
+        }
+    }
+
+    public void schedule(Task task, long delay, TimeUnit unit) {
+        submit(task, delay, 0, unit);
+    }
+
+    public void scheduleAtFixedRate(Task task, long delay, long period, TimeUnit unit) {
+        if (period <= 0) {
+            throw new IllegalArgumentException("period <= 0");
+        }
+        submit(task, delay, period, unit);
+    }
+
+    private synchronized void submit(Task task, long delay, long period, TimeUnit unit) {
+        if (!state.accepts()) {
+            throw new IllegalStateException("scheduler is " + state.name().toLowerCase());
+        }
+        long due = System.nanoTime() + unit.toNanos(Math.max(delay, 0L));
+        queue.add(new Entry(task, due, sequence.getAndIncrement(), unit.toNanos(period)));
+        notifyAll();
+    }
+
+    private void work() {
+        while (true) {
+            Entry entry;
+            synchronized (this) {
+                try {
+                    entry = next();
+                } catch (InterruptedException e) {
+                    Thread.currentThread().interrupt();
+                    return;
+                }
+                if (entry == null) {
+                    return;
+                }
+            }
+            try {
+                entry.task.run();
+            } catch (RuntimeException | Error e) {
+                listener.failed(entry.task, e);
+            } catch (Exception e) {
+                listener.failed(entry.task, e);
+            }
+            if (entry.period > 0) {
+                synchronized (this) {
+                    if (state == State.RUNNING) {
+                        queue.add(new Entry(entry.task, entry.due + entry.period, sequence.getAndIncrement(),
+                                            entry.period));
+                        notifyAll();
+                    }
+                }
+            }
+        }
+    }
+
+    private Entry next() throws InterruptedException {
+        for (;;) {
+            if (state == State.SHUTTING_DOWN && queue.isEmpty() || state == State.TERMINATED) {
+                return null;
+            }
+            Entry head = queue.peek();
+            if (head == null) {
+                wait();
+                continue;
+            }
+            long remaining = head.due - System.nanoTime();
+            if (remaining <= 0) {
+                return queue.poll();
+            }
+            TimeUnit.NANOSECONDS.timedWait(this, remaining);
+        }
+    }
+
+    @Override
+    public void close() throws InterruptedException {
+        synchronized (this) {
+            state = State.SHUTTING_DOWN;
+            notifyAll();
+        }
+        for (Thread thread : threads) {
+            thread.join();
+        }
+        state = State.TERMINATED;
+    }
+}
@@ -0,0 +1,57 @@
+#!/usr/bin/env python2
+
+# Compares counting method invocations by a visitor over a finished tree
+# with streaming the same visitor while parsing, with and without a tree,
+# in time and, where tracemalloc is available, in peak memory allocated.
+#
+# usage: stream.py [methods] [repeat]
+
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import plyj.parser
+
+from traversal import InvocationCounter, best_of, generate_source
+
+
+def peak_memory(f):
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def count(f):
+    counter = InvocationCounter()
+    f(counter)
+    return counter.count
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+
+    cases = [('parse + accept', lambda v: parser.parse_string(source).accept(v)),
+             ('stream', lambda v: parser.stream_string(source, v)),
+             ('stream, no tree', lambda v: parser.stream_string(source, v, build_tree=False))]
+    counts = set()
+    for label, f in cases:
+        elapsed, invocations = best_of(repeat, lambda: count(f))
+        counts.add(invocations)
+        line = '{0:16} {1:8.4f}s'.format(label, elapsed)
+        if tracemalloc is not None:
+            line += ' {0:8.1f} MB peak'.format(peak_memory(lambda: count(f)) / 1e6)
+        print(line)
+    assert len(counts) == 1
+
+if __name__ == '__main__':
+    main(sys.argv)
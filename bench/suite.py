@@ -0,0 +1,215 @@
+#!/usr/bin/env python2
+
+# The benchmark suite. Measures loading the parse tables, lexing with
+# MyLexer, parsing through every entry point, building the tree (a full
+# parse less a validating one, which runs no actions) and visiting it with
+# accept() over a corpus generated from a seed (see corpus.py) and the
+# samples in samples/. Timings are the best of repeat runs over the whole
+# corpus; peak memory is measured in a run of its own, with tracemalloc
+# where there is one. Results are written as JSON, and two result files
+# can be compared, flagging every benchmark that got slower or needs more
+# memory by more than a threshold.
+#
+# usage: suite.py run [--files N] [--methods N] [--seed N] [--repeat N] [--output FILE]
+#        suite.py compare BASELINE CURRENT [--threshold PERCENT]
+
+import argparse
+import json
+import platform
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import ply
+import plyj.parser
+
+from corpus import generate_corpus, load_samples
+from traversal import InvocationCounter, best_of
+
+FORMAT = 1
+
+
+def peak_memory(f):
+    if tracemalloc is None:
+        return None
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def load_tables():
+    # the tables are a module, imported only once per process otherwise
+    for name in [name for name in sys.modules if name.endswith(('parsetab', 'lextab'))]:
+        del sys.modules[name]
+    return plyj.parser.Parser()
+
+
+def lex(parser, sources):
+    lexer = parser.lexer
+    count = 0
+    for source in sources:
+        lexer.input(source)
+        for _ in lexer:
+            count += 1
+    lexer.input('')
+    return count
+
+
+def each(f, sources):
+    def run():
+        for source in sources:
+            f(source)
+    return run
+
+
+def entry_points(parser):
+    """Returns (name, function of a source) for every way to parse a file."""
+    return [
+        ('parse_string', lambda source: parser.parse_string(source)),
+        ('parse_string_index', lambda source: parser.parse_string(source, index=True)),
+        ('parse_string_outline', lambda source: parser.parse_string(source, outline=True)),
+        ('parse_string_lazy', lambda source: parser.parse_string(source, lazy=True)),
+        ('parse_string_omit', lambda source: parser.parse_string(source, omit=('modifiers', 'literals'))),
+        ('stream_string', lambda source: parser.stream_string(source, InvocationCounter(), build_tree=False)),
+        ('parse_header_string', lambda source: parser.parse_header_string(source)),
+        ('validate_string', lambda source: parser.validate_string(source)),
+    ]
+
+
+def run(args):
+    corpus = generate_corpus(args.files, args.methods, args.seed)
+    samples = load_samples()
+    sources = [source for _, source in corpus + samples]
+    repeat = args.repeat
+
+    results = {}
+
+    def record(name, seconds, peak, tokens=None, nodes=None):
+        result = {'seconds': seconds, 'peak_bytes': peak}
+        if tokens is not None:
+            result['tokens_per_second'] = tokens / seconds
+        if nodes is not None:
+            result['nodes_per_second'] = nodes / seconds
+        results[name] = result
+        sys.stderr.write('{0:24} {1:9.4f}s\n'.format(name, seconds))
+
+    seconds, parser = best_of(repeat, load_tables)
+    record('table_load', seconds, peak_memory(load_tables))
+
+    seconds, tokens = best_of(repeat, lambda: lex(parser, sources))
+    record('lex', seconds, peak_memory(lambda: lex(parser, sources)), tokens)
+
+    trees = [parser.parse_string(source) for source in sources]
+    nodes = sum(1 for tree in trees for _ in tree.walk())
+    for name, f in entry_points(parser):
+        seconds, _ = best_of(repeat, each(f, sources))
+        # a header parse reads a few tokens of each file, the others all of
+        # them, though outline and lazy parses only match the braces of bodies
+        reads = name != 'parse_header_string'
+        builds = name in ('parse_string', 'parse_string_index')
+        record(name, seconds, peak_memory(each(f, sources)), tokens if reads else None, nodes if builds else None)
+
+    # what the actions building and positioning nodes cost on top of recognizing the input
+    construction = results['parse_string']['seconds'] - results['validate_string']['seconds']
+    results['ast_construction'] = {'seconds': construction, 'nodes_per_second': nodes / construction}
+    sys.stderr.write('{0:24} {1:9.4f}s\n'.format('ast_construction', construction))
+
+    visit = each(lambda tree: tree.accept(InvocationCounter()), trees)
+    seconds, _ = best_of(repeat, visit)
+    record('accept', seconds, peak_memory(visit), nodes=nodes)
+
+    report = {
+        'format': FORMAT,
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'ply': ply.__version__,
+            'tracemalloc': tracemalloc is not None,
+        },
+        'corpus': {
+            'seed': args.seed,
+            'files': args.files,
+            'methods': args.methods,
+            'samples': [name for name, _ in samples],
+            'characters': sum(len(source) for source in sources),
+            'tokens': tokens,
+            'nodes': nodes,
+        },
+        'repeat': repeat,
+        'benchmarks': results,
+    }
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    if baseline['corpus'] != current['corpus']:
+        print('warning: the runs measured different corpora')
+    if baseline['environment'] != current['environment']:
+        print('warning: the runs were made in different environments')
+    limit = 1 + args.threshold / 100.0
+    regressions = 0
+    print('{0:24} {1:>10} {2:>10} {3:>8} {4:>8}'.format('benchmark', 'baseline', 'current', 'time', 'memory'))
+    for name in sorted(baseline['benchmarks']):
+        if name not in current['benchmarks']:
+            print('{0:24} missing from the current run'.format(name))
+            continue
+        old, new = baseline['benchmarks'][name], current['benchmarks'][name]
+        time_ratio = new['seconds'] / old['seconds']
+        memory_ratio = None
+        if old.get('peak_bytes') and new.get('peak_bytes'):
+            memory_ratio = float(new['peak_bytes']) / old['peak_bytes']
+        flags = []
+        if time_ratio > limit:
+            flags.append('slower')
+        if memory_ratio is not None and memory_ratio > limit:
+            flags.append('more memory')
+        regressions += bool(flags)
+        print('{0:24} {1:9.4f}s {2:9.4f}s {3:+7.1f}% {4:>8}  {5}'.format(
+            name, old['seconds'], new['seconds'], 100 * (time_ratio - 1),
+            '{0:+.1f}%'.format(100 * (memory_ratio - 1)) if memory_ratio is not None else '-',
+            'REGRESSION: ' + ', '.join(flags) if flags else '').rstrip())
+    print('{0} regressions above {1}%'.format(regressions, args.threshold))
+    return 1 if regressions else 0
+
+
+def main(argv):
+    arguments = argparse.ArgumentParser(description='plyj benchmark suite')
+    commands = arguments.add_subparsers(dest='command')
+    run_command = commands.add_parser('run', help='measure and write the results as JSON')
+    run_command.add_argument('--files', type=int, default=50, help='generated files')
+    run_command.add_argument('--methods', type=int, default=10, help='average methods per generated file')
+    run_command.add_argument('--seed', type=int, default=1)
+    run_command.add_argument('--repeat', type=int, default=3, help='runs of which the best is kept')
+    run_command.add_argument('--output', help='file to write the JSON to instead of standard output')
+    compare_command = commands.add_parser('compare', help='compare two result files')
+    compare_command.add_argument('baseline')
+    compare_command.add_argument('current')
+    compare_command.add_argument('--threshold', type=float, default=10.0,
+                                 help='percentage above which a slowdown is a regression')
+    args = arguments.parse_args(argv[1:])
+    if args.command == 'run':
+        return run(args)
+    if args.command == 'compare':
+        return compare(args)
+    arguments.print_usage()
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
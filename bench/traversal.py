@@ -0,0 +1,155 @@
+#!/usr/bin/env python2
+
+# Measures visitor traversal over a big synthetic compilation unit with a
+# sparse visitor, i.e. one that only implements a single visit_ method.
+#
+# usage: traversal.py [methods] [repeat] [terms]
+
+import sys
+import time
+
+import plyj.parser
+import plyj.model as m
+
+
+def generate_source(methods):
+    lines = ['package bench;', '', 'class Generated {']
+    for i in range(methods):
+        lines.append('''
+    int method{0}(int a, int b) {{
+        int x = a + b * {0};
+        if (x > 10) {{
+            x = foo(x, bar(a)) - baz.qux(b);
+        }} else {{
+            for (int i = 0; i < b; i++) {{
+                x += i * (a - 1);
+            }}
+        }}
+        return x;
+    }}'''.format(i))
+    lines.append('}')
+    return '\n'.join(lines)
+
+
+def best_of(repeat, f):
+    # the shortest of repeat runs of f, and what the last one returned
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        result = f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+class InvocationCounter(m.Visitor):
+
+    def __init__(self):
+        super(InvocationCounter, self).__init__()
+        self.count = 0
+
+    def visit_MethodInvocation(self, invocation):
+        self.count += 1
+        return True
+
+
+def legacy_accept(element, visitor):
+    # the dispatch SourceElement.accept used before handlers were cached
+    class_name = element.__class__.__name__
+    if getattr(visitor, 'visit_' + class_name)(element):
+        for f in element._fields:
+            field = getattr(element, f)
+            if field:
+                if isinstance(field, list):
+                    for elem in field:
+                        if isinstance(elem, m.SourceElement):
+                            legacy_accept(elem, visitor)
+                elif isinstance(field, m.SourceElement):
+                    legacy_accept(field, visitor)
+    getattr(visitor, 'leave_' + class_name)(element)
+
+
+def recursive_accept(element, visitor):
+    # cached dispatch, but recursing once per nesting level
+    visit, leave, _ = m._handlers(visitor, element.__class__)
+    if visit(visitor, element):
+        for f in element._fields:
+            field = getattr(element, f)
+            if field:
+                if isinstance(field, list):
+                    for elem in field:
+                        if isinstance(elem, m.SourceElement):
+                            recursive_accept(elem, visitor)
+                elif isinstance(field, m.SourceElement):
+                    recursive_accept(field, visitor)
+    leave(visitor, element)
+
+
+def measure(label, traverse, tree, repeat):
+    def run():
+        visitor = InvocationCounter()
+        traverse(tree, visitor)
+        return visitor
+    best, visitor = best_of(repeat, run)
+    print('{0:<10} {1:8.4f}s  ({2} counted)'.format(label, best, visitor.count))
+    return best
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 2000
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+    terms_count = int(argv[3]) if len(argv) > 3 else 5000
+
+    tree = plyj.parser.Parser().parse_string(generate_source(methods))
+
+    legacy = measure('legacy', legacy_accept, tree, repeat)
+    measure('recursive', recursive_accept, tree, repeat)
+    cached = measure('accept', lambda t, v: t.accept(v), tree, repeat)
+    print('speedup    {0:8.2f}x'.format(legacy / cached))
+
+    def walk(tree, visitor):
+        for node in tree.walk():
+            if isinstance(node, m.MethodInvocation):
+                visitor.count += 1
+
+    def find_all(tree, visitor):
+        visitor.count = len(tree.find_all(m.MethodInvocation))
+
+    measure('walk', walk, tree, repeat)
+    measure('find_all', find_all, tree, repeat)
+
+    # 40 sparse visitors, each interested in a different node class
+    node_classes = [c for c in vars(m).values()
+                    if isinstance(c, type) and issubclass(c, m.SourceElement)]
+    node_classes.sort(key=lambda c: c.__name__)
+    visitor_classes = []
+    for node_class in node_classes[:40]:
+        def visit(self, element):
+            self.count += 1
+            return True
+        name = 'visit_' + node_class.__name__
+        visitor_classes.append(type('Count' + node_class.__name__, (InvocationCounter,), {name: visit}))
+
+    def separate(tree, visitor):
+        for visitor_class in visitor_classes:
+            counter = visitor_class()
+            tree.accept(counter)
+            visitor.count += counter.count
+
+    def fused(tree, visitor):
+        counters = [visitor_class() for visitor_class in visitor_classes]
+        tree.accept(m.MultiVisitor(counters))
+        visitor.count = sum(counter.count for counter in counters)
+
+    separately = measure('40 visits', separate, tree, repeat)
+    together = measure('multi', fused, tree, repeat)
+    print('speedup    {0:8.2f}x'.format(separately / together))
+
+    # a left-deep chain far beyond the recursion limit; only accept copes
+    terms = ' + '.join('foo({0})'.format(i) for i in range(terms_count))
+    deep = plyj.parser.Parser().parse_expression(terms)
+    measure('deep', lambda t, v: t.accept(v), deep, repeat)
+
+if __name__ == '__main__':
+    main(sys.argv)
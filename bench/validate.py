@@ -0,0 +1,50 @@
+#!/usr/bin/env python2
+
+# Compares a full parse with validation, which runs the same tables but
+# builds nothing, in time and, where tracemalloc is available, in peak
+# memory allocated.
+#
+# usage: validate.py [methods] [repeat]
+
+import io
+import sys
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import plyj.parser
+
+from traversal import best_of, generate_source
+
+
+def peak_memory(f):
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(argv):
+    methods = int(argv[1]) if len(argv) > 1 else 500
+    repeat = int(argv[2]) if len(argv) > 2 else 5
+
+    parser = plyj.parser.Parser()
+    source = generate_source(methods)
+
+    parse = lambda: parser.parse_file(io.StringIO(source))
+    validate = lambda: parser.validate_file(io.StringIO(source))
+    full, _ = best_of(repeat, parse)
+    valid, error = best_of(repeat, validate)
+    assert error is None
+    print('parse_file     {0:8.4f}s'.format(full))
+    print('validate_file  {0:8.4f}s  ({1:.1f}x faster)'.format(valid, full / valid))
+    if tracemalloc is not None:
+        print('parse_file     {0:8.1f} MB peak'.format(peak_memory(parse) / 1e6))
+        print('validate_file  {0:8.1f} MB peak'.format(peak_memory(validate) / 1e6))
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,413 @@
+import hashlib
+import os
+import pickle
+import subprocess
+import time
+import zlib
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+from .diagnostics import BudgetExceeded
+from .model import SourceElement
+from .parser import Parser
+
+# Parsing many files, as for a nightly run over a repository, where most of
+# them are the same as the last time. A TreeCache remembers the fingerprint
+# of every file parsed and the tree of every content, so a BatchParser only
+# parses files that changed and loads the trees of the others when they are
+# first used. It can also parse the Java files of a revision of a local git
+# repository, or only those changed between two revisions, reading blobs
+# from the object database and parsing every blob once.
+
+
+class TreeCache(object):
+    """
+    A SQLite database holding a manifest of path, size, modification time
+    and content hash for every file a BatchParser parsed and the trees of
+    those contents, pickled and compressed, by hash.
+    """
+
+    def __init__(self, path):
+        if sqlite3 is None:
+            raise RuntimeError('the tree cache needs the sqlite3 module')
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS files '
+                         '(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, digest TEXT)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS trees (digest TEXT PRIMARY KEY, tree BLOB)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS blobs (blob TEXT PRIMARY KEY, digest TEXT, size INTEGER)')
+
+    def fingerprint(self, path):
+        """Returns the (size, mtime, digest) recorded for path or None."""
+        return self._db.execute('SELECT size, mtime, digest FROM files WHERE path = ?', (path,)).fetchone()
+
+    def record(self, path, size, mtime, digest):
+        self._db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', (path, size, mtime, digest))
+
+    def blob_info(self, blob):
+        """Returns the (content hash, size) recorded for a git blob id or None."""
+        return self._db.execute('SELECT digest, size FROM blobs WHERE blob = ?', (blob,)).fetchone()
+
+    def record_blob(self, blob, digest, size):
+        self._db.execute('INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)', (blob, digest, size))
+
+    def __contains__(self, digest):
+        return self._db.execute('SELECT 1 FROM trees WHERE digest = ?', (digest,)).fetchone() is not None
+
+    def load(self, digest):
+        """Returns the tree stored for digest, None if there is none."""
+        row = self._db.execute('SELECT tree FROM trees WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return None
+        return _loads(zlib.decompress(row[0]))
+
+    def store(self, digest, tree):
+        data = zlib.compress(_dumps(tree), 1)
+        self._db.execute('INSERT OR REPLACE INTO trees VALUES (?, ?)', (digest, sqlite3.Binary(data)))
+
+    def commit(self):
+        self._db.commit()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+
+class FileResult(object):
+    """
+    The outcome of one file of a batch: its path, the SHA-1 hex digest of
+    its content and whether it was 'parsed', its tree was 'cached', it is
+    a 'duplicate' of an earlier file of the batch, whose tree it shares, or
+    its parse was 'aborted' for going over budget, which reason explains.
+    A cached tree is loaded when tree is first used. Files read from git
+    have the path in the repository and the blob id. A file that 'failed'
+    to be decoded has no tree either, and reason says why.
+
+    The name of the SourceFile of a parsed or cached tree is path. A
+    duplicate shares the tree of the original, SourceFile included, which
+    is named after the original's path: path is the name of the file a
+    result is for.
+    """
+
+    def __init__(self, path, digest, status, tree=None, cache=None, blob=None, original=None, reason=None):
+        self.path = path
+        self.digest = digest
+        self.status = status
+        self.blob = blob
+        self.original = original
+        self.reason = reason if original is None else original.reason
+        self._tree = tree
+        self._cache = cache
+
+    def __repr__(self):
+        return 'FileResult({0!r}, {1!r})'.format(self.path, self.status)
+
+    @property
+    def tree(self):
+        if self.original is not None:
+            return self.original.tree
+        if self._tree is None and self._cache is not None:
+            self._tree = self._cache.load(self.digest)
+            self._cache = None
+            if self._tree is not None:
+                # stored by whichever file had the content first; the loaded
+                # copy is this result's own
+                self._tree.source_file.name = self.path
+        return self._tree
+
+    @property
+    def diagnostics(self):
+        """The Diagnostics of the parse of the tree."""
+        tree = self.tree
+        return tree.diagnostics if tree is not None else None
+
+
+class BatchStats(object):
+    """
+    What the last batch of a BatchParser did and how long it took. Of its
+    files, parsed were parsed, cached had their tree in the cache, aborted
+    went over budget, failed could not be decoded and duplicates had the
+    content of an earlier file;
+    duplicate_bytes is the size of the duplicates, which were neither
+    parsed nor loaded.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.parsed = 0
+        self.cached = 0
+        self.aborted = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.duplicate_bytes = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return ('BatchStats(files={0}, parsed={1}, cached={2}, aborted={3}, failed={4}, duplicates={5}, '
+                'duplicate_bytes={6}, seconds={7:.3f})').format(self.files, self.parsed, self.cached, self.aborted,
+                                                                self.failed, self.duplicates, self.duplicate_bytes,
+                                                                self.seconds)
+
+
+class BatchParser(object):
+    """
+    Parses files with parser (a new Parser if None), every distinct content
+    once per batch. With a cache, the path of a TreeCache database or a
+    TreeCache, a file whose size and modification time are the ones
+    recorded is not read at all, one whose content hash is is not parsed,
+    and the trees of all others are stored. Files are decoded with
+    encoding. parse_revision() and parse_changes() read files from a git
+    repository and do not parse a blob whose id the cache has seen.
+
+    max_tokens and max_seconds are the budget of every file, as for
+    Parser.parse_string(); files that go over it are left without a tree
+    and parsed again by the next batch.
+    """
+
+    def __init__(self, parser=None, cache=None, encoding='utf-8', max_tokens=None, max_seconds=None):
+        self.parser = parser if parser is not None else Parser()
+        if cache is not None and not isinstance(cache, TreeCache):
+            cache = TreeCache(cache)
+        self.cache = cache
+        self.encoding = encoding
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.stats = BatchStats()
+
+    def parse_files(self, paths):
+        """Returns a FileResult for every path, in order."""
+        self.stats = stats = BatchStats()
+        start = time.time()
+        # the first result of every digest
+        firsts = {}
+        results = []
+        for path in paths:
+            results.append(self._parse_file(os.path.abspath(path), firsts))
+            stats.files += 1
+        if self.cache is not None:
+            self.cache.commit()
+        stats.seconds = time.time() - start
+        return results
+
+    def parse_revision(self, repository, revision):
+        """
+        Returns a FileResult for every .java file of revision in the git
+        repository at the path repository.
+        """
+        listing = _git(repository, 'ls-tree', '-r', '-z', '--full-tree', revision)
+        entries = []
+        for entry in listing.split(b'\0'):
+            if entry:
+                info, path = entry.split(b'\t', 1)
+                mode, kind, blob = info.split()
+                if kind == b'blob' and mode != b'120000' and path.endswith(b'.java'):
+                    entries.append((path, blob))
+        return self._parse_blobs(repository, entries)
+
+    def parse_changes(self, repository, old, new):
+        """
+        Returns a FileResult for every .java file added or modified from
+        revision old to revision new in the git repository at the path
+        repository.
+        """
+        fields = _git(repository, 'diff-tree', '-r', '-z', '--no-renames', old, new).split(b'\0')
+        entries = []
+        for info, path in zip(fields[::2], fields[1::2]):
+            _, mode, _, blob, change = info.split()
+            if change in (b'A', b'M', b'T') and mode != b'120000' and path.endswith(b'.java'):
+                entries.append((path, blob))
+        return self._parse_blobs(repository, entries)
+
+    def _parse_blobs(self, repository, entries):
+        self.stats = stats = BatchStats()
+        start = time.time()
+        cache = self.cache
+        # blob id to digest and size of every blob of the batch, None for
+        # those the cache does not have until they are read
+        blobs = {}
+        missing = []
+        for _, blob in entries:
+            if blob not in blobs:
+                recorded = cache.blob_info(blob.decode('ascii')) if cache is not None else None
+                if recorded is not None and recorded[0] in cache:
+                    blobs[blob] = recorded
+                else:
+                    blobs[blob] = None
+                    missing.append(blob)
+        # read in the order of missing, one at a time as the first file
+        # with each comes, so only one is held in memory
+        contents = _read_blobs(repository, missing)
+        firsts = {}
+        results = []
+        try:
+            for path, blob in entries:
+                path = path.decode('utf-8')
+                content = None
+                if blobs[blob] is None:
+                    content = next(contents)
+                    blobs[blob] = hashlib.sha1(content).hexdigest(), len(content)
+                    if cache is not None:
+                        cache.record_blob(blob.decode('ascii'), blobs[blob][0], len(content))
+                digest, size = blobs[blob]
+                first = firsts.get(digest)
+                if first is not None:
+                    result = FileResult(path, digest, 'duplicate', blob=blob.decode('ascii'), original=first)
+                    stats.duplicates += 1
+                    stats.duplicate_bytes += size
+                elif content is not None and (cache is None or digest not in cache):
+                    result = self._parse_content(path, content, digest, blob.decode('ascii'))
+                else:
+                    result = FileResult(path, digest, 'cached', cache=cache, blob=blob.decode('ascii'))
+                    stats.cached += 1
+                firsts.setdefault(digest, result)
+                results.append(result)
+                stats.files += 1
+        finally:
+            contents.close()
+        if cache is not None:
+            cache.commit()
+        stats.seconds = time.time() - start
+        return results
+
+    def _parse_content(self, path, content, digest, blob=None):
+        try:
+            text = content.decode(self.encoding)
+        except UnicodeDecodeError as e:
+            self.stats.failed += 1
+            return FileResult(path, digest, 'failed', blob=blob, reason='not {0}: {1}'.format(self.encoding, e))
+        try:
+            tree = self.parser.parse_string(text, name=path,
+                                            max_tokens=self.max_tokens, max_seconds=self.max_seconds)
+        except BudgetExceeded as e:
+            self.stats.aborted += 1
+            return FileResult(path, digest, 'aborted', blob=blob, reason=e.reason)
+        if self.cache is not None and tree is not None:
+            self.cache.store(digest, tree)
+        self.stats.parsed += 1
+        return FileResult(path, digest, 'parsed', tree, blob=blob)
+
+    def _parse_file(self, path, firsts):
+        cache = self.cache
+        status = os.stat(path)
+        digest = content = None
+        if cache is not None:
+            recorded = cache.fingerprint(path)
+            if recorded is not None and recorded[:2] == (status.st_size, status.st_mtime) and recorded[2] in cache:
+                digest = recorded[2]
+        if digest is None:
+            with open(path, 'rb') as f:
+                content = f.read()
+            digest = hashlib.sha1(content).hexdigest()
+            if cache is not None:
+                cache.record(path, status.st_size, status.st_mtime, digest)
+        first = firsts.get(digest)
+        if first is not None:
+            self.stats.duplicates += 1
+            self.stats.duplicate_bytes += status.st_size
+            return FileResult(path, digest, 'duplicate', original=first)
+        if content is None or (cache is not None and digest in cache):
+            result = FileResult(path, digest, 'cached', cache=cache)
+            self.stats.cached += 1
+        else:
+            result = self._parse_content(path, content, digest)
+        firsts[digest] = result
+        return result
+
+
+class _Node(int):
+    # a reference to a node of a tree _dumps() flattened, by its index
+    __slots__ = ()
+
+
+def _dumps(tree):
+    # pickles tree as a list of (class, attributes) of its nodes in which
+    # the nodes they hold are _Nodes, since pickling nodes holding nodes
+    # recurses once for every level of the tree, past the recursion limit
+    # for one as deep as a long string concatenation
+    nodes = [tree]
+    indices = {id(tree): 0}
+
+    def flat(value):
+        if isinstance(value, SourceElement):
+            index = indices.get(id(value))
+            if index is None:
+                index = indices[id(value)] = len(nodes)
+                nodes.append(value)
+            return _Node(index)
+        if value.__class__ is list:
+            return [flat(element) for element in value]
+        if value.__class__ is dict:
+            return dict((key, flat(element)) for key, element in value.items())
+        return value
+    states = []
+    for node in nodes:
+        states.append((node.__class__, dict((name, flat(value)) for name, value in node.__dict__.items())))
+    return pickle.dumps(states, pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data):
+    states = pickle.loads(data)
+    nodes = [node_class.__new__(node_class) for node_class, _ in states]
+
+    def node(value):
+        if value.__class__ is _Node:
+            return nodes[value]
+        if value.__class__ is list:
+            return [node(element) for element in value]
+        if value.__class__ is dict:
+            return dict((key, node(element)) for key, element in value.items())
+        return value
+    for built, (_, state) in zip(nodes, states):
+        built.__dict__.update((name, node(value)) for name, value in state.items())
+    return nodes[0]
+
+
+def _git(repository, *args):
+    process = subprocess.Popen(('git', '-C', repository) + args, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error = process.communicate()
+    if process.returncode != 0:
+        raise ValueError('git {0} failed: {1}'.format(args[0], error.decode('utf-8', 'replace').strip()))
+    return output
+
+
+def _read_blobs(repository, blobs):
+    """
+    Yields the contents of blobs, a list of ids, in order. They are asked
+    for one by one from a single git process, which answers each before it
+    is asked for the next, so none is read before it is needed.
+    """
+    if not blobs:
+        return
+    process = subprocess.Popen(('git', '-C', repository, 'cat-file', '--batch'), stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for blob in blobs:
+            try:
+                process.stdin.write(blob + b'\n')
+                process.stdin.flush()
+                header = process.stdout.readline().split()
+            except (IOError, OSError):
+                # git has exited
+                header = None
+            if not header:
+                error = process.stderr.read()
+                raise ValueError('git cat-file failed: {0}'.format(error.decode('utf-8', 'replace').strip()))
+            if header[-1] == b'missing':
+                raise ValueError('git object {0} is missing'.format(header[0].decode('ascii')))
+            size = int(header[2])
+            content = process.stdout.read(size)
+            # the newline after the content
+            process.stdout.read(1)
+            yield content
+    finally:
+        try:
+            process.stdin.close()
+        except (IOError, OSError):
+            pass
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
@@ -0,0 +1,91 @@
+LEXICAL = 'lexical'
+SYNTAX = 'syntax'
+
+
+class ParseError(ValueError):
+
+    def __init__(self, diagnostic):
+        super(ParseError, self).__init__(str(diagnostic))
+        self.diagnostic = diagnostic
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised when a parse takes longer or reads more tokens than it was
+    allowed to: reason says which and offset is where in the source it was
+    abandoned.
+    """
+
+    def __init__(self, reason, offset):
+        super(BudgetExceeded, self).__init__(reason)
+        self.reason = reason
+        self.offset = offset
+
+
+class Diagnostic(object):
+    """
+    A problem found while lexing or parsing: its kind (LEXICAL or SYNTAX),
+    a message, where it was found as an offset into the source and as line
+    and column, and the text of the offending token (None at the end of the
+    input).
+    """
+
+    __slots__ = ('kind', 'message', 'offset', 'line', 'column', 'token')
+
+    def __init__(self, kind, message, offset, line, column, token=None):
+        self.kind = kind
+        self.message = message
+        self.offset = offset
+        self.line = line
+        self.column = column
+        self.token = token
+
+    def __repr__(self):
+        return 'Diagnostic({0!r}, {1!r}, offset={2!r}, line={3!r}, column={4!r}, token={5!r})'.format(
+            self.kind, self.message, self.offset, self.line, self.column, self.token)
+
+    def __str__(self):
+        return '{0}:{1}: {2} error: {3}'.format(self.line, self.column, self.kind, self.message)
+
+
+class Diagnostics(object):
+    """
+    The diagnostics of one parse in the order they were found. At most limit
+    of them are kept (all if limit is None); total counts every one. With
+    raise_on_error set the first one is raised as a ParseError instead.
+    """
+
+    def __init__(self, source_file=None, limit=None, raise_on_error=False):
+        self.source_file = source_file
+        self.limit = limit
+        self.raise_on_error = raise_on_error
+        self.records = []
+        self.total = 0
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def __repr__(self):
+        return 'Diagnostics({0!r}, total={1})'.format(self.records, self.total)
+
+    @property
+    def dropped(self):
+        return self.total - len(self.records)
+
+    def report(self, kind, message, offset, token=None):
+        self.total += 1
+        if not self.raise_on_error and self.limit is not None and len(self.records) >= self.limit:
+            return
+        line = column = None
+        if self.source_file is not None:
+            line, column = self.source_file.position(offset)
+        diagnostic = Diagnostic(kind, message, offset, line, column, token)
+        if self.raise_on_error:
+            raise ParseError(diagnostic)
+        self.records.append(diagnostic)
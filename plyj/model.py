@@ -1,3 +1,104 @@
+import array
+import bisect
+import heapq
+import re
+import types
+
+# attributes that describe where or how a node was parsed rather than what it is
+_NON_STRUCTURAL = ('_start', '_end', '_edits_applied', '_source', '_node_index', '_parse_options',
+                   '_diagnostics')
+
+_LINE_TERMINATOR = re.compile(r'\r\n|\r|\n')
+
+
+class SourceFile(object):
+    """
+    The text a tree was parsed from. Nodes only keep their start and end
+    offsets into it; line and column numbers are looked up in a table of
+    line start offsets that is built the first time one is asked for.
+    Unicode text is encoded with encoding when its bytes are asked for.
+    """
+
+    def __init__(self, text, name=None, first_line=1, encoding='utf-8'):
+        self.text = text
+        self.name = name
+        self.first_line = first_line
+        self.encoding = encoding
+        self._line_starts = None
+        self._buffer = None
+        # byte offset of every line start, None while offsets are the same
+        # for characters and bytes
+        self._line_byte_starts = None
+        # (start, end, delta) of every edit that moved the text after it
+        self._edits = []
+
+    def __repr__(self):
+        return 'SourceFile({0!r})'.format(self.name)
+
+    def __getstate__(self):
+        # the tables are rebuilt when needed and a memoryview cannot be pickled
+        state = self.__dict__.copy()
+        state['_line_starts'] = state['_buffer'] = state['_line_byte_starts'] = None
+        return state
+
+    def edit(self, start, end, text):
+        """
+        Replaces the text from start to end with text. Nodes parsed from the
+        text take the edit into account the next time their offsets are
+        used, rather than all of them being moved now.
+        """
+        self.text = self.text[:start] + text + self.text[end:]
+        self._line_starts = self._buffer = self._line_byte_starts = None
+        delta = len(text) - (end - start)
+        if delta:
+            self._edits.append((start, end, delta))
+
+    @property
+    def line_starts(self):
+        if self._line_starts is None:
+            starts = array.array('l', [0])
+            starts.extend(m.end() for m in _LINE_TERMINATOR.finditer(self.text))
+            self._line_starts = starts
+        return self._line_starts
+
+    def position(self, offset):
+        """Returns the (line, column) of offset, both counting from 1."""
+        starts = self.line_starts
+        line = bisect.bisect_right(starts, offset) - 1
+        return line + self.first_line, offset - starts[line] + 1
+
+    @property
+    def buffer(self):
+        """A memoryview of the source as bytes."""
+        if self._buffer is None:
+            if isinstance(self.text, bytes):
+                data = self.text
+            else:
+                data = self.text.encode(self.encoding)
+                if len(data) != len(self.text):
+                    self._line_byte_starts = self._byte_starts()
+            self._buffer = memoryview(data)
+        return self._buffer
+
+    def _byte_starts(self):
+        starts = self.line_starts
+        byte_starts = array.array('l', [0])
+        for i in range(1, len(starts)):
+            line = self.text[starts[i - 1]:starts[i]]
+            byte_starts.append(byte_starts[-1] + len(line.encode(self.encoding)))
+        return byte_starts
+
+    def byte_offset(self, offset):
+        """Returns the offset in buffer of the character at offset."""
+        buffer = self.buffer
+        if self._line_byte_starts is None:
+            return offset
+        starts = self.line_starts
+        line = bisect.bisect_right(starts, offset) - 1
+        head = self.text[starts[line]:offset].encode(self.encoding)
+        return self._line_byte_starts[line] + len(head)
+
+
 # Base node
 class SourceElement(object):
     '''
@@ -5,6 +106,16 @@ class SourceElement(object):
     file parsed by plyj.
     '''
     
+    # offsets of the first character of the element and of the one after it
+    # in the SourceFile it was parsed from; None for elements built by hand
+    _start = None
+    _end = None
+    _source = None
+    # how many of the edits of the SourceFile the offsets take into account
+    _edits_applied = 0
+    # the Diagnostics of the parse that returned it
+    _diagnostics = None
+
     def __init__(self):
         super(SourceElement, self).__init__()
         self._fields = []
@@ -17,38 +128,158 @@ class SourceElement(object):
         return "{0}({1})".format(self.__class__.__name__, args)
 
     def __eq__(self, other):
+        # positional information is not part of a node's identity
         try:
-            return self.__dict__ == other.__dict__
+            this, that = dict(self.__dict__), dict(other.__dict__)
         except AttributeError:
             return False
+        for name in _NON_STRUCTURAL:
+            this.pop(name, None)
+            that.pop(name, None)
+        return this == that
 
     def __ne__(self, other):
         return not self == other
 
+    @property
+    def start(self):
+        self._apply_edits()
+        return self._start
+
+    @property
+    def end(self):
+        self._apply_edits()
+        return self._end
+
+    def _apply_edits(self):
+        # moves the element past the text edits replaced before it, and its
+        # end past those it contains
+        source = self._source
+        if source is None or self._edits_applied == len(source._edits):
+            return
+        start, end = self._start, self._end
+        if start is not None:
+            for edit_start, edit_end, delta in source._edits[self._edits_applied:]:
+                if end <= edit_start:
+                    continue
+                if start >= edit_end:
+                    start += delta
+                end += delta
+            self._start, self._end = start, end
+        self._edits_applied = len(source._edits)
+
+    @property
+    def source_file(self):
+        return self._source
+
+    @property
+    def diagnostics(self):
+        """
+        The Diagnostics of the parse that returned this element: the
+        CompilationUnit of Parser.parse_string() and the result of
+        Parser.parse_expression() or parse_statement() have them, which
+        Parser.diagnostics only holds until the next parse. Errors found
+        later in lazily parsed bodies are added. None for other elements.
+        """
+        return self._diagnostics
+
+    @property
+    def lineno(self):
+        return self._position(self.start)[0]
+
+    @property
+    def column(self):
+        return self._position(self.start)[1]
+
+    @property
+    def end_lineno(self):
+        return self._position(self.end)[0]
+
+    @property
+    def end_column(self):
+        return self._position(self.end)[1]
+
+    def source_text(self):
+        """
+        Returns the text this element was parsed from, None if it was not
+        parsed. The text is sliced from the SourceFile, not printed from the
+        tree, so comments and formatting are kept as written.
+        """
+        if self.start is None or self._source is None:
+            return None
+        return self._source.text[self._start:self._end]
+
+    def source_bytes(self):
+        """
+        Like source_text() but returns a memoryview into the SourceFile's
+        buffer, which does not copy anything.
+        """
+        if self.start is None or self._source is None:
+            return None
+        source = self._source
+        return source.buffer[source.byte_offset(self._start):source.byte_offset(self._end)]
+
+    def _position(self, offset):
+        if offset is None or self._source is None:
+            return None, None
+        return self._source.position(offset)
+
     def accept(self, visitor):
         """
         default implementation that visit the subnodes in the order
         they are stored in self_field
         """
-        class_name = self.__class__.__name__
-        visit = getattr(visitor, 'visit_' + class_name)
-        if visit(self):
-            for f in self._fields:
-                field = getattr(self, f)
-                if field:
-                    if isinstance(field, list):
-                        for elem in field:
-                            if isinstance(elem, SourceElement):
-                                elem.accept(visitor)
-                    elif isinstance(field, SourceElement):
-                        field.accept(visitor)
-        getattr(visitor, 'leave_' + class_name)(self)
+        if isinstance(visitor, MultiVisitor):
+            _traverse_many(self, visitor)
+        else:
+            _traverse(self, visitor)
+
+    def walk(self, parents=False):
+        """
+        Yields this element and every element below it in pre-order. With
+        parents set (element, parent) pairs are yielded instead, the parent of
+        the element walk() was called on being None.
+        """
+        if parents:
+            return _walk_with_parents(self)
+        return _walk(self)
+
+    def find_all(self, *node_types, **kwargs):
+        """
+        Returns all elements of the given types at or below this element in
+        pre-order. Subtrees rooted at an element of one of the types passed as
+        prune are not descended into (the element itself is still matched).
+        """
+        prune = tuple(kwargs.pop('prune', ()))
+        if kwargs:
+            raise TypeError('unexpected keyword arguments: {}'.format(', '.join(kwargs)))
+        found = []
+        stack = [self]
+        pop = stack.pop
+        extend = stack.extend
+        while stack:
+            node = pop()
+            if isinstance(node, node_types):
+                found.append(node)
+            if prune and isinstance(node, prune):
+                continue
+            children = _children(node)
+            if children:
+                children.reverse()
+                extend(children)
+        return found
 
 
 class CompilationUnit(SourceElement):
 
+    # {node class: ([positions], [nodes])} when parsed with index=True, the
+    # nodes of each class in pre-order and their positions in it
+    _node_index = None
+    # the index, outline, lazy and omit of the parse_string() that built it
+    _parse_options = None
+
     def __init__(self, package_declaration=None, import_declarations=None,
-                 type_declarations=None,lineno=1):
+                 type_declarations=None):
         super(CompilationUnit, self).__init__()
         self._fields = [
             'package_declaration', 'import_declarations', 'type_declarations']
@@ -59,32 +290,46 @@ class CompilationUnit(SourceElement):
         self.package_declaration = package_declaration
         self.import_declarations = import_declarations
         self.type_declarations = type_declarations
-        self.lineno = lineno
+
+    def nodes_of_type(self, *node_types):
+        """
+        Returns all nodes of the given types (subclasses included) in this
+        compilation unit, in pre-order. If it was parsed with index=True the
+        answer comes from the index built by the parse and the tree is not
+        traversed; the index is not updated when the tree is modified.
+        Otherwise this is find_all(*node_types).
+        """
+        if self._node_index is None:
+            return self.find_all(*node_types)
+        found = [entry for node_class, entry in self._node_index.items()
+                 if issubclass(node_class, node_types)]
+        if len(found) == 1:
+            return list(found[0][1])
+        # the nodes of several classes, merged back into pre-order
+        return [node for _, node in heapq.merge(*[zip(positions, nodes) for positions, nodes in found])]
 class PackageDeclaration(SourceElement):
 
-    def __init__(self, name, modifiers=None,lineno=1):
+    def __init__(self, name, modifiers=None):
         super(PackageDeclaration, self).__init__()
         self._fields = ['name', 'modifiers']
         if modifiers is None:
             modifiers = []
         self.name = name
         self.modifiers = modifiers
-        self.lineno = lineno
 
 class ImportDeclaration(SourceElement):
 
     def __init__(self, name, static=False, on_demand=False):
-        super(ImportDeclaration, self,lineno=1).__init__()
+        super(ImportDeclaration, self).__init__()
         self._fields = ['name', 'static', 'on_demand']
         self.name = name
         self.static = static
         self.on_demand = on_demand
-        self.lineno = lineno
 
 class ClassDeclaration(SourceElement):
 
     def __init__(self, name, body, modifiers=None, type_parameters=None,
-                 extends=None, implements=None,lineno=1):
+                 extends=None, implements=None):
         super(ClassDeclaration, self).__init__()
         self._fields = ['name', 'body', 'modifiers',
                         'type_parameters', 'extends', 'implements']
@@ -100,20 +345,18 @@ class ClassDeclaration(SourceElement):
         self.type_parameters = type_parameters
         self.extends = extends
         self.implements = implements
-        self.lineno = lineno
 class ClassInitializer(SourceElement):
 
-    def __init__(self, block, static=False,lineno=1):
+    def __init__(self, block, static=False):
         super(ClassInitializer, self).__init__()
         self._fields = ['block', 'static']
         self.block = block
         self.static = static
-        self.lineno = lineno
 
 class ConstructorDeclaration(SourceElement):
 
     def __init__(self, name, block, modifiers=None, type_parameters=None,
-                 parameters=None, throws=None,lineno=1):
+                 parameters=None, throws=None):
         super(ConstructorDeclaration, self).__init__()
         self._fields = ['name', 'block', 'modifiers',
                         'type_parameters', 'parameters', 'throws']
@@ -129,14 +372,13 @@ class ConstructorDeclaration(SourceElement):
         self.type_parameters = type_parameters
         self.parameters = parameters
         self.throws = throws
-        self.lineno = lineno
 
 class EmptyDeclaration(SourceElement):
     pass
 
 class FieldDeclaration(SourceElement):
 
-    def __init__(self, type, variable_declarators, modifiers=None,lineno=1):
+    def __init__(self, type, variable_declarators, modifiers=None):
         super(FieldDeclaration, self).__init__()
         self._fields = ['type', 'variable_declarators', 'modifiers']
         if modifiers is None:
@@ -144,13 +386,12 @@ class FieldDeclaration(SourceElement):
         self.type = type
         self.variable_declarators = variable_declarators
         self.modifiers = modifiers
-        self.lineno = lineno
 
 class MethodDeclaration(SourceElement):
 
     def __init__(self, name, modifiers=None, type_parameters=None,
                  parameters=None, return_type='void', body=None, abstract=False,
-                 extended_dims=0, throws=None,lineno =1):
+                 extended_dims=0, throws=None):
         super(MethodDeclaration, self).__init__()
         self._fields = ['name', 'modifiers', 'type_parameters', 'parameters',
                         'return_type', 'body', 'abstract', 'extended_dims',
@@ -170,11 +411,10 @@ class MethodDeclaration(SourceElement):
         self.abstract = abstract
         self.extended_dims = extended_dims
         self.throws = throws
-        self.lineno = lineno
 
 class FormalParameter(SourceElement):
 
-    def __init__(self, variable, type, modifiers=None, vararg=False,lineno=1):
+    def __init__(self, variable, type, modifiers=None, vararg=False):
         super(FormalParameter, self).__init__()
         self._fields = ['variable', 'type', 'modifiers', 'vararg']
         if modifiers is None:
@@ -183,7 +423,6 @@ class FormalParameter(SourceElement):
         self.type = type
         self.modifiers = modifiers
         self.vararg = vararg
-        self.lineno = lineno
 
 
 class Variable(SourceElement):
@@ -194,35 +433,32 @@ class Variable(SourceElement):
     # If the variable is to go away, the type has to be duplicated for every
     # variable...
 
-    def __init__(self, name, dimensions=0,lineno=1):
+    def __init__(self, name, dimensions=0):
         super(Variable, self).__init__()
         self._fields = ['name', 'dimensions']
         self.name = name
         self.dimensions = dimensions
-        self.lineno = lineno
 
 
 class VariableDeclarator(SourceElement):
 
-    def __init__(self, variable, initializer=None,lineno=1):
+    def __init__(self, variable, initializer=None):
         super(VariableDeclarator, self).__init__()
         self._fields = ['variable', 'initializer']
         self.variable = variable
         self.initializer = initializer
-        self.lineno = lineno
 
 class Throws(SourceElement):
 
-    def __init__(self, types,lineno=1):
+    def __init__(self, types):
         super(Throws, self).__init__()
         self._fields = ['types']
         self.types = types
-        self.lineno = lineno
 
 class InterfaceDeclaration(SourceElement):
 
     def __init__(self, name, modifiers=None, extends=None, type_parameters=None,
-                 body=None,lineno=1):
+                 body=None):
         super(InterfaceDeclaration, self).__init__()
         self._fields = [
             'name', 'modifiers', 'extends', 'type_parameters', 'body']
@@ -239,12 +475,11 @@ class InterfaceDeclaration(SourceElement):
         self.extends = extends
         self.type_parameters = type_parameters
         self.body = body
-        self.lineno = lineno
 
 class EnumDeclaration(SourceElement):
 
     def __init__(self, name, implements=None, modifiers=None,
-                 type_parameters=None, body=None,lineno=1):
+                 type_parameters=None, body=None):
         super(EnumDeclaration, self).__init__()
         self._fields = [
             'name', 'implements', 'modifiers', 'type_parameters', 'body']
@@ -261,13 +496,12 @@ class EnumDeclaration(SourceElement):
         self.modifiers = modifiers
         self.type_parameters = type_parameters
         self.body = body
-        self.lineno = lineno
 
 class EnumConstant(SourceElement):
 
-    def __init__(self, name, arguments=None, modifiers=None, body=None,lineno=1):
+    def __init__(self, name, arguments=None, modifiers=None, body=None):
         super(EnumConstant, self).__init__()
-        self._fields = ['name', 'arguments', 'modifiers', 'body','lineno']
+        self._fields = ['name', 'arguments', 'modifiers', 'body']
         if arguments is None:
             arguments = []
         if modifiers is None:
@@ -278,16 +512,15 @@ class EnumConstant(SourceElement):
         self.arguments = arguments
         self.modifiers = modifiers
         self.body = body
-        self.lineno = lineno
 
 class AnnotationDeclaration(SourceElement):
 
     def __init__(self, name, modifiers=None, type_parameters=None, extends=None,
-                 implements=None, body=None,lineno=1):
+                 implements=None, body=None):
         super(AnnotationDeclaration, self).__init__()
         self._fields = [
             'name', 'modifiers', 'type_parameters', 'extends', 'implements',
-            'body','lineno']
+            'body']
         if modifiers is None:
             modifiers = []
         if type_parameters is None:
@@ -302,15 +535,14 @@ class AnnotationDeclaration(SourceElement):
         self.extends = extends
         self.implements = implements
         self.body = body
-        self.lineno = lineno
 
 class AnnotationMethodDeclaration(SourceElement):
 
     def __init__(self, name, type, parameters=None, default=None,
-                 modifiers=None, type_parameters=None, extended_dims=0,lineno=1):
+                 modifiers=None, type_parameters=None, extended_dims=0):
         super(AnnotationMethodDeclaration, self).__init__()
         self._fields = ['name', 'type', 'parameters', 'default',
-                        'modifiers', 'type_parameters', 'extended_dims','lineno']
+                        'modifiers', 'type_parameters', 'extended_dims']
         if parameters is None:
             parameters = []
         if modifiers is None:
@@ -324,62 +556,57 @@ class AnnotationMethodDeclaration(SourceElement):
         self.modifiers = modifiers
         self.type_parameters = type_parameters
         self.extended_dims = extended_dims
-        self.lineno = lineno
 
 class Annotation(SourceElement):
 
-    def __init__(self, name, members=None, single_member=None,lineno=1):
+    def __init__(self, name, members=None, single_member=None):
         super(Annotation, self).__init__()
-        self._fields = ['name', 'members', 'single_member','lineno']
+        self._fields = ['name', 'members', 'single_member']
         if members is None:
             members = []
         self.name = name
         self.members = members
         self.single_member = single_member
-        self.lineno = lineno
 
 
 class AnnotationMember(SourceElement):
 
-    def __init__(self, name, value,lineno=1):
+    def __init__(self, name, value):
         super(SourceElement, self).__init__()
-        self._fields = ['name', 'value','lineno']
+        self._fields = ['name', 'value']
         self.name = name
         self.value = value
-        self.lineno = lineno
 
 
 class Type(SourceElement):
 
     def __init__(self, name, type_arguments=None, enclosed_in=None,
-                 dimensions=0,lineno=1):
+                 dimensions=0):
         super(Type, self).__init__()
-        self._fields = ['name', 'type_arguments', 'enclosed_in', 'dimensions','lineno']
+        self._fields = ['name', 'type_arguments', 'enclosed_in', 'dimensions']
         if type_arguments is None:
             type_arguments = []
         self.name = name
         self.type_arguments = type_arguments
         self.enclosed_in = enclosed_in
         self.dimensions = dimensions
-        self.lineno = lineno
 
 
 class Wildcard(SourceElement):
 
-    def __init__(self, bounds=None,lineno=1):
+    def __init__(self, bounds=None):
         super(Wildcard, self).__init__()
-        self._fields = ['bounds','lineno']
+        self._fields = ['bounds']
         if bounds is None:
             bounds = []
         self.bounds = bounds
-        self.lineno = lineno
 
 
 class WildcardBound(SourceElement):
 
-    def __init__(self, type, extends=False, _super=False,lineno=1):
+    def __init__(self, type, extends=False, _super=False):
         super(WildcardBound, self).__init__()
-        self._fields = ['type', 'extends', '_super','lineno']
+        self._fields = ['type', 'extends', '_super']
         self.type = type
         self.extends = extends
         self._super = _super
@@ -387,32 +614,29 @@ class WildcardBound(SourceElement):
 
 class TypeParameter(SourceElement):
 
-    def __init__(self, name, extends=None,lineno=1):
+    def __init__(self, name, extends=None):
         super(TypeParameter, self).__init__()
-        self._fields = ['name', 'extends','lineno']
+        self._fields = ['name', 'extends']
         if extends is None:
             extends = []
         self.name = name
         self.extends = extends
-        self.lineno = lineno
 
 
 class Expression(SourceElement):
 
-    def __init__(self,lineno=1):
+    def __init__(self):
         super(Expression, self).__init__()
-        self._fields = ['lineno']
-        self.lineno = lineno
+        self._fields = []
 
 class BinaryExpression(Expression):
 
-    def __init__(self, operator, lhs, rhs,lineno=1):
+    def __init__(self, operator, lhs, rhs):
         super(BinaryExpression, self).__init__()
-        self._fields = ['operator', 'lhs', 'rhs','lineno']
+        self._fields = ['operator', 'lhs', 'rhs']
         self.operator = operator
         self.lhs = lhs
         self.rhs = rhs
-        self.lineno = lineno
 
 class Assignment(BinaryExpression):
     pass
@@ -420,13 +644,12 @@ class Assignment(BinaryExpression):
 
 class Conditional(Expression):
 
-    def __init__(self, predicate, if_true, if_false,lineno=1):
+    def __init__(self, predicate, if_true, if_false):
         super(self.__class__, self).__init__()
-        self._fields = ['predicate', 'if_true', 'if_false','lineno']
+        self._fields = ['predicate', 'if_true', 'if_false']
         self.predicate = predicate
         self.if_true = if_true
         self.if_false = if_false
-        self.lineno = lineno
 
 class ConditionalOr(BinaryExpression):
     pass
@@ -472,22 +695,20 @@ class Multiplicative(BinaryExpression):
 
 class Unary(Expression):
 
-    def __init__(self, sign, expression,lineno=1,lineno=1):
+    def __init__(self, sign, expression):
         super(Unary, self).__init__()
-        self._fields = ['sign', 'expression','lineno']
+        self._fields = ['sign', 'expression']
         self.sign = sign
         self.expression = expression
-        self.lineno = lineno
 
 
 class Cast(Expression):
 
-    def __init__(self, target, expression,lineno=1):
+    def __init__(self, target, expression):
         super(Cast, self).__init__()
-        self._fields = ['target', 'expression','lineno']
+        self._fields = ['target', 'expression']
         self.target = target
         self.expression = expression
-        self.lineno = lineno
 
 
 class Statement(SourceElement):
@@ -499,35 +720,96 @@ class Empty(Statement):
 
 class Block(Statement):
 
-    def __init__(self, statements=None,lineno=1):
+    def __init__(self, statements=None):
         super(Statement, self).__init__()
-        self._fields = ['statements','lineno','lineno']
+        self._fields = ['statements']
         if statements is None:
             statements = []
         self.statements = statements
-        self.lineno = lineno
 
     def __iter__(self):
         for s in self.statements:
             yield s
 
+class UnparsedBody(SourceElement):
+    # the body of a method, constructor or initializer, braces included, that
+    # an outline parse skipped; Parser.parse_body() parses it into a Block
+
+    def __init__(self):
+        super(UnparsedBody, self).__init__()
+        self._fields = []
+
+class LazyBlock(Block):
+    # A body a lazy parse skipped, in place of the Block of an initializer or
+    # the list of statements of a method or constructor, which it stands in
+    # for: it can be iterated, indexed and compared to a list. The statements
+    # are parsed the first time they are used and kept from then on, omitting
+    # what the parse that skipped the body omitted. Visitors, walk() and
+    # queries see what a full parse would have built: a Block, visited as
+    # one, or the statements of the list without a node of its own.
+
+    # the name of the handlers visiting it
+    _visited_as = 'Block'
+
+    def __init__(self, parser, diagnostics=None, omit=(), in_list=False):
+        super(LazyBlock, self).__init__()
+        # None until parsed
+        self._statements = None
+        self._parser = parser
+        self._diagnostics = diagnostics
+        self._omit = omit
+        # stands for a list of statements rather than a Block
+        self._in_list = in_list
+
+    @property
+    def statements(self):
+        if self._statements is None:
+            block = self._parser.parse_body(self, diagnostics=self._diagnostics, omit=self._omit)
+            self.statements = block.statements if block is not None else []
+        return self._statements
+
+    @statements.setter
+    def statements(self, statements):
+        self._statements = statements
+        self._parser = self._diagnostics = self._omit = None
+
+    @property
+    def parsed(self):
+        return self._statements is not None
+
+    def __len__(self):
+        return len(self.statements)
+
+    def __bool__(self):
+        # a Block is true even when empty, a list only when it is not
+        return not self._in_list or bool(self.statements)
+
+    __nonzero__ = __bool__
+
+    def __getitem__(self, index):
+        return self.statements[index]
+
+    def __eq__(self, other):
+        if isinstance(other, list):
+            return self.statements == other
+        return isinstance(other, Block) and self.statements == other.statements
+
 class VariableDeclaration(Statement, FieldDeclaration):
     pass
 
 class ArrayInitializer(SourceElement):
-    def __init__(self, elements=None,lineno=1):
+    def __init__(self, elements=None):
         super(ArrayInitializer, self).__init__()
-        self._fields = ['elements','lineno']
+        self._fields = ['elements']
         if elements is None:
             elements = []
         self.elements = elements
-        self.lineno = lineno
 
 
 class MethodInvocation(Expression):
-    def __init__(self, name, arguments=None, type_arguments=None, target=None,lineno=1):
+    def __init__(self, name, arguments=None, type_arguments=None, target=None):
         super(MethodInvocation, self).__init__()
-        self._fields = ['name', 'arguments', 'type_arguments', 'target','lineno']
+        self._fields = ['name', 'arguments', 'type_arguments', 'target']
         if arguments is None:
             arguments = []
         if type_arguments is None:
@@ -536,43 +818,39 @@ class MethodInvocation(Expression):
         self.arguments = arguments
         self.type_arguments = type_arguments
         self.target = target
-        self.lineno = lineno
 
 class IfThenElse(Statement):
 
-    def __init__(self, predicate, if_true=None, if_false=None,lineno=1):
+    def __init__(self, predicate, if_true=None, if_false=None):
         super(IfThenElse, self).__init__()
-        self._fields = ['predicate', 'if_true', 'if_false','lineno']
+        self._fields = ['predicate', 'if_true', 'if_false']
         self.predicate = predicate
         self.if_true = if_true
         self.if_false = if_false
-        self.lineno = lineno
 
 class While(Statement):
 
-    def __init__(self, predicate, body=None,lineno=1):
+    def __init__(self, predicate, body=None):
         super(While, self).__init__()
-        self._fields = ['predicate', 'body','lineno']
+        self._fields = ['predicate', 'body']
         self.predicate = predicate
         self.body = body
-        self.lineno = lineno
 
 class For(Statement):
 
-    def __init__(self, init, predicate, update, body,lineno=1):
+    def __init__(self, init, predicate, update, body):
         super(For, self).__init__()
-        self._fields = ['init', 'predicate', 'update', 'body','lineno','lineno']
+        self._fields = ['init', 'predicate', 'update', 'body']
         self.init = init
         self.predicate = predicate
         self.update = update
         self.body = body
-        self.lineno = lineno
 
 class ForEach(Statement):
 
-    def __init__(self, type, variable, iterable, body, modifiers=None,lineno=1):
+    def __init__(self, type, variable, iterable, body, modifiers=None):
         super(ForEach, self).__init__()
-        self._fields = ['type', 'variable', 'iterable', 'body', 'modifiers','lineno']
+        self._fields = ['type', 'variable', 'iterable', 'body', 'modifiers']
         if modifiers is None:
             modifiers = []
         self.type = type
@@ -580,100 +858,90 @@ class ForEach(Statement):
         self.iterable = iterable
         self.body = body
         self.modifiers = modifiers
-        self.lineno = lineno
 
 
 class Assert(Statement):
 
-    def __init__(self, predicate, message=None,lineno=1):
+    def __init__(self, predicate, message=None):
         super(Assert, self).__init__()
-        self._fields = ['predicate', 'message','lineno']
+        self._fields = ['predicate', 'message']
         self.predicate = predicate
         self.message = message
-        self.lineno = lineno
 
 
 class Switch(Statement):
 
-    def __init__(self, expression, switch_cases,lineno=1):
+    def __init__(self, expression, switch_cases):
         super(Switch, self).__init__()
-        self._fields = ['expression', 'switch_cases','lineno']
+        self._fields = ['expression', 'switch_cases']
         self.expression = expression
         self.switch_cases = switch_cases
-        self.lineno = lineno
 
 class SwitchCase(SourceElement):
 
-    def __init__(self, cases, body=None,lineno=1):
+    def __init__(self, cases, body=None):
         super(SwitchCase, self).__init__()
-        self._fields = ['cases', 'body','lineno']
+        self._fields = ['cases', 'body']
         if body is None:
             body = []
         self.cases = cases
         self.body = body
-        self.lineno = lineno
 
 class DoWhile(Statement):
 
-    def __init__(self, predicate, body=None,lineno=1,lineno=1):
+    def __init__(self, predicate, body=None):
         super(DoWhile, self).__init__()
-        self._fields = ['predicate', 'body','lineno']
+        self._fields = ['predicate', 'body']
         self.predicate = predicate
         self.body = body
-        self.lineno = lineno
 
 
 class Continue(Statement):
 
-    def __init__(self, label=None,lineno=1):
+    def __init__(self, label=None):
         super(Continue, self).__init__()
-        self._fields = ['label','lineno','lineno']
+        self._fields = ['label']
         self.label = label
-        self.lineno = lineno
 
 
 class Break(Statement):
 
-    def __init__(self, label=None,lineno=1):
+    def __init__(self, label=None):
         super(Break, self).__init__()
-        self._fields = ['label','lineno']
+        self._fields = ['label']
         self.label = label
-        self.lineno = lineno
 
 
 class Return(Statement):
 
-    def __init__(self, result=None,lineno=1):
+    def __init__(self, result=None):
         super(Return, self).__init__()
-        self._fields = ['result','lineno','lineno']
+        self._fields = ['result']
         self.result = result
-        self.lineno = lineno
 
 
 class Synchronized(Statement):
 
-    def __init__(self, monitor, body,lineno=1):
+    def __init__(self, monitor, body):
         super(Synchronized, self).__init__()
-        self._fields = ['monitor', 'body','lineno']
+        self._fields = ['monitor', 'body']
         self.monitor = monitor
         self.body = body
-        self.lineno = lineno
 
 
 class Throw(Statement):
 
-    def __init__(self, exception,lineno=1):
+    def __init__(self, exception):
         super(Throw, self).__init__()
-        self._fields = ['exception','lineno']
+        self._fields = ['exception']
         self.exception = exception
-        self.lineno = lineno
 
 
 class Try(Statement):
 
-    def __init__(self, block, catches=None, _finally=None, resources=None,lineno=1):
+    def __init__(self, block, catches=None, _finally=None, resources=None):
         super(Try, self).__init__()
-        self._fields = ['block', 'catches', '_finally', 'resources','lineno']
+        self._fields = ['block', 'catches', '_finally', 'resources']
         if catches is None:
             catches = []
         if resources is None:
@@ -682,23 +950,22 @@ class Try(Statement):
         self.catches = catches
         self._finally = _finally
         self.resources = resources
-        self.lineno = lineno
 
     def accept(self, visitor):
-        if visitor.visit_Try(self):
+        if _handlers(visitor, self.__class__)[0](visitor, self):
             for s in self.block:
                 s.accept(visitor)
         for c in self.catches:
-            visitor.visit_Catch(c)
+            _handlers(visitor, c.__class__)[0](visitor, c)
         if self._finally:
             self._finally.accept(visitor)
 
 
 class Catch(SourceElement):
 
-    def __init__(self, variable, modifiers=None, types=None, block=None,lineno=1):
+    def __init__(self, variable, modifiers=None, types=None, block=None):
         super(Catch, self).__init__()
-        self._fields = ['variable', 'modifiers', 'types', 'block','lineno']
+        self._fields = ['variable', 'modifiers', 'types', 'block']
         if modifiers is None:
             modifiers = []
         if types is None:
@@ -707,21 +974,19 @@ class Catch(SourceElement):
         self.modifiers = modifiers
         self.types = types
         self.block = block
-        self.lineno = lineno
 
 
 class Resource(SourceElement):
 
-    def __init__(self, variable, type=None, modifiers=None, initializer=None,lineno=1):
+    def __init__(self, variable, type=None, modifiers=None, initializer=None):
         super(Resource, self).__init__()
-        self._fields = ['variable', 'type', 'modifiers', 'initializer','lineno']
+        self._fields = ['variable', 'type', 'modifiers', 'initializer']
         if modifiers is None:
             modifiers = []
         self.variable = variable
         self.type = type
         self.modifiers = modifiers
         self.initializer = initializer
-        self.lineno = lineno
 
 
 class ConstructorInvocation(Statement):
@@ -730,9 +995,9 @@ class ConstructorInvocation(Statement):
     This is a variant of either this() or super(), NOT a "new" expression.
     """
 
-    def __init__(self, name, target=None, type_arguments=None, arguments=None,lineno=1):
+    def __init__(self, name, target=None, type_arguments=None, arguments=None):
         super(ConstructorInvocation, self).__init__()
-        self._fields = ['name', 'target', 'type_arguments', 'arguments','lineno','lineno']
+        self._fields = ['name', 'target', 'type_arguments', 'arguments']
         if type_arguments is None:
             type_arguments = []
         if arguments is None:
@@ -741,16 +1006,15 @@ class ConstructorInvocation(Statement):
         self.target = target
         self.type_arguments = type_arguments
         self.arguments = arguments
-        self.lineno = lineno
 
 
 class InstanceCreation(Expression):
 
     def __init__(self, type, type_arguments=None, arguments=None, body=None,
-                 enclosed_in=None,lineno=1):
+                 enclosed_in=None):
         super(InstanceCreation, self).__init__()
         self._fields = [
-            'type', 'type_arguments', 'arguments', 'body', 'enclosed_in','lineno']
+            'type', 'type_arguments', 'arguments', 'body', 'enclosed_in']
         if type_arguments is None:
             type_arguments = []
         if arguments is None:
@@ -762,67 +1026,60 @@ class InstanceCreation(Expression):
         self.arguments = arguments
         self.body = body
         self.enclosed_in = enclosed_in
-        self.lineno = lineno
 
 
 class FieldAccess(Expression):
 
-    def __init__(self, name, target,lineno=1):
+    def __init__(self, name, target):
         super(FieldAccess, self).__init__()
-        self._fields = ['name', 'target','lineno']
+        self._fields = ['name', 'target']
         self.name = name
         self.target = target
-        self.lineno = lineno
 
 
 class ArrayAccess(Expression):
 
-    def __init__(self, index, target,lineno=1):
+    def __init__(self, index, target):
         super(ArrayAccess, self).__init__()
-        self._fields = ['index', 'target','lineno']
+        self._fields = ['index', 'target']
         self.index = index
         self.target = target
-        self.lineno = lineno
 
 
 class ArrayCreation(Expression):
 
-    def __init__(self, type, dimensions=None, initializer=None,lineno=1):
+    def __init__(self, type, dimensions=None, initializer=None):
         super(ArrayCreation, self).__init__()
-        self._fields = ['type', 'dimensions', 'initializer','lineno']
+        self._fields = ['type', 'dimensions', 'initializer']
         if dimensions is None:
             dimensions = []
         self.type = type
         self.dimensions = dimensions
         self.initializer = initializer
-        self.lineno = lineno
 
 
 class Literal(SourceElement):
 
-    def __init__(self, value,lineno=1):
+    def __init__(self, value):
         super(Literal, self).__init__()
-        self._fields = ['value','lineno']
+        self._fields = ['value']
         self.value = value
-        self.lineno = lineno
 
 
 class ClassLiteral(SourceElement):
 
-    def __init__(self, type,lineno=1,lineno=1:
+    def __init__(self, type):
         super(ClassLiteral, self).__init__()
-        self._fields = ['type','lineno']
+        self._fields = ['type']
         self.type = type
-        self.lineno = lineno
 
 
 class Name(SourceElement):
 
-    def __init__(self, value,lineno=1):
+    def __init__(self, value):
         super(Name, self).__init__()
-        self._fields = ['value','lineno']
+        self._fields = ['value']
         self.value = value
-        self.lineno = lineno
 
     def append_name(self, name):
         try:
@@ -832,27 +1089,273 @@ class Name(SourceElement):
 
 
 class ExpressionStatement(Statement):
-    def __init__(self, expression,lineno=1):
+    def __init__(self, expression):
         super(ExpressionStatement, self).__init__()
-        self._fields = ['expression','lineno']
+        self._fields = ['expression']
         self.expression = expression
-        self.lineno = lineno
+
+
+class Erroneous(SourceElement):
+    # Source the parser skipped to recover from a syntax error, in place of a
+    # block statement, class body declaration or type declaration, or after
+    # the last type declaration of a compilation unit. body holds what could
+    # be parsed after the error: the statements of the block or the
+    # declarations of the class body that ended the skipped region.
+
+    def __init__(self, body=None):
+        super(Erroneous, self).__init__()
+        self._fields = ['body']
+        if body is None:
+            body = []
+        self.body = body
 
 
 class Visitor(object):
 
+    verbose = False
+
     def __init__(self, verbose=False):
         self.verbose = verbose
 
     def __getattr__(self, name):
-        if not (name.startswith('visit_') or name.startswith('leave_')):
-            raise AttributeError('name must start with visit_ or leave_ but was {}'
-                                 .format(name))
+        if name.startswith('visit_'):
+            return types.MethodType(_visit_unimplemented, self)
+        if name.startswith('leave_'):
+            return types.MethodType(_leave_unimplemented, self)
+        raise AttributeError('name must start with visit_ or leave_ but was {}'
+                             .format(name))
+
+
+class MultiVisitor(object):
+    """
+    Runs several visitors in a single traversal: element.accept(
+    MultiVisitor([a, b, c])) is equivalent to calling element.accept() with
+    a, b and c in turn. Each element is only dispatched to the visitors that
+    implement a handler for its class, and a visitor whose visit_ method
+    returns False only stops seeing that element's children; the others still
+    descend.
+    """
 
-        def f(element):
-            if self.verbose:
-                msg = 'unimplemented call to {}; ignoring ({})'
-                print(msg.format(name, element))
-            return True
-        return f
+    def __init__(self, visitors):
+        self.visitors = list(visitors)
+        # tuple of visitor indices -> _VisitorGroup
+        self._groups = {}
 
+    def _group(self, members):
+        group = self._groups.get(members)
+        if group is None:
+            group = self._groups[members] = _VisitorGroup(self, members)
+        return group
+
+
+class _VisitorGroup(object):
+    # The visitors that are still descending at some point of a traversal,
+    # along with their combined dispatch table for that set.
+
+    __slots__ = ('multi', 'members', 'table')
+
+    def __init__(self, multi, members):
+        self.multi = multi
+        self.members = members
+        # node class -> (visits, leaves, accept), visits and leaves being
+        # lists of (visitor index, handler) for implemented handlers only
+        self.table = {}
+
+    def handlers(self, node_class):
+        visitors = self.multi.visitors
+        visits = []
+        leaves = []
+        accept = None
+        for i in self.members:
+            visit, leave, accept = _handlers(visitors[i], node_class)
+            if visit is not _visit_unimplemented:
+                visits.append((i, visit))
+            if leave is not _leave_unimplemented:
+                leaves.append((i, leave))
+        handlers = self.table[node_class] = (visits, leaves, accept)
+        return handlers
+
+    def without(self, skipping):
+        return self.multi._group(tuple(i for i in self.members if i not in skipping))
+
+
+def _visit_unimplemented(visitor, element):
+    if visitor.verbose:
+        msg = 'unimplemented call to {}; ignoring ({})'
+        print(msg.format('visit_' + element.__class__.__name__, element))
+    return True
+
+
+def _leave_unimplemented(visitor, element):
+    if visitor.verbose:
+        msg = 'unimplemented call to {}; ignoring ({})'
+        print(msg.format('leave_' + element.__class__.__name__, element))
+
+
+def _handlers(visitor, node_class):
+    # (visit, leave, accept) for node_class; visit and leave are plain
+    # functions taking (visitor, element) so dispatch needs neither string
+    # building nor bound method allocation. accept is set for node classes
+    # that override SourceElement.accept. They are resolved again for every
+    # traversal, which keeps what it resolved in a table of its own, so
+    # handlers replaced on a visitor class in between are honored and no
+    # visitor class is kept alive.
+    name = getattr(node_class, '_visited_as', None) or node_class.__name__
+    # looked up in the class dictionaries: under Python 2 every access to
+    # node_class.accept makes a new unbound method, never the same object
+    accept = None
+    for klass in node_class.__mro__:
+        if 'accept' in klass.__dict__:
+            if klass is not SourceElement:
+                accept = klass.__dict__['accept']
+            break
+    return (_resolve_handler(visitor, 'visit_' + name, _visit_unimplemented),
+            _resolve_handler(visitor, 'leave_' + name, _leave_unimplemented),
+            accept)
+
+
+def _resolve_handler(visitor, name, default):
+    visitor_class = visitor.__class__
+    if name not in getattr(visitor, '__dict__', ()):
+        for klass in visitor_class.__mro__:
+            if name in klass.__dict__:
+                if isinstance(klass.__dict__[name], types.FunctionType):
+                    return klass.__dict__[name]
+                break
+        else:
+            if issubclass(visitor_class, Visitor):
+                return default
+
+    # handlers set on the instance, static methods, callables stored on the
+    # class or visitors that resolve handlers in their own __getattr__ are
+    # looked up on the instance
+    def handler(visitor, element):
+        return getattr(visitor, name)(element)
+    return handler
+
+
+def _traverse(root, visitor):
+    # Depth first traversal with an explicit stack so that arbitrarily deep
+    # trees (e.g. long left-deep string concatenations) do not hit the
+    # recursion limit. A pending leave handler is pushed right above the node
+    # it belongs to; handlers are the only functions ever put on the stack.
+    table = {}
+    stack = [root]
+    push = stack.append
+    pop = stack.pop
+    function = types.FunctionType
+    while stack:
+        node = pop()
+        cls = node.__class__
+        if cls is function:
+            node(visitor, pop())
+            continue
+        try:
+            visit, leave, accept = table[cls]
+        except KeyError:
+            visit, leave, accept = table[cls] = _handlers(visitor, cls)
+        if accept is not None:
+            accept(node, visitor)
+        elif visit(visitor, node):
+            push(node)
+            push(leave)
+            fields = node._fields
+            i = len(fields)
+            while i:
+                i -= 1
+                field = getattr(node, fields[i])
+                if field:
+                    if field.__class__ is LazyBlock and field._in_list:
+                        field = field.statements
+                    if field.__class__ is list:
+                        j = len(field)
+                        while j:
+                            j -= 1
+                            if isinstance(field[j], SourceElement):
+                                push(field[j])
+                    elif isinstance(field, SourceElement):
+                        push(field)
+        else:
+            leave(visitor, node)
+
+
+def _traverse_many(root, multi):
+    # Same scheme as _traverse but every pushed element is accompanied by the
+    # group of visitors that descend into it. A pending leave is pushed as a
+    # (leaves, element) tuple above the group it was visited with.
+    visitors = multi.visitors
+    # handlers are resolved again for every traversal, as in _traverse
+    multi._groups = {}
+    stack = [multi._group(tuple(range(len(visitors)))), root]
+    push = stack.append
+    pop = stack.pop
+    while stack:
+        node = pop()
+        if node.__class__ is tuple:
+            leaves, node = node
+            for i, leave in leaves:
+                leave(visitors[i], node)
+            continue
+        group = pop()
+        try:
+            visits, leaves, accept = group.table[node.__class__]
+        except KeyError:
+            visits, leaves, accept = group.handlers(node.__class__)
+        if accept is not None:
+            for i in group.members:
+                accept(node, visitors[i])
+            continue
+        skipping = None
+        for i, visit in visits:
+            if not visit(visitors[i], node):
+                if skipping is None:
+                    skipping = set()
+                skipping.add(i)
+        if leaves:
+            push((leaves, node))
+        if skipping is not None:
+            group = group.without(skipping)
+            if not group.members:
+                continue
+        children = _children(node)
+        i = len(children)
+        while i:
+            i -= 1
+            push(group)
+            push(children[i])
+
+
+def _children(node):
+    children = []
+    for f in node._fields:
+        field = getattr(node, f)
+        if field:
+            if field.__class__ is LazyBlock and field._in_list:
+                field = field.statements
+            if field.__class__ is list:
+                for elem in field:
+                    if isinstance(elem, SourceElement):
+                        children.append(elem)
+            elif isinstance(field, SourceElement):
+                children.append(field)
+    return children
+
+
+def _walk(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = _children(node)
+        children.reverse()
+        stack.extend(children)
+
+
+def _walk_with_parents(root):
+    stack = [(root, None)]
+    while stack:
+        node, parent = stack.pop()
+        yield node, parent
+        children = _children(node)
+        children.reverse()
+        stack.extend([(child, node) for child in children])
@@ -1,8 +1,20 @@
 #!/usr/bin/env python2
 
+import copy
+import itertools
+import io
+import multiprocessing
+import os
+import pickle
+import re
+import time
+import types
+
 import ply.lex as lex
 import ply.yacc as yacc
+from .diagnostics import BudgetExceeded, Diagnostics, ParseError, LEXICAL, SYNTAX
 from .model import *
+from .model import _children, _handlers, _walk
 
 class MyLexer(object):
 
@@ -35,7 +47,10 @@ class MyLexer(object):
 
         'PLUSPLUS', 'MINUSMINUS',
 
-        'ELLIPSIS'
+        'ELLIPSIS',
+
+        # a whole method body in an outline parse, see _outline_token_stream()
+        'BODY'
     ] + [k.upper() for k in keywords]
     literals = '()+-*/=?:,.^|&~!=[]{};<>@%'
 
@@ -92,12 +107,102 @@ class MyLexer(object):
 
     def t_newline2(self, t):
         r'(\r\n)+'
-        t.lexer.lineno += len(t.value) / 2
+        t.lexer.lineno += len(t.value) // 2
 
     def t_error(self, t):
-        print("Illegal character '{}' ({}) in line {}".format(t.value[0], hex(ord(t.value[0])), t.lexer.lineno))
+        char = t.value[0]
+        _reported_to(t.lexer).report(LEXICAL, 'illegal character {0} ({1})'.format(_quoted(char), hex(ord(char))),
+                                     t.lexpos, char)
         t.lexer.skip(1)
 
+
+def _new_lexer():
+    # a MyLexer with what the grammar's actions look for on it, which a
+    # Parser sets for each of its parses
+    lexer = lex.lex(module=MyLexer())
+    lexer.source_file = lexer.diagnostics = lexer.body_parser = lexer.omit = None
+    return lexer
+
+
+def _reported_to(lexer):
+    # the Diagnostics a Parser set on lexer for its parse; a lexer used on
+    # its own, or a Parser's between parses, keeps new ones
+    diagnostics = getattr(lexer, 'diagnostics', None)
+    if diagnostics is None:
+        diagnostics = lexer.diagnostics = Diagnostics()
+    return diagnostics
+
+
+def _quoted(text):
+    # repr() of text without the u prefix Python 2 gives unicode
+    quoted = repr(text)
+    return quoted[1:] if quoted[:1] == 'u' else quoted
+
+def _extent(symbols, first, last):
+    # start of the first and end of the last of symbols[first:last + 1] that
+    # did not derive the empty string
+    start = end = None
+    for i in range(first, last + 1):
+        start = symbols[i].lexpos
+        if start is not None:
+            break
+    for i in range(last, first - 1, -1):
+        end = getattr(symbols[i], 'endlexpos', symbols[i].lexpos)
+        if end is not None:
+            break
+    return start, end
+
+
+def _locate(p, node, first=1, last=None, trim=0):
+    # Positions node over the symbols first to last of the production being
+    # reduced, less trim characters at the end for the '>' of enclosing type
+    # arguments that a '>>' or '>>>' token shares with it. Actions call this
+    # for nodes other than p[0] and for nodes they extend; new nodes in p[0]
+    # are positioned by the Parser.
+    if not isinstance(node, SourceElement):
+        # made by a node factory
+        return node
+    start, end = _extent(p.slice, first, len(p) - 1 if last is None else last)
+    node._start = start
+    node._end = end if end is None else end - trim
+    node._source = p.lexer.source_file
+    return node
+
+_TRIVIA = re.compile(r'(?:\s+|//[^\r\n]*|/\*.*?\*/)*', re.DOTALL)
+
+
+def _locate_error(p, node, index=1, inside=False):
+    # Positions node over the source skipped to recover from the error at
+    # p.slice[index]. PLY forgets where that source began as it pops symbols
+    # off its stack; it began with the first token after the symbol that
+    # precedes the error. The node ends with the production or, inside
+    # braces, before the symbol following the error.
+    if not isinstance(node, SourceElement):
+        return node
+    after = 0
+    for symbol in reversed(list(p.stack) + p.slice[1:index]):
+        end = getattr(symbol, 'endlexpos', getattr(symbol, 'lexpos', None))
+        if end is not None:
+            after = end
+            break
+    text = p.lexer.lexdata
+    node._start = _TRIVIA.match(text, after).end()
+    if inside:
+        node._end = node._start + len(text[node._start:p.slice[index + 1].lexpos].rstrip())
+    else:
+        node._end = p.slice[-1].endlexpos
+    node._source = p.lexer.source_file
+    return node
+
+def _skipped_body(p, in_list):
+    # the node for a BODY token, see Parser.parse_string(); in_list for the
+    # body of a method or constructor, which is a list of statements
+    parser = p.lexer.body_parser
+    if parser is None:
+        return _locate(p, UnparsedBody())
+    return _locate(p, LazyBlock(parser, p.lexer.diagnostics, p.lexer.omit, in_list))
+
+
 class ExpressionParser(object):
 
     def p_expression(self, p):
@@ -143,7 +248,7 @@ class ExpressionParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = Conditional(p[1], p[3], p[5],lineno=p.lineno(0))
+            p[0] = Conditional(p[1], p[3], p[5])
 
     def p_conditional_expression_not_name(self, p):
         '''conditional_expression_not_name : conditional_or_expression_not_name
@@ -152,13 +257,13 @@ class ExpressionParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = Conditional(p[1], p[3], p[5],lineno=p.lineno(0))
+            p[0] = Conditional(p[1], p[3], p[5])
 
     def binop(self, p, ctor):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ctor(p[2], p[1], p[3],lineno=p.lineno(0))
+            p[0] = ctor(p[2], p[1], p[3])
 
     def p_conditional_or_expression(self, p):
         '''conditional_or_expression : conditional_and_expression
@@ -328,15 +433,15 @@ class ExpressionParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = Unary(p[1], p[2],lineno=p.lineno(0))
+            p[0] = Unary(p[1], p[2])
 
     def p_pre_increment_expression(self, p):
         '''pre_increment_expression : PLUSPLUS unary_expression'''
-        p[0] = Unary('++x', p[2],lineno=p.lineno(0))
+        p[0] = Unary('++x', p[2])
 
     def p_pre_decrement_expression(self, p):
         '''pre_decrement_expression : MINUSMINUS unary_expression'''
-        p[0] = Unary('--x', p[2],lineno=p.lineno(0))
+        p[0] = Unary('--x', p[2])
 
     def p_unary_expression_not_plus_minus(self, p):
         '''unary_expression_not_plus_minus : postfix_expression
@@ -346,7 +451,7 @@ class ExpressionParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = Unary(p[1], p[2],lineno=p.lineno(0))
+            p[0] = Unary(p[1], p[2])
 
     def p_unary_expression_not_plus_minus_not_name(self, p):
         '''unary_expression_not_plus_minus_not_name : postfix_expression_not_name
@@ -356,7 +461,7 @@ class ExpressionParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = Unary(p[1], p[2],lineno=p.lineno(0))
+            p[0] = Unary(p[1], p[2])
 
     def p_postfix_expression(self, p):
         '''postfix_expression : primary
@@ -373,11 +478,11 @@ class ExpressionParser(object):
 
     def p_post_increment_expression(self, p):
         '''post_increment_expression : postfix_expression PLUSPLUS'''
-        p[0] = Unary('x++', p[1],lineno=p.lineno(0))
+        p[0] = Unary('x++', p[1])
 
     def p_post_decrement_expression(self, p):
         '''post_decrement_expression : postfix_expression MINUSMINUS'''
-        p[0] = Unary('x--', p[1],lineno=p.lineno(0))
+        p[0] = Unary('x--', p[1])
 
     def p_primary(self, p):
         '''primary : primary_no_new_array
@@ -403,7 +508,7 @@ class ExpressionParser(object):
         '''primary_no_new_array : name '.' THIS
                                 | name '.' SUPER'''
         p[1].append_name(p[3])
-        p[0] = p[1]
+        p[0] = _locate(p, p[1])
 
     def p_primary_no_new_array4(self, p):
         '''primary_no_new_array : name '.' CLASS
@@ -411,9 +516,9 @@ class ExpressionParser(object):
                                 | primitive_type dims '.' CLASS
                                 | primitive_type '.' CLASS'''
         if len(p) == 4:
-            p[0] = ClassLiteral(Type(p[1]),lineno=p.lineno(0))
+            p[0] = ClassLiteral(_locate(p, Type(p[1]), 1, 1))
         else:
-            p[0] = ClassLiteral(Type(p[1], dimensions=p[2]),lineno=p.lineno(0))
+            p[0] = ClassLiteral(_locate(p, Type(p[1], dimensions=p[2]), 1, 2))
 
     def p_dims_opt(self, p):
         '''dims_opt : dims'''
@@ -441,27 +546,27 @@ class ExpressionParser(object):
 
     def p_cast_expression(self, p):
         '''cast_expression : '(' primitive_type dims_opt ')' unary_expression'''
-        p[0] = Cast(Type(p[2], dimensions=p[3]), p[5],lineno=p.lineno(0))
+        p[0] = Cast(_locate(p, Type(p[2], dimensions=p[3]), 2, 3), p[5])
 
     def p_cast_expression2(self, p):
         '''cast_expression : '(' name type_arguments dims_opt ')' unary_expression_not_plus_minus'''
-        p[0] = Cast(Type(p[2], type_arguments=p[3], dimensions=p[4]), p[6],lineno=p.lineno(0))
+        p[0] = Cast(_locate(p, Type(p[2], type_arguments=p[3], dimensions=p[4]), 2, 4), p[6])
 
     def p_cast_expression3(self, p):
         '''cast_expression : '(' name type_arguments '.' class_or_interface_type dims_opt ')' unary_expression_not_plus_minus'''
         p[5].dimensions = p[6]
-        p[5].enclosed_in = Type(p[2], type_arguments=p[3])
-        p[0] = Cast(p[5], p[8],lineno=p.lineno(0))
+        p[5].enclosed_in = _locate(p, Type(p[2], type_arguments=p[3]), 2, 3)
+        p[0] = Cast(_locate(p, p[5], 2, 6), p[8])
 
     def p_cast_expression4(self, p):
         '''cast_expression : '(' name ')' unary_expression_not_plus_minus'''
         # technically it's not necessarily a type but could be a type parameter
-        p[0] = Cast(Type(p[2]), p[4],lineno=p.lineno(0))
+        p[0] = Cast(_locate(p, Type(p[2]), 2, 2), p[4])
 
     def p_cast_expression5(self, p):
         '''cast_expression : '(' name dims ')' unary_expression_not_plus_minus'''
         # technically it's not necessarily a type but could be a type parameter
-        p[0] = Cast(Type(p[2], dimensions=p[3]), p[5],lineno=p.lineno(0))
+        p[0] = Cast(_locate(p, Type(p[2], dimensions=p[3]), 2, 3), p[5])
 
 class StatementParser(object):
 
@@ -469,6 +574,18 @@ class StatementParser(object):
         '''block : '{' block_statements_opt '}' '''
         p[0] = Block(p[2])
 
+    def p_block_error(self, p):
+        '''block : '{' error '}'
+                 | '{' block_statements error '}' '''
+        # typically a statement missing its ';'
+        statements = p[2] if len(p) == 5 else []
+        p[0] = Block(statements + [_locate_error(p, Erroneous(), len(p) - 2, inside=True)])
+
+    def p_block_outline(self, p):
+        '''block : BODY'''
+        # only ever the block of an initializer
+        p[0] = _skipped_body(p, False)
+
     def p_block_statements_opt(self, p):
         '''block_statements_opt : block_statements'''
         p[0] = p[1]
@@ -494,9 +611,17 @@ class StatementParser(object):
                            | enum_declaration'''
         p[0] = p[1]
 
+    def p_block_statement_error(self, p):
+        '''block_statement : error ';' '''
+        p[0] = _locate_error(p, Erroneous())
+
+    def p_block_statement_error2(self, p):
+        '''block_statement : error block'''
+        p[0] = _locate_error(p, Erroneous(body=p[2].statements))
+
     def p_local_variable_declaration_statement(self, p):
         '''local_variable_declaration_statement : local_variable_declaration ';' '''
-        p[0] = p[1]
+        p[0] = _locate(p, p[1])
 
     def p_local_variable_declaration(self, p):
         '''local_variable_declaration : type variable_declarators'''
@@ -518,13 +643,13 @@ class StatementParser(object):
         '''variable_declarator : variable_declarator_id
                                | variable_declarator_id '=' variable_initializer'''
         if len(p) == 2:
-            p[0] = VariableDeclarator(p[1],lineno=p.lineno(0))
+            p[0] = VariableDeclarator(p[1])
         else:
-            p[0] = VariableDeclarator(p[1], initializer=p[3],lineno=p.lineno(0))
+            p[0] = VariableDeclarator(p[1], initializer=p[3])
 
     def p_variable_declarator_id(self, p):
         '''variable_declarator_id : NAME dims_opt'''
-        p[0] = Variable(p[1], dimensions=p[2],lineno=p.lineno(0))
+        p[0] = Variable(p[1], dimensions=p[2])
 
     def p_variable_initializer(self, p):
         '''variable_initializer : expression
@@ -563,7 +688,7 @@ class StatementParser(object):
         if len(p) == 2:
             p[0] = p[1]
         else:
-            p[0] = ExpressionStatement(p[1],lineno=p.lineno(0))
+            p[0] = ExpressionStatement(p[1])
 
     def p_statement_expression(self, p):
         '''statement_expression : assignment
@@ -582,12 +707,12 @@ class StatementParser(object):
 
     def p_array_initializer(self, p):
         '''array_initializer : '{' comma_opt '}' '''
-        p[0] = ArrayInitializer(lineno=p.lineno(0))
+        p[0] = ArrayInitializer()
 
     def p_array_initializer2(self, p):
         '''array_initializer : '{' variable_initializers '}'
                              | '{' variable_initializers ',' '}' '''
-        p[0] = ArrayInitializer(p[2],lineno=p.lineno(0))
+        p[0] = ArrayInitializer(p[2])
 
     def p_variable_initializers(self, p):
         '''variable_initializers : variable_initializer
@@ -599,29 +724,29 @@ class StatementParser(object):
 
     def p_method_invocation(self, p):
         '''method_invocation : NAME '(' argument_list_opt ')' '''
-        p[0] = MethodInvocation(p[1], arguments=p[3],lineno=p.lineno(0))
+        p[0] = MethodInvocation(p[1], arguments=p[3])
 
     def p_method_invocation2(self, p):
         '''method_invocation : name '.' type_arguments NAME '(' argument_list_opt ')'
                              | primary '.' type_arguments NAME '(' argument_list_opt ')'
                              | SUPER '.' type_arguments NAME '(' argument_list_opt ')' '''
-        p[0] = MethodInvocation(p[4], target=p[1], type_arguments=p[3], arguments=p[6],lineno=p.lineno(0))
+        p[0] = MethodInvocation(p[4], target=p[1], type_arguments=p[3], arguments=p[6])
 
     def p_method_invocation3(self, p):
         '''method_invocation : name '.' NAME '(' argument_list_opt ')'
                              | primary '.' NAME '(' argument_list_opt ')'
                              | SUPER '.' NAME '(' argument_list_opt ')' '''
-        p[0] = MethodInvocation(p[3], target=p[1], arguments=p[5],lineno=p.lineno(0))
+        p[0] = MethodInvocation(p[3], target=p[1], arguments=p[5])
 
     def p_labeled_statement(self, p):
         '''labeled_statement : label ':' statement'''
         p[3].label = p[1]
-        p[0] = p[3]
+        p[0] = _locate(p, p[3])
 
     def p_labeled_statement_no_short_if(self, p):
         '''labeled_statement_no_short_if : label ':' statement_no_short_if'''
         p[3].label = p[1]
-        p[0] = p[3]
+        p[0] = _locate(p, p[3])
 
     def p_label(self, p):
         '''label : NAME'''
@@ -629,31 +754,31 @@ class StatementParser(object):
 
     def p_if_then_statement(self, p):
         '''if_then_statement : IF '(' expression ')' statement'''
-        p[0] = IfThenElse(p[3], p[5],lineno=p.lineno(0))
+        p[0] = IfThenElse(p[3], p[5])
 
     def p_if_then_else_statement(self, p):
         '''if_then_else_statement : IF '(' expression ')' statement_no_short_if ELSE statement'''
-        p[0] = IfThenElse(p[3], p[5], p[7],lineno=p.lineno(0))
+        p[0] = IfThenElse(p[3], p[5], p[7])
 
     def p_if_then_else_statement_no_short_if(self, p):
         '''if_then_else_statement_no_short_if : IF '(' expression ')' statement_no_short_if ELSE statement_no_short_if'''
-        p[0] = IfThenElse(p[3], p[5], p[7],lineno=p.lineno(0))
+        p[0] = IfThenElse(p[3], p[5], p[7])
 
     def p_while_statement(self, p):
         '''while_statement : WHILE '(' expression ')' statement'''
-        p[0] = While(p[3], p[5],lineno=p.lineno(0))
+        p[0] = While(p[3], p[5])
 
     def p_while_statement_no_short_if(self, p):
         '''while_statement_no_short_if : WHILE '(' expression ')' statement_no_short_if'''
-        p[0] = While(p[3], p[5],lineno=p.lineno(0))
+        p[0] = While(p[3], p[5])
 
     def p_for_statement(self, p):
         '''for_statement : FOR '(' for_init_opt ';' expression_opt ';' for_update_opt ')' statement'''
-        p[0] = For(p[3], p[5], p[7], p[9],lineno=p.lineno(0))
+        p[0] = For(p[3], p[5], p[7], p[9])
 
     def p_for_statement_no_short_if(self, p):
         '''for_statement_no_short_if : FOR '(' for_init_opt ';' expression_opt ';' for_update_opt ')' statement_no_short_if'''
-        p[0] = For(p[3], p[5], p[7], p[9],lineno=p.lineno(0))
+        p[0] = For(p[3], p[5], p[7], p[9])
 
     def p_for_init_opt(self, p):
         '''for_init_opt : for_init
@@ -689,11 +814,11 @@ class StatementParser(object):
 
     def p_enhanced_for_statement(self, p):
         '''enhanced_for_statement : enhanced_for_statement_header statement'''
-        p[0] = ForEach(p[1]['type'], p[1]['variable'], p[1]['iterable'], p[2], modifiers=p[1]['modifiers'],lineno=p.lineno(0))
+        p[0] = ForEach(p[1]['type'], p[1]['variable'], p[1]['iterable'], p[2], modifiers=p[1]['modifiers'])
 
     def p_enhanced_for_statement_no_short_if(self, p):
         '''enhanced_for_statement_no_short_if : enhanced_for_statement_header statement_no_short_if'''
-        p[0] = ForEach(p[1]['type'], p[1]['variable'], p[1]['iterable'], p[2], modifiers=p[1]['modifiers'],lineno=p.lineno(0))
+        p[0] = ForEach(p[1]['type'], p[1]['variable'], p[1]['iterable'], p[2], modifiers=p[1]['modifiers'])
 
     def p_enhanced_for_statement_header(self, p):
         '''enhanced_for_statement_header : enhanced_for_statement_header_init ':' expression ')' '''
@@ -702,11 +827,11 @@ class StatementParser(object):
 
     def p_enhanced_for_statement_header_init(self, p):
         '''enhanced_for_statement_header_init : FOR '(' type NAME dims_opt'''
-        p[0] = {'modifiers': [], 'type': p[3], 'variable': Variable(p[4], dimensions=p[5])}
+        p[0] = {'modifiers': [], 'type': p[3], 'variable': _locate(p, Variable(p[4], dimensions=p[5]), 4, 5)}
 
     def p_enhanced_for_statement_header_init2(self, p):
         '''enhanced_for_statement_header_init : FOR '(' modifiers type NAME dims_opt'''
-        p[0] = {'modifiers': p[3], 'type': p[4], 'variable': Variable(p[5], dimensions=p[6])}
+        p[0] = {'modifiers': p[3], 'type': p[4], 'variable': _locate(p, Variable(p[5], dimensions=p[6]), 5, 6)}
 
     def p_statement_no_short_if(self, p):
         '''statement_no_short_if : statement_without_trailing_substatement
@@ -721,9 +846,9 @@ class StatementParser(object):
         '''assert_statement : ASSERT expression ';'
                             | ASSERT expression ':' expression ';' '''
         if len(p) == 4:
-            p[0] = Assert(p[2],lineno=p.lineno(0))
+            p[0] = Assert(p[2])
         else:
-            p[0] = Assert(p[2], message=p[4],lineno=p.lineno(0))
+            p[0] = Assert(p[2], message=p[4])
 
     def p_empty_statement(self, p):
         '''empty_statement : ';' '''
@@ -731,7 +856,7 @@ class StatementParser(object):
 
     def p_switch_statement(self, p):
         '''switch_statement : SWITCH '(' expression ')' switch_block'''
-        p[0] = Switch(p[3], p[5],lineno=p.lineno(0))
+        p[0] = Switch(p[3], p[5])
 
     def p_switch_block(self, p):
         '''switch_block : '{' '}' '''
@@ -743,11 +868,11 @@ class StatementParser(object):
 
     def p_switch_block3(self, p):
         '''switch_block : '{' switch_labels '}' '''
-        p[0] = [SwitchCase(p[2])]
+        p[0] = [_locate(p, SwitchCase(p[2]), 2, 2)]
 
     def p_switch_block4(self, p):
         '''switch_block : '{' switch_block_statements switch_labels '}' '''
-        p[0] = p[2] + [SwitchCase(p[3])]
+        p[0] = p[2] + [_locate(p, SwitchCase(p[3]), 3, 3)]
 
     def p_switch_block_statements(self, p):
         '''switch_block_statements : switch_block_statement
@@ -759,7 +884,7 @@ class StatementParser(object):
 
     def p_switch_block_statement(self, p):
         '''switch_block_statement : switch_labels block_statements'''
-        p[0] = SwitchCase(p[1], body=p[2],lineno=p.lineno(0))
+        p[0] = SwitchCase(p[1], body=p[2])
 
     def p_switch_labels(self, p):
         '''switch_labels : switch_label
@@ -783,7 +908,7 @@ class StatementParser(object):
 
     def p_do_statement(self, p):
         '''do_statement : DO statement WHILE '(' expression ')' ';' '''
-        p[0] = DoWhile(p[5], body=p[2],lineno=p.lineno(0))
+        p[0] = DoWhile(p[5], body=p[2])
 
     def p_break_statement(self, p):
         '''break_statement : BREAK ';'
@@ -803,23 +928,23 @@ class StatementParser(object):
 
     def p_return_statement(self, p):
         '''return_statement : RETURN expression_opt ';' '''
-        p[0] = Return(p[2],lineno=p.lineno(0))
+        p[0] = Return(p[2])
 
     def p_synchronized_statement(self, p):
         '''synchronized_statement : SYNCHRONIZED '(' expression ')' block'''
-        p[0] = Synchronized(p[3], p[5],lineno=p.lineno(0))
+        p[0] = Synchronized(p[3], p[5])
 
     def p_throw_statement(self, p):
         '''throw_statement : THROW expression ';' '''
-        p[0] = Throw(p[2],lineno=p.lineno(0))
+        p[0] = Throw(p[2])
 
     def p_try_statement(self, p):
         '''try_statement : TRY try_block catches
                          | TRY try_block catches_opt finally'''
         if len(p) == 4:
-            p[0] = Try(p[2], catches=p[3],lineno=p.lineno(0))
+            p[0] = Try(p[2], catches=p[3])
         else:
-            p[0] = Try(p[2], catches=p[3], _finally=p[4],lineno=p.lineno(0))
+            p[0] = Try(p[2], catches=p[3], _finally=p[4])
 
     def p_try_block(self, p):
         '''try_block : block'''
@@ -843,7 +968,7 @@ class StatementParser(object):
 
     def p_catch_clause(self, p):
         '''catch_clause : CATCH '(' catch_formal_parameter ')' block'''
-        p[0] = Catch(p[3]['variable'], types=p[3]['types'], modifiers=p[3]['modifiers'], block=p[5],lineno=p.lineno(0))
+        p[0] = Catch(p[3]['variable'], types=p[3]['types'], modifiers=p[3]['modifiers'], block=p[5])
 
     def p_catch_formal_parameter(self, p):
         '''catch_formal_parameter : modifiers_opt catch_type variable_declarator_id'''
@@ -865,9 +990,9 @@ class StatementParser(object):
         '''try_statement_with_resources : TRY resource_specification try_block catches_opt
                                         | TRY resource_specification try_block catches_opt finally'''
         if len(p) == 5:
-            p[0] = Try(p[3], resources=p[2], catches=p[4],lineno=p.lineno(0))
+            p[0] = Try(p[3], resources=p[2], catches=p[4])
         else:
-            p[0] = Try(p[3], resources=p[2], catches=p[4], _finally=p[5],lineno=p.lineno(0))
+            p[0] = Try(p[3], resources=p[2], catches=p[4], _finally=p[5])
 
     def p_resource_specification(self, p):
         '''resource_specification : '(' resources semi_opt ')' '''
@@ -892,11 +1017,11 @@ class StatementParser(object):
 
     def p_resource(self, p):
         '''resource : type variable_declarator_id '=' variable_initializer'''
-        p[0] = Resource(p[2], type=p[1], initializer=p[4],lineno=p.lineno(0))
+        p[0] = Resource(p[2], type=p[1], initializer=p[4])
 
     def p_resource2(self, p):
         '''resource : modifiers type variable_declarator_id '=' variable_initializer'''
-        p[0] = Resource(p[3], type=p[2], modifiers=p[1], initializer=p[5],lineno=p.lineno(0))
+        p[0] = Resource(p[3], type=p[2], modifiers=p[1], initializer=p[5])
 
     def p_finally(self, p):
         '''finally : FINALLY block'''
@@ -905,50 +1030,50 @@ class StatementParser(object):
     def p_explicit_constructor_invocation(self, p):
         '''explicit_constructor_invocation : THIS '(' argument_list_opt ')' ';'
                                            | SUPER '(' argument_list_opt ')' ';' '''
-        p[0] = ConstructorInvocation(p[1], arguments=p[3],lineno=p.lineno(0))
+        p[0] = ConstructorInvocation(p[1], arguments=p[3])
 
     def p_explicit_constructor_invocation2(self, p):
         '''explicit_constructor_invocation : type_arguments SUPER '(' argument_list_opt ')' ';'
                                            | type_arguments THIS '(' argument_list_opt ')' ';' '''
-        p[0] = ConstructorInvocation(p[2], type_arguments=p[1], arguments=p[4],lineno=p.lineno(0))
+        p[0] = ConstructorInvocation(p[2], type_arguments=p[1], arguments=p[4])
 
     def p_explicit_constructor_invocation3(self, p):
         '''explicit_constructor_invocation : primary '.' SUPER '(' argument_list_opt ')' ';'
                                            | name '.' SUPER '(' argument_list_opt ')' ';'
                                            | primary '.' THIS '(' argument_list_opt ')' ';'
                                            | name '.' THIS '(' argument_list_opt ')' ';' '''
-        p[0] = ConstructorInvocation(p[3], target=p[1], arguments=p[5],lineno=p.lineno(0))
+        p[0] = ConstructorInvocation(p[3], target=p[1], arguments=p[5])
 
     def p_explicit_constructor_invocation4(self, p):
         '''explicit_constructor_invocation : primary '.' type_arguments SUPER '(' argument_list_opt ')' ';'
                                            | name '.' type_arguments SUPER '(' argument_list_opt ')' ';'
                                            | primary '.' type_arguments THIS '(' argument_list_opt ')' ';'
                                            | name '.' type_arguments THIS '(' argument_list_opt ')' ';' '''
-        p[0] = ConstructorInvocation(p[4], target=p[1], type_arguments=p[3], arguments=p[6],lineno=p.lineno(0))
+        p[0] = ConstructorInvocation(p[4], target=p[1], type_arguments=p[3], arguments=p[6])
 
     def p_class_instance_creation_expression(self, p):
         '''class_instance_creation_expression : NEW type_arguments class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[3], type_arguments=p[3], arguments=p[5], body=p[7],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[3], type_arguments=p[3], arguments=p[5], body=p[7])
 
     def p_class_instance_creation_expression2(self, p):
         '''class_instance_creation_expression : NEW class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[2], arguments=p[4], body=p[6],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[2], arguments=p[4], body=p[6])
 
     def p_class_instance_creation_expression3(self, p):
         '''class_instance_creation_expression : primary '.' NEW type_arguments class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[5], enclosed_in=p[1], type_arguments=p[4], arguments=p[7], body=p[9],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[5], enclosed_in=p[1], type_arguments=p[4], arguments=p[7], body=p[9])
 
     def p_class_instance_creation_expression4(self, p):
         '''class_instance_creation_expression : primary '.' NEW class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[4], enclosed_in=p[1], arguments=p[6], body=p[8],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[4], enclosed_in=p[1], arguments=p[6], body=p[8])
 
     def p_class_instance_creation_expression5(self, p):
         '''class_instance_creation_expression : class_instance_creation_expression_name NEW class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[3], enclosed_in=p[1], arguments=p[5], body=p[7],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[3], enclosed_in=p[1], arguments=p[5], body=p[7])
 
     def p_class_instance_creation_expression6(self, p):
         '''class_instance_creation_expression : class_instance_creation_expression_name NEW type_arguments class_type '(' argument_list_opt ')' class_body_opt'''
-        p[0] = InstanceCreation(p[4], enclosed_in=p[1], type_arguments=p[3], arguments=p[6], body=p[8],lineno=p.lineno(0))
+        p[0] = InstanceCreation(p[4], enclosed_in=p[1], type_arguments=p[3], arguments=p[6], body=p[8])
 
     def p_class_instance_creation_expression_name(self, p):
         '''class_instance_creation_expression_name : name '.' '''
@@ -962,18 +1087,18 @@ class StatementParser(object):
     def p_field_access(self, p):
         '''field_access : primary '.' NAME
                         | SUPER '.' NAME'''
-        p[0] = FieldAccess(p[3], p[1],lineno=p.lineno(0))
+        p[0] = FieldAccess(p[3], p[1])
 
     def p_array_access(self, p):
         '''array_access : name '[' expression ']'
                         | primary_no_new_array '[' expression ']'
                         | array_creation_with_array_initializer '[' expression ']' '''
-        p[0] = ArrayAccess(p[3], p[1],lineno=p.lineno(0))
+        p[0] = ArrayAccess(p[3], p[1])
 
     def p_array_creation_with_array_initializer(self, p):
         '''array_creation_with_array_initializer : NEW primitive_type dim_with_or_without_exprs array_initializer
                                                  | NEW class_or_interface_type dim_with_or_without_exprs array_initializer'''
-        p[0] = ArrayCreation(p[2], dimensions=p[3], initializer=p[4],lineno=p.lineno(0))
+        p[0] = ArrayCreation(p[2], dimensions=p[3], initializer=p[4])
 
     def p_dim_with_or_without_exprs(self, p):
         '''dim_with_or_without_exprs : dim_with_or_without_expr
@@ -994,7 +1119,7 @@ class StatementParser(object):
     def p_array_creation_without_array_initializer(self, p):
         '''array_creation_without_array_initializer : NEW primitive_type dim_with_or_without_exprs
                                                     | NEW class_or_interface_type dim_with_or_without_exprs'''
-        p[0] = ArrayCreation(p[2], dimensions=p[3],lineno=p.lineno(0))
+        p[0] = ArrayCreation(p[2], dimensions=p[3])
 
 class NameParser(object):
 
@@ -1005,12 +1130,12 @@ class NameParser(object):
 
     def p_simple_name(self, p):
         '''simple_name : NAME'''
-        p[0] = Name(p[1],lineno=p.lineno(0))
+        p[0] = Name(p[1])
 
     def p_qualified_name(self, p):
         '''qualified_name : name '.' simple_name'''
         p[1].append_name(p[3])
-        p[0] = p[1]
+        p[0] = _locate(p, p[1])
 
 class LiteralParser(object):
 
@@ -1021,7 +1146,7 @@ class LiteralParser(object):
                    | TRUE
                    | FALSE
                    | NULL'''
-        p[0] = Literal(p[1],lineno=p.lineno(0))
+        p[0] = Literal(p[1])
 
 class TypeParser(object):
 
@@ -1091,18 +1216,18 @@ class TypeParser(object):
         '''class_or_interface : name
                               | generic_type '.' name'''
         if len(p) == 2:
-            p[0] = Type(p[1],lineno=p.lineno(0))
+            p[0] = Type(p[1])
         else:
-            p[0] = Type(p[3], enclosed_in=p[1],lineno=p.lineno(0))
+            p[0] = Type(p[3], enclosed_in=p[1])
 
     def p_generic_type(self, p):
         '''generic_type : class_or_interface type_arguments'''
         p[1].type_arguments = p[2]
-        p[0] = p[1]
+        p[0] = _locate(p, p[1])
 
     def p_generic_type2(self, p):
         '''generic_type : class_or_interface '<' '>' '''
-        p[0] = Type(p[1], type_arguments='diamond',lineno=p.lineno(0))
+        p[0] = Type(p[1], type_arguments='diamond')
 
 #    def p_array_type(self, p):
 #        '''array_type : primitive_type dims
@@ -1118,16 +1243,16 @@ class TypeParser(object):
     def p_array_type(self, p):
         '''array_type : primitive_type dims
                       | name dims'''
-        p[0] = Type(p[1], dimensions=p[2],lineno=p.lineno(0))
+        p[0] = Type(p[1], dimensions=p[2])
 
     def p_array_type2(self, p):
         '''array_type : generic_type dims'''
         p[1].dimensions = p[2]
-        p[0] = p[1]
+        p[0] = _locate(p, p[1])
 
     def p_array_type3(self, p):
         '''array_type : generic_type '.' name dims'''
-        p[0] = Type(p[3], enclosed_in=p[1], dimensions=p[4],lineno=p.lineno(0))
+        p[0] = Type(p[3], enclosed_in=p[1], dimensions=p[4])
 
     def p_type_arguments(self, p):
         '''type_arguments : '<' type_argument_list1'''
@@ -1165,8 +1290,9 @@ class TypeParser(object):
         if len(p) == 3:
             p[0] = p[1]
         else:
+            # the last '>' closes the enclosing type arguments
             p[1].type_arguments = p[3]
-            p[0] = p[1]
+            p[0] = _locate(p, p[1], trim=1)
 
     def p_type_argument_list2(self, p):
         '''type_argument_list2 : type_argument2
@@ -1188,7 +1314,7 @@ class TypeParser(object):
             p[0] = p[1]
         else:
             p[1].type_arguments = p[3]
-            p[0] = p[1]
+            p[0] = _locate(p, p[1], trim=2)
 
     def p_type_argument_list3(self, p):
         '''type_argument_list3 : type_argument3
@@ -1211,65 +1337,65 @@ class TypeParser(object):
         '''wildcard : '?'
                     | '?' wildcard_bounds'''
         if len(p) == 2:
-            p[0] = Wildcard(lineno=p.lineno(0))
+            p[0] = Wildcard()
         else:
-            p[0] = Wildcard(bounds=p[2],lineno=p.lineno(0))
+            p[0] = Wildcard(bounds=p[2])
 
     def p_wildcard_bounds(self, p):
         '''wildcard_bounds : EXTENDS reference_type
                            | SUPER reference_type'''
         if p[1] == 'extends':
-            p[0] = WildcardBound(p[2], extends=True,lineno=p.lineno(0))
+            p[0] = WildcardBound(p[2], extends=True)
         else:
-            p[0] = WildcardBound(p[2], _super=True,lineno=p.lineno(0))
+            p[0] = WildcardBound(p[2], _super=True)
 
     def p_wildcard1(self, p):
         '''wildcard1 : '?' '>'
                      | '?' wildcard_bounds1'''
         if p[2] == '>':
-            p[0] = Wildcard(lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(), 1, 1)
         else:
-            p[0] = Wildcard(bounds=p[2],lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(bounds=p[2]), trim=1)
 
     def p_wildcard_bounds1(self, p):
         '''wildcard_bounds1 : EXTENDS reference_type1
                             | SUPER reference_type1'''
         if p[1] == 'extends':
-            p[0] = WildcardBound(p[2], extends=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], extends=True), trim=1)
         else:
-            p[0] = WildcardBound(p[2], _super=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], _super=True), trim=1)
 
     def p_wildcard2(self, p):
         '''wildcard2 : '?' RSHIFT
                      | '?' wildcard_bounds2'''
         if p[2] == '>>':
-            p[0] = Wildcard(lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(), 1, 1)
         else:
-            p[0] = Wildcard(bounds=p[2],lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(bounds=p[2]), trim=2)
 
     def p_wildcard_bounds2(self, p):
         '''wildcard_bounds2 : EXTENDS reference_type2
                             | SUPER reference_type2'''
         if p[1] == 'extends':
-            p[0] = WildcardBound(p[2], extends=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], extends=True), trim=2)
         else:
-            p[0] = WildcardBound(p[2], _super=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], _super=True), trim=2)
 
     def p_wildcard3(self, p):
         '''wildcard3 : '?' RRSHIFT
                      | '?' wildcard_bounds3'''
         if p[2] == '>>>':
-            p[0] = Wildcard(lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(), 1, 1)
         else:
-            p[0] = Wildcard(bounds=p[2],lineno=p.lineno(0))
+            p[0] = _locate(p, Wildcard(bounds=p[2]), trim=3)
 
     def p_wildcard_bounds3(self, p):
         '''wildcard_bounds3 : EXTENDS reference_type3
                             | SUPER reference_type3'''
         if p[1] == 'extends':
-            p[0] = WildcardBound(p[2], extends=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], extends=True), trim=3)
         else:
-            p[0] = WildcardBound(p[2], _super=True,lineno=p.lineno(0))
+            p[0] = _locate(p, WildcardBound(p[2], _super=True), trim=3)
 
     def p_type_parameter_header(self, p):
         '''type_parameter_header : NAME'''
@@ -1294,9 +1420,9 @@ class TypeParser(object):
         if len(p) == 2:
             p[0] = TypeParameter(p[1])
         elif len(p) == 4:
-            p[0] = TypeParameter(p[1], extends=[p[3]],lineno=p.lineno(0))
+            p[0] = TypeParameter(p[1], extends=[p[3]])
         else:
-            p[0] = TypeParameter(p[1], extends=[p[3]] + p[4],lineno=p.lineno(0))
+            p[0] = TypeParameter(p[1], extends=[p[3]] + p[4])
 
     def p_additional_bound_list(self, p):
         '''additional_bound_list : additional_bound
@@ -1322,12 +1448,13 @@ class TypeParser(object):
         '''type_parameter1 : type_parameter_header '>'
                            | type_parameter_header EXTENDS reference_type1
                            | type_parameter_header EXTENDS reference_type additional_bound_list1'''
+        # the last '>' closes the type parameters
         if len(p) == 3:
-            p[0] = TypeParameter(p[1],lineno=p.lineno(0))
+            p[0] = _locate(p, TypeParameter(p[1]), 1, 1)
         elif len(p) == 4:
-            p[0] = TypeParameter(p[1], extends=[p[3]],lineno=p.lineno(0))
+            p[0] = _locate(p, TypeParameter(p[1], extends=[p[3]]), trim=1)
         else:
-            p[0] = TypeParameter(p[1], extends=[p[3]] + p[4],lineno=p.lineno(0))
+            p[0] = _locate(p, TypeParameter(p[1], extends=[p[3]] + p[4]), trim=1)
 
     def p_additional_bound_list1(self, p):
         '''additional_bound_list1 : additional_bound1
@@ -1354,11 +1481,19 @@ class ClassParser(object):
         '''type_declaration : ';' '''
         p[0] = EmptyDeclaration()
 
+    def p_type_declaration_error(self, p):
+        '''type_declaration : error ';' '''
+        p[0] = _locate_error(p, Erroneous())
+
+    def p_type_declaration_error2(self, p):
+        '''type_declaration : error class_body'''
+        p[0] = _locate_error(p, Erroneous(body=p[2]))
+
     def p_class_declaration(self, p):
         '''class_declaration : class_header class_body'''
         p[0] = ClassDeclaration(p[1]['name'], p[2], modifiers=p[1]['modifiers'],
                                 extends=p[1]['extends'], implements=p[1]['implements'],
-                                type_parameters=p[1]['type_parameters'],lineno=p.lineno(0))
+                                type_parameters=p[1]['type_parameters'])
 
     def p_class_header(self, p):
         '''class_header : class_header_name class_header_extends_opt class_header_implements_opt'''
@@ -1413,6 +1548,12 @@ class ClassParser(object):
         '''class_body : '{' class_body_declarations_opt '}' '''
         p[0] = p[2]
 
+    def p_class_body_error(self, p):
+        '''class_body : '{' error '}'
+                      | '{' class_body_declarations error '}' '''
+        declarations = p[2] if len(p) == 5 else []
+        p[0] = declarations + [_locate_error(p, Erroneous(), len(p) - 2, inside=True)]
+
     def p_class_body_declarations_opt(self, p):
         '''class_body_declarations_opt : class_body_declarations'''
         p[0] = p[1]
@@ -1439,6 +1580,14 @@ class ClassParser(object):
         '''class_body_declaration : block'''
         p[0] = ClassInitializer(p[1])
 
+    def p_class_body_declaration_error(self, p):
+        '''class_body_declaration : error ';' '''
+        p[0] = _locate_error(p, Erroneous())
+
+    def p_class_body_declaration_error2(self, p):
+        '''class_body_declaration : error block'''
+        p[0] = _locate_error(p, Erroneous(body=p[2].statements))
+
     def p_class_member_declaration(self, p):
         '''class_member_declaration : field_declaration
                                     | class_declaration
@@ -1450,21 +1599,21 @@ class ClassParser(object):
 
     def p_class_member_declaration2(self, p):
         '''class_member_declaration : ';' '''
-        p[0] = EmptyDeclaration(lineno=p.lineno(0))
+        p[0] = EmptyDeclaration()
 
     def p_field_declaration(self, p):
         '''field_declaration : modifiers_opt type variable_declarators ';' '''
-        p[0] = FieldDeclaration(p[2], p[3], modifiers=p[1],lineno=p.lineno(0))
+        p[0] = FieldDeclaration(p[2], p[3], modifiers=p[1])
 
     def p_static_initializer(self, p):
         '''static_initializer : STATIC block'''
-        p[0] = ClassInitializer(p[2], static=True,lineno=p.lineno(0))
+        p[0] = ClassInitializer(p[2], static=True)
 
     def p_constructor_declaration(self, p):
         '''constructor_declaration : constructor_header method_body'''
         p[0] = ConstructorDeclaration(p[1]['name'], p[2], modifiers=p[1]['modifiers'],
                                       type_parameters=p[1]['type_parameters'],
-                                      parameters=p[1]['parameters'], throws=p[1]['throws'],lineno=p.lineno(0))
+                                      parameters=p[1]['parameters'], throws=p[1]['throws'])
 
     def p_constructor_header(self, p):
         '''constructor_header : constructor_header_name formal_parameter_list_opt ')' method_header_throws_clause_opt'''
@@ -1500,9 +1649,9 @@ class ClassParser(object):
         '''formal_parameter : modifiers_opt type variable_declarator_id
                             | modifiers_opt type ELLIPSIS variable_declarator_id'''
         if len(p) == 4:
-            p[0] = FormalParameter(p[3], p[2], modifiers=p[1],lineno=p.lineno(0))
+            p[0] = FormalParameter(p[3], p[2], modifiers=p[1])
         else:
-            p[0] = FormalParameter(p[4], p[2], modifiers=p[1], vararg=True,lineno=p.lineno(0))
+            p[0] = FormalParameter(p[4], p[2], modifiers=p[1], vararg=True)
 
     def p_method_header_throws_clause_opt(self, p):
         '''method_header_throws_clause_opt : method_header_throws_clause
@@ -1511,7 +1660,7 @@ class ClassParser(object):
 
     def p_method_header_throws_clause(self, p):
         '''method_header_throws_clause : THROWS class_type_list'''
-        p[0] = Throws(p[2],lineno=p.lineno(0))
+        p[0] = Throws(p[2])
 
     def p_class_type_list(self, p):
         '''class_type_list : class_type_elt
@@ -1529,6 +1678,16 @@ class ClassParser(object):
         '''method_body : '{' block_statements_opt '}' '''
         p[0] = p[2]
 
+    def p_method_body_error(self, p):
+        '''method_body : '{' error '}'
+                       | '{' block_statements error '}' '''
+        statements = p[2] if len(p) == 5 else []
+        p[0] = statements + [_locate_error(p, Erroneous(), len(p) - 2, inside=True)]
+
+    def p_method_body_outline(self, p):
+        '''method_body : BODY'''
+        p[0] = _skipped_body(p, True)
+
     def p_method_declaration(self, p):
         '''method_declaration : abstract_method_declaration
                               | method_header method_body'''
@@ -1538,14 +1697,14 @@ class ClassParser(object):
             p[0] = MethodDeclaration(p[1]['name'], parameters=p[1]['parameters'],
                                      extended_dims=p[1]['extended_dims'], type_parameters=p[1]['type_parameters'],
                                      return_type=p[1]['type'], modifiers=p[1]['modifiers'],
-                                     throws=p[1]['throws'], body=p[2],lineno=p.lineno(0))
+                                     throws=p[1]['throws'], body=p[2])
 
     def p_abstract_method_declaration(self, p):
         '''abstract_method_declaration : method_header ';' '''
         p[0] = MethodDeclaration(p[1]['name'], abstract=True, parameters=p[1]['parameters'],
                                  extended_dims=p[1]['extended_dims'], type_parameters=p[1]['type_parameters'],
                                  return_type=p[1]['type'], modifiers=p[1]['modifiers'],
-                                 throws=p[1]['throws'],lineno=p.lineno(0))
+                                 throws=p[1]['throws'])
 
     def p_method_header(self, p):
         '''method_header : method_header_name formal_parameter_list_opt ')' method_header_extended_dims method_header_throws_clause_opt'''
@@ -1607,6 +1766,12 @@ class ClassParser(object):
         '''interface_body : '{' interface_member_declarations_opt '}' '''
         p[0] = p[2]
 
+    def p_interface_body_error(self, p):
+        '''interface_body : '{' error '}'
+                          | '{' interface_member_declarations error '}' '''
+        declarations = p[2] if len(p) == 5 else []
+        p[0] = declarations + [_locate_error(p, Erroneous(), len(p) - 2, inside=True)]
+
     def p_interface_member_declarations_opt(self, p):
         '''interface_member_declarations_opt : interface_member_declarations'''
         p[0] = p[1]
@@ -1634,7 +1799,15 @@ class ClassParser(object):
 
     def p_interface_member_declaration2(self, p):
         '''interface_member_declaration : ';' '''
-        p[0] = EmptyDeclaration(lineno=p.lineno(0))
+        p[0] = EmptyDeclaration()
+
+    def p_interface_member_declaration_error(self, p):
+        '''interface_member_declaration : error ';' '''
+        p[0] = _locate_error(p, Erroneous())
+
+    def p_interface_member_declaration_error2(self, p):
+        '''interface_member_declaration : error block'''
+        p[0] = _locate_error(p, Erroneous(body=p[2].statements))
 
     def p_constant_declaration(self, p):
         '''constant_declaration : field_declaration'''
@@ -1644,7 +1817,7 @@ class ClassParser(object):
         '''enum_declaration : enum_header enum_body'''
         p[0] = EnumDeclaration(p[1]['name'], implements=p[1]['implements'],
                                modifiers=p[1]['modifiers'],
-                               type_parameters=p[1]['type_parameters'], body=p[2],lineno=p.lineno(0))
+                               type_parameters=p[1]['type_parameters'], body=p[2])
 
     def p_enum_header(self, p):
         '''enum_header : enum_header_name class_header_implements_opt'''
@@ -1687,9 +1860,9 @@ class ClassParser(object):
         '''enum_constant : enum_constant_header class_body
                          | enum_constant_header'''
         if len(p) == 2:
-            p[0] = EnumConstant(p[1]['name'], arguments=p[1]['arguments'], modifiers=p[1]['modifiers'],lineno=p.lineno(0))
+            p[0] = EnumConstant(p[1]['name'], arguments=p[1]['arguments'], modifiers=p[1]['modifiers'])
         else:
-            p[0] = EnumConstant(p[1]['name'], arguments=p[1]['arguments'], modifiers=p[1]['modifiers'], body=p[2],lineno=p.lineno(0))
+            p[0] = EnumConstant(p[1]['name'], arguments=p[1]['arguments'], modifiers=p[1]['modifiers'], body=p[2])
 
     def p_enum_constant_header(self, p):
         '''enum_constant_header : enum_constant_header_name arguments_opt'''
@@ -1745,7 +1918,7 @@ class ClassParser(object):
         p[0] = AnnotationDeclaration(p[1]['name'], modifiers=p[1]['modifiers'],
                               type_parameters=p[1]['type_parameters'],
                               extends=p[1]['extends'], implements=p[1]['implements'],
-                              body=p[2],lineno=p.lineno(0))
+                              body=p[2])
 
     def p_annotation_type_declaration_header(self, p):
         '''annotation_type_declaration_header : annotation_type_declaration_header_name class_header_extends_opt class_header_implements_opt'''
@@ -1794,14 +1967,17 @@ class ClassParser(object):
                                               | constant_declaration
                                               | constructor_declaration
                                               | type_declaration'''
-        p[0] = p[1]
+        if len(p) == 3:
+            p[0] = _locate(p, p[1])
+        else:
+            p[0] = p[1]
 
     def p_annotation_method_header(self, p):
         '''annotation_method_header : annotation_method_header_name formal_parameter_list_opt ')' method_header_extended_dims annotation_method_header_default_value_opt'''
         p[0] = AnnotationMethodDeclaration(p[1]['name'], p[1]['type'], parameters=p[2],
                                            default=p[5], extended_dims=p[4],
                                            type_parameters=p[1]['type_parameters'],
-                                           modifiers=p[1]['modifiers'],lineno=p.lineno(0))
+                                           modifiers=p[1]['modifiers'])
 
     def p_annotation_method_header_name(self, p):
         '''annotation_method_header_name : modifiers_opt type_parameters type NAME '('
@@ -1830,7 +2006,7 @@ class ClassParser(object):
     def p_member_value_array_initializer(self, p):
         '''member_value_array_initializer : '{' member_values ',' '}'
                                           | '{' member_values '}' '''
-        p[0] = ArrayInitializer(p[2],lineno=p.lineno(0))
+        p[0] = ArrayInitializer(p[2])
 
     def p_member_value_array_initializer2(self, p):
         '''member_value_array_initializer : '{' ',' '}'
@@ -1853,7 +2029,7 @@ class ClassParser(object):
 
     def p_normal_annotation(self, p):
         '''normal_annotation : annotation_name '(' member_value_pairs_opt ')' '''
-        p[0] = Annotation(p[1], members=p[3],lineno=p.lineno(0))
+        p[0] = Annotation(p[1], members=p[3])
 
     def p_annotation_name(self, p):
         '''annotation_name : '@' name'''
@@ -1877,15 +2053,15 @@ class ClassParser(object):
 
     def p_member_value_pair(self, p):
         '''member_value_pair : simple_name '=' member_value'''
-        p[0] = AnnotationMember(p[1], p[3],lineno=p.lineno(0))
+        p[0] = AnnotationMember(p[1], p[3])
 
     def p_marker_annotation(self, p):
         '''marker_annotation : annotation_name'''
-        p[0] = Annotation(p[1],lineno=p.lineno(0))
+        p[0] = Annotation(p[1])
 
     def p_single_member_annotation(self, p):
         '''single_member_annotation : annotation_name '(' single_member_annotation_member_value ')' '''
-        p[0] = Annotation(p[1], single_member=p[3],lineno=p.lineno(0))
+        p[0] = Annotation(p[1], single_member=p[3])
 
     def p_single_member_annotation_member_value(self, p):
         '''single_member_annotation_member_value : member_value'''
@@ -1895,42 +2071,57 @@ class CompilationUnitParser(object):
 
     def p_compilation_unit(self, p):
         '''compilation_unit : package_declaration'''
-        p[0] = CompilationUnit(package_declaration=p[1],lineno=p.lineno(0))
+        p[0] = CompilationUnit(package_declaration=p[1])
 
     def p_compilation_unit2(self, p):
         '''compilation_unit : package_declaration import_declarations'''
-        p[0] = CompilationUnit(package_declaration=p[1], import_declarations=p[2],lineno=p.lineno(0))
+        p[0] = CompilationUnit(package_declaration=p[1], import_declarations=p[2])
 
     def p_compilation_unit3(self, p):
         '''compilation_unit : package_declaration import_declarations type_declarations'''
-        p[0] = CompilationUnit(package_declaration=p[1], import_declarations=p[2], type_declarations=p[3],lineno=p.lineno(0))
+        p[0] = CompilationUnit(package_declaration=p[1], import_declarations=p[2], type_declarations=p[3])
 
     def p_compilation_unit4(self, p):
         '''compilation_unit : package_declaration type_declarations'''
-        p[0] = CompilationUnit(package_declaration=p[1], type_declarations=p[2],lineno=p.lineno(0))
+        p[0] = CompilationUnit(package_declaration=p[1], type_declarations=p[2])
 
     def p_compilation_unit5(self, p):
         '''compilation_unit : import_declarations'''
-        p[0] = CompilationUnit(import_declarations=p[1],lineno=p.lineno(0))
+        p[0] = CompilationUnit(import_declarations=p[1])
 
     def p_compilation_unit6(self, p):
         '''compilation_unit : type_declarations'''
-        p[0] = CompilationUnit(type_declarations=p[1],lineno=p.lineno(0))
+        p[0] = CompilationUnit(type_declarations=p[1])
 
     def p_compilation_unit7(self, p):
         '''compilation_unit : import_declarations type_declarations'''
-        p[0] = CompilationUnit(import_declarations=p[1], type_declarations=p[2],lineno=p.lineno(0))
+        p[0] = CompilationUnit(import_declarations=p[1], type_declarations=p[2])
 
     def p_compilation_unit8(self, p):
         '''compilation_unit : empty'''
-        p[0] = CompilationUnit(lineno=p.lineno(0))
+        p[0] = CompilationUnit()
+
+    def p_compilation_unit_error(self, p):
+        '''compilation_unit : type_declarations error
+                            | package_declaration type_declarations error
+                            | import_declarations type_declarations error
+                            | package_declaration import_declarations type_declarations error'''
+        # source after the last type declaration that starts none, such as a
+        # stray '}', is skipped to the end of input
+        declarations = dict((symbol.type, symbol.value) for symbol in p.slice[1:-1])
+        erroneous = _locate_error(p, Erroneous(), len(p) - 1)
+        if isinstance(erroneous, SourceElement):
+            erroneous._end = len(p.lexer.lexdata.rstrip())
+        p[0] = CompilationUnit(package_declaration=declarations.get('package_declaration'),
+                               import_declarations=declarations.get('import_declarations'),
+                               type_declarations=declarations['type_declarations'] + [erroneous])
 
     def p_package_declaration(self, p):
         '''package_declaration : package_declaration_name ';' '''
         if p[1][0]:
-            p[0] = PackageDeclaration(p[1][1], modifiers=p[1][0],lineno=p.lineno(0))
+            p[0] = PackageDeclaration(p[1][1], modifiers=p[1][0])
         else:
-            p[0] = PackageDeclaration(p[1][1],lineno=p.lineno(0))
+            p[0] = PackageDeclaration(p[1][1])
 
     def p_package_declaration_name(self, p):
         '''package_declaration_name : modifiers PACKAGE name
@@ -1957,19 +2148,19 @@ class CompilationUnitParser(object):
 
     def p_single_type_import_declaration(self, p):
         '''single_type_import_declaration : IMPORT name ';' '''
-        p[0] = ImportDeclaration(p[2],lineno=p.lineno(0))
+        p[0] = ImportDeclaration(p[2])
 
     def p_type_import_on_demand_declaration(self, p):
         '''type_import_on_demand_declaration : IMPORT name '.' '*' ';' '''
-        p[0] = ImportDeclaration(p[2], on_demand=True,lineno=p.lineno(0))
+        p[0] = ImportDeclaration(p[2], on_demand=True)
 
     def p_single_static_import_declaration(self, p):
         '''single_static_import_declaration : IMPORT STATIC name ';' '''
-        p[0] = ImportDeclaration(p[3], static=True,lineno=p.lineno(0))
+        p[0] = ImportDeclaration(p[3], static=True)
 
     def p_static_import_on_demand_declaration(self, p):
         '''static_import_on_demand_declaration : IMPORT STATIC name '.' '*' ';' '''
-        p[0] = ImportDeclaration(p[3], static=True, on_demand=True,lineno=p.lineno(0))
+        p[0] = ImportDeclaration(p[3], static=True, on_demand=True)
 
     def p_type_declarations(self, p):
         '''type_declarations : type_declaration
@@ -1985,7 +2176,13 @@ class MyParser(ExpressionParser, NameParser, LiteralParser, TypeParser, ClassPar
 
     def p_goal_compilation_unit(self, p):
         '''goal : PLUSPLUS compilation_unit'''
+        # the compilation unit is the whole file, comments and all
         p[0] = p[2]
+        if not isinstance(p[0], SourceElement):
+            return
+        p[0]._start = 0
+        p[0]._end = p.lexer.lexlen
+        p[0]._source = p.lexer.source_file
 
     def p_goal_expression(self, p):
         '''goal : MINUSMINUS expression'''
@@ -1995,19 +2192,928 @@ class MyParser(ExpressionParser, NameParser, LiteralParser, TypeParser, ClassPar
         '''goal : '*' block_statement'''
         p[0] = p[2]
 
+    def p_goal_class_body_declarations(self, p):
+        '''goal : '{' class_body_declarations_opt'''
+        p[0] = p[2]
+
+    # the lexer of the Parser using the grammar, set by Parser
+    lexer = None
+
     def p_error(self, p):
-        print('error: {}'.format(p))
+        # a grammar used on its own has no lexer but the tokens'
+        lexer = self.lexer if self.lexer is not None else getattr(p, 'lexer', None)
+        if lexer is None:
+            return
+        if p is None:
+            _reported_to(lexer).report(SYNTAX, 'unexpected end of input', lexer.lexlen)
+        else:
+            _reported_to(lexer).report(SYNTAX, 'unexpected {0}'.format(_quoted(p.value)), p.lexpos, p.value)
 
     def p_empty(self, p):
         '''empty :'''
+        # has no extent; see _extent()
+        p.slice[0].lexpos = None
+
+_node_class_names = frozenset(name for name, value in globals().items()
+                               if isinstance(value, type) and issubclass(value, SourceElement))
+
+
+def _constructs_nodes(production):
+    # actions that only pass on or rearrange what their children produced
+    # do not mention any model class
+    action = production.callable
+    code = getattr(action, '__func__', action).__code__
+    return not _node_class_names.isdisjoint(code.co_names)
+
+
+def _right_hand_side(production):
+    if not production.len:
+        return []
+    return production.str.split('->', 1)[1].split()
+
+
+def _nullable(productions):
+    # the nonterminals that can derive the empty string
+    nullable = set()
+    grown = True
+    while grown:
+        grown = False
+        for production in productions:
+            if production.name not in nullable and \
+                    all(symbol in nullable for symbol in _right_hand_side(production)):
+                nullable.add(production.name)
+                grown = True
+    return nullable
+
+
+def _building_with(namespace):
+    # rebinds an action to namespace, the parser module's globals in which
+    # the model classes are replaced by a node factory's constructors
+    def building(action):
+        function = action.__func__
+        rebound = types.FunctionType(function.__code__, namespace, function.__name__,
+                                     function.__defaults__, function.__closure__)
+        return types.MethodType(rebound, action.__self__)
+    return building
+
+
+def _positioning(action):
+    # gives the node an action builds the extent of the reduced symbol
+    def positioning_action(p):
+        action(p)
+        symbol = p.slice[0]
+        node = symbol.value
+        if isinstance(node, SourceElement) and node._start is None:
+            node._start = symbol.lexpos
+            node._end = symbol.endlexpos
+            node._source = p.lexer.source_file
+    return positioning_action
+
+
+def _bounding(action):
+    # PLY takes the extent of a symbol from its first and last child, which
+    # for a production starting or ending in a nullable symbol may be empty
+    def bounding_action(p):
+        symbols = p.slice
+        symbols[0].lexpos, symbols[0].endlexpos = _extent(symbols, 1, len(symbols) - 1)
+        action(p)
+    return bounding_action
+
+
+def _token_stream(lexer, goal):
+    yield goal
+    depth = 0
+    for token in lexer:
+        token.endlexpos = token.lexpos + len(token.value)
+        if token.type == '{':
+            depth += 1
+        elif token.type == '}':
+            depth -= 1
+        yield token
+    for token in _closing_braces(lexer, depth):
+        yield token
+
+
+def _budgeted(tokens, max_tokens, max_seconds):
+    # the clock is read every 256 tokens, which costs next to nothing
+    deadline = time.time() + max_seconds if max_seconds is not None else None
+    for count, token in enumerate(tokens, 1):
+        if max_tokens is not None and count > max_tokens:
+            raise BudgetExceeded('more than {0} tokens'.format(max_tokens), token.lexpos)
+        if deadline is not None and not count & 255 and time.time() > deadline:
+            raise BudgetExceeded('more than {0} seconds'.format(max_seconds), token.lexpos)
+        yield token
+
+
+def _closing_braces(lexer, depth, unclosed=0):
+    # PLY abandons the whole parse when it runs out of input while
+    # recovering from an error, so close whatever is left open
+    end = lexer.lexlen
+    if depth + unclosed > 0:
+        lexer.diagnostics.report(SYNTAX, '{0} unclosed braces at end of input'.format(depth + unclosed), end)
+    for _ in range(depth):
+        token = lex.LexToken()
+        token.type = token.value = '}'
+        token.lineno = lexer.lineno
+        token.lexpos = token.endlexpos = end
+        yield token
+
+
+# what a '{' opens in an outline parse: the body of a type, whose
+# declarations are looked at, the constants and then the body of an enum,
+# or anything else, which is passed through unexamined
+_TYPE_BODY, _ENUM_BODY, _OTHER = 'type body', 'enum body', 'other'
+
+
+def _outline_token_stream(lexer, goal):
+    # Like _token_stream() but the body of every method, constructor and
+    # initializer becomes a single BODY token. Whether a '{' directly in a
+    # type body opens such a body follows from the declaration it ends: one
+    # mentioning class, interface or enum declares a nested type, one with
+    # an = or default outside parentheses has an array initializer or an
+    # anonymous class as its value, any other one is a method, constructor
+    # or initializer. The file itself counts as a type body.
+    yield goal
+    braces = [_TYPE_BODY]
+    # the declaration so far
+    parens = 0
+    declares = None
+    initializes = False
+    unclosed = 0
+    token = lexer.token()
+    while token is not None:
+        kind = token.type
+        token.endlexpos = token.lexpos + len(token.value)
+        inside = braces[-1]
+        if inside is _OTHER:
+            if kind == '{':
+                braces.append(_OTHER)
+            elif kind == '}':
+                braces.pop()
+        elif kind == '(':
+            parens += 1
+        elif kind == ')':
+            parens -= 1
+        elif parens > 0:
+            if kind == '{':
+                braces.append(_OTHER)
+        elif kind == '{':
+            if initializes:
+                # the declaration goes on after the initializer
+                braces.append(_OTHER)
+            else:
+                if declares is not None:
+                    braces.append(_ENUM_BODY if declares == 'ENUM' else _TYPE_BODY)
+                elif inside is _ENUM_BODY:
+                    # an enum constant with a body
+                    braces.append(_TYPE_BODY)
+                else:
+                    token, unclosed = _skip_body(lexer, token)
+                parens, declares, initializes = 0, None, False
+        elif kind == '}':
+            if len(braces) > 1:
+                braces.pop()
+            parens, declares, initializes = 0, None, False
+        elif kind == ';' or (kind == ',' and inside is _ENUM_BODY):
+            if kind == ';':
+                braces[-1] = _TYPE_BODY
+            parens, declares, initializes = 0, None, False
+        elif kind in ('CLASS', 'INTERFACE', 'ENUM'):
+            declares = kind
+        elif kind in ('=', 'DEFAULT'):
+            initializes = True
+        yield token
+        token = lexer.token()
+    for token in _closing_braces(lexer, len(braces) - 1, unclosed):
+        yield token
+
+
+# the tokens the brace closing a body might hide in are matched as a whole
+_BRACES = re.compile(r"""
+    "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*' | //[^\n]* | /\*.*?\*/ | ([{}])
+""", re.DOTALL | re.VERBOSE)
+
+
+def _skip_body(lexer, brace):
+    # moves the lexer past the brace matching brace, returning a BODY token
+    # that spans both and whether the body is left open at the end of input
+    data = lexer.lexdata
+    end = lexer.lexlen
+    depth = 0
+    for m in _BRACES.finditer(data, brace.lexpos, end):
+        found = m.group(1)
+        if found == '{':
+            depth += 1
+        elif found == '}':
+            depth -= 1
+            if not depth:
+                end = m.end()
+                break
+    token = lex.LexToken()
+    token.type = 'BODY'
+    token.value = data[brace.lexpos:end]
+    token.lineno = brace.lineno
+    token.lexpos = brace.lexpos
+    token.endlexpos = end
+    lexer.lineno += data.count('\n', brace.lexpos, end)
+    lexer.lexpos = end
+    return token, depth > 0
+
+
+# what the header of a compilation unit is scanned as; a word or line
+# comment running into the end of a partly read file may go on after it and
+# an unclosed block comment may be closed later
+_HEADER_TOKEN = re.compile(r"""
+    (?P<space>\s+) | (?P<comment>//[^\r\n]* | /\*.*?\*/) | (?P<open_comment>/\*)
+  | "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*' | [A-Za-z_$][A-Za-z0-9_$]* | \S
+""", re.DOTALL | re.VERBOSE)
+
+
+def _header_end(text, complete):
+    # The offset of the first type declaration in text, annotations
+    # included, or of its end if there is none. None if text is only the
+    # start of the file (not complete) and it takes more to tell.
+    pos = 0
+    end = len(text)
+    state = 'between'
+    start = parens = None
+    while pos < end:
+        m = _HEADER_TOKEN.match(text, pos)
+        if not complete and (m.end() == end or m.lastgroup == 'open_comment'):
+            return None
+        token = m.group()
+        pos = m.end()
+        if m.lastgroup in ('space', 'comment', 'open_comment'):
+            continue
+        if state == 'annotation name' and token not in ('.', '('):
+            state = 'annotated'
+        if state == 'between':
+            # a lone ; is an empty type declaration
+            start = m.start()
+            if token in ('package', 'import'):
+                state = 'declaration'
+            elif token == '@':
+                state = 'annotation'
+            else:
+                return start
+        elif state == 'declaration':
+            if token == ';':
+                state = 'between'
+        elif state == 'annotation':
+            # @interface declares a type
+            if token == 'interface':
+                return start
+            state = 'annotation name'
+        elif state == 'annotation name':
+            if token == '.':
+                state = 'annotation'
+            else:
+                state = 'annotation arguments'
+                parens = 1
+        elif state == 'annotation arguments':
+            if token == '(':
+                parens += 1
+            elif token == ')':
+                parens -= 1
+                if not parens:
+                    state = 'annotated'
+        elif state == 'annotated':
+            # annotations of a package or of the first type declaration
+            if token == '@':
+                state = 'annotation'
+            elif token == 'package':
+                state = 'declaration'
+            else:
+                return start
+    return end if complete else None
+
+
+# the tokens that delimit the members of a class body; strings and
+# comments are matched so that no brace in them is
+_MEMBER_TOKEN = re.compile(r"""
+    "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*' | //[^\n]* | /\*.*?\*/
+  | ([{}();=] | (?<![\w$])(?:class|interface|enum)(?![\w$]))
+""", re.DOTALL | re.VERBOSE)
+
+
+def _class_bodies(text):
+    # the bodies of the top-level classes in text as [offset of '{', offset
+    # of '}', offsets at which members end]. A member ends with a ';' or a
+    # '}' outside of parentheses unless it is a field with an initializer.
+    bodies = []
+    body = None
+    depth = parens = 0
+    in_class = assigned = False
+    for m in _MEMBER_TOKEN.finditer(text):
+        token = m.group(1)
+        if token is None:
+            continue
+        elif token == '(':
+            parens += 1
+        elif token == ')':
+            parens -= 1
+        elif token == '{':
+            if depth == 0 and parens == 0 and in_class:
+                body = [m.start(), None, []]
+                bodies.append(body)
+                in_class = False
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth == 0 and body is not None:
+                body[1] = m.start()
+                body = None
+            elif depth == 1 and parens == 0 and body is not None and not assigned:
+                body[2].append(m.end())
+        elif body is not None:
+            if depth == 1 and parens == 0:
+                if token == ';':
+                    body[2].append(m.end())
+                    assigned = False
+                elif token == '=':
+                    assigned = True
+        elif depth == 0 and parens == 0 and token not in (';', '='):
+            in_class = token == 'class'
+    return [body for body in bodies if body[1] is not None]
+
+
+def _member_chunks(bodies, count):
+    # cuts the class bodies into about count (start, end, offset of the
+    # body's '}') ranges of members
+    size = sum(close - brace for brace, close, _ in bodies) // count + 1
+    chunks = []
+    for brace, close, ends in bodies:
+        start = brace + 1
+        for end in ends:
+            if end - start >= size:
+                chunks.append((start, end, close))
+                start = end
+        chunks.append((start, close, close))
+    return chunks
+
+
+def _skipping_bodies(tokens, lexer, bodies):
+    # passes tokens on but jumps from the '{' of each body to its '}'
+    for token in tokens:
+        yield token
+        if token.type == '{' and token.lexpos in bodies:
+            lexer.lexpos = bodies[token.lexpos]
+
+
+class _DetachingPickler(pickle.Pickler):
+    # pickles nodes without the SourceFile they refer to, which the
+    # unpickling process has a copy of
+
+    def __init__(self, file, source_file):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.source_file = source_file
+
+    def persistent_id(self, obj):
+        return 'source' if obj is self.source_file else None
+
+
+class _AttachingUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, source_file):
+        pickle.Unpickler.__init__(self, file)
+        self.source_file = source_file
+
+    def persistent_load(self, pid):
+        return self.source_file
+
+
+# the lists of statements and of class members Parser.reparse() can
+# reparse an element of, by the class and field holding them, with the goal
+# to do so
+_REPARSED_LISTS = {(Block, 'statements'): '*',
+                   (MethodDeclaration, 'body'): '*',
+                   (ConstructorDeclaration, 'block'): '*',
+                   (SwitchCase, 'body'): '*',
+                   (ClassDeclaration, 'body'): '{',
+                   (InstanceCreation, 'body'): '{'}
+
+
+def _edited_units(tree, start, end, members=False):
+    # the (list, index, goal) of every statement or class member that
+    # contains the text from start to end without starting or ending there,
+    # innermost first. With members set only members of classes nested in
+    # classes count, the ones an outline parse finds the same on their own.
+    units = []
+    node = tree
+    while node is not None:
+        parent, node = node, None
+        for field in parent._fields:
+            value = getattr(parent, field)
+            elements = value if value.__class__ is list else [value]
+            index = _containing(elements, start, end)
+            if index is not None:
+                goal = _REPARSED_LISTS.get((parent.__class__, field))
+                if goal is not None and elements is value:
+                    units.append((value, index, goal))
+                node = elements[index]
+                if members and not isinstance(node, ClassDeclaration):
+                    node = None
+                break
+    units.reverse()
+    return units
+
+
+def _containing(elements, start, end):
+    # the index of the element containing the text from start to end
+    # without starting or ending there, None if there is none. Elements in
+    # source order are searched by halves, which keeps an edit in a class
+    # of many members from looking at each of them.
+    low, high = 0, len(elements)
+    while low < high:
+        middle = (low + high) // 2
+        element = elements[middle]
+        if not isinstance(element, SourceElement) or element.start is None:
+            # not all positioned
+            low, high = 0, len(elements)
+            break
+        if element.start < start:
+            low = middle + 1
+        else:
+            high = middle
+    else:
+        low, high = max(low - 1, 0), min(low, len(elements))
+    for index in range(low, high):
+        element = elements[index]
+        if isinstance(element, SourceElement) and element.start is not None and \
+                element.start < start and end < element.end:
+            return index
+    return None
+
+
+def _settle(result, source_file):
+    # marks the nodes of a parse of source_file as taking every edit made to
+    # it so far into account. The statements of lazy bodies are left alone,
+    # they are marked when parsed.
+    applied = len(source_file._edits)
+    stack = [result]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is list:
+            stack.extend(node)
+        elif isinstance(node, SourceElement):
+            node._edits_applied = applied
+            if node.__class__ is not LazyBlock:
+                stack.extend(getattr(node, field) for field in node._fields)
+
+
+def _recognize(p):
+    # the action of every production when validating
+    pass
+
+
+def _omitted(p):
+    # the action of the productions of a kind of node a parse omits
+    p[0] = None
+
+
+def _no_modifiers(p):
+    p[0] = []
+
+
+def _modifiers_without_annotations(p):
+    if len(p) == 2:
+        p[0] = [] if p[1] is None else [p[1]]
+    elif p[2] is None:
+        p[0] = p[1]
+    else:
+        p[0] = p[1] + [p[2]]
+
+
+_ANNOTATION_ACTIONS = {'normal_annotation': _omitted,
+                       'marker_annotation': _omitted,
+                       'single_member_annotation': _omitted,
+                       'member_value_pairs': _omitted,
+                       'member_value_pair': _omitted}
+
+# for each kind of node parse_string() can omit, the actions replacing the
+# grammar's by production name; later kinds take precedence
+_OMISSIONS = (('annotations', dict(_ANNOTATION_ACTIONS, modifiers=_modifiers_without_annotations)),
+              ('modifiers', dict(_ANNOTATION_ACTIONS, modifier=_omitted, modifiers=_no_modifiers)),
+              ('literals', {'literal': _omitted}))
+
+
+def _omission(omit):
+    omit = frozenset(omit)
+    for kind in omit:
+        if kind not in dict(_OMISSIONS):
+            raise ValueError('cannot omit {0!r}'.format(kind))
+    return omit
+
+
+# the token selecting the grammar's entry point for each parse_string prefix
+_goals = {'++': 'PLUSPLUS', '--': 'MINUSMINUS', '*': '*', '{': '{'}
+
+
+def _index_nodes(root):
+    # {node class: ([positions], [nodes])} of the finished tree, the nodes
+    # of each class in pre-order and their positions in it. Indexing as the
+    # parser reduces would have to follow every node the grammar refines
+    # after building it (type arguments, qualified names) and cost far more
+    # than this one walk.
+    index = {}
+    for position, node in enumerate(_walk(root)):
+        entry = index.get(node.__class__)
+        if entry is None:
+            index[node.__class__] = ([position], [node])
+        else:
+            entry[0].append(position)
+            entry[1].append(node)
+    return index
+
+
+# the nonterminals whose values are the members of a compilation unit or a
+# type declaration, and what separates them
+_MEMBERS = frozenset(['package_declaration', 'import_declaration', 'type_declaration',
+                      'class_body_declaration', 'interface_member_declaration',
+                      'annotation_type_member_declaration', 'enum_constant'])
+_MEMBER_GAP = re.compile(r'(?:\s+|//[^\r\n]*|/\*.*?\*/|,)*', re.DOTALL)
+
+# type declaration headers and the declarations they begin
+_TYPE_HEADERS = {'class_header': ClassDeclaration,
+                 'interface_header': InterfaceDeclaration,
+                 'enum_header': EnumDeclaration,
+                 'annotation_type_declaration_header': AnnotationDeclaration}
+_TYPE_DECLARATIONS = frozenset(['class_declaration', 'interface_declaration',
+                                'enum_declaration', 'annotation_type_declaration'])
+
+
+class _Scope(object):
+    # a type declaration (or the compilation unit) whose members are being
+    # parsed; the next one starts at the first offset after boundary that
+    # _MEMBER_GAP does not skip
+
+    __slots__ = ('node', 'start', 'boundary', 'next', 'descend')
+
+    def __init__(self, node, start, boundary, descend):
+        self.node = node
+        self.start = start
+        self.boundary = boundary
+        self.next = None
+        self.descend = descend
+
+
+class EventStreamer(object):
+    """
+    Hands a compilation unit to a visitor while it is being parsed. Type
+    declarations are visited as soon as their header is parsed and left
+    when they are complete; everything else, package and import
+    declarations and the members of types, is passed to the visitor's
+    accept() as soon as it is complete. The visitor sees the nodes in the
+    order it would see them in with the finished tree, and a visit_ handler
+    of a type declaration returning False keeps its members from it.
+
+    Without build_tree whatever was passed on is dropped from the tree, so
+    the memory held does not grow with the file: the type declarations and
+    the compilation unit are left without their members.
+    """
+
+    def __init__(self, visitor, source_file, build_tree=True):
+        self.visitor = visitor
+        self.source_file = source_file
+        self.build_tree = build_tree
+        # node class -> handlers, resolved once per parse
+        self._table = {}
+        # the type declaration left last, which its member reduction passes on
+        self._left = None
+        root = CompilationUnit()
+        root._start = 0
+        root._source = source_file
+        self.scopes = [_Scope(root, 0, 0, self._visit(root))]
+
+    def _dispatch(self, node):
+        try:
+            return self._table[node.__class__]
+        except KeyError:
+            handlers = self._table[node.__class__] = _handlers(self.visitor, node.__class__)
+            return handlers
+
+    def _visit(self, node):
+        return self._dispatch(node)[0](self.visitor, node)
+
+    def _leave(self, node):
+        self._dispatch(node)[1](self.visitor, node)
+
+    def _starts_member(self, scope, start):
+        text = self.source_file.text
+        if scope.next is None:
+            scope.next = _MEMBER_GAP.match(text, scope.boundary).end()
+        if start == scope.next:
+            return True
+        # the ; ending the constants of an enum is not a member itself
+        return text[scope.next:scope.next + 1] == ';' and start == _MEMBER_GAP.match(text, scope.next + 1).end()
+
+    def _accept_fields(self, node, fields):
+        for field in fields:
+            value = getattr(node, field)
+            for element in (value if value.__class__ is list else [value]):
+                if isinstance(element, SourceElement):
+                    element.accept(self.visitor)
+
+    def _complete(self, early, node):
+        # fills in the node visited before it was built
+        if not self.build_tree:
+            for field in node._fields:
+                value = getattr(node, field)
+                if value.__class__ is list:
+                    setattr(node, field, [element for element in value if element is not None])
+        early.__dict__.update(node.__dict__)
+
+    def open(self, p):
+        start = p.slice[0].lexpos
+        parent = self.scopes[-1]
+        if not self._starts_member(parent, start):
+            # a local class
+            return
+        node = _TYPE_HEADERS[p.slice[0].type](body=[], **p[0])
+        node._start = start
+        node._source = self.source_file
+        # the members start after the body's brace
+        text = self.source_file.text
+        boundary = _TRIVIA.match(text, p.slice[0].endlexpos).end()
+        if text[boundary:boundary + 1] == '{':
+            boundary += 1
+        scope = _Scope(node, start, boundary, parent.descend and self._visit(node))
+        self.scopes.append(scope)
+        if scope.descend:
+            # what accept() visits before the members
+            self._accept_fields(node, node._fields[:node._fields.index('body')])
+
+    def close(self, p):
+        scope = self.scopes[-1]
+        if len(self.scopes) == 1 or p[0]._start != scope.start:
+            return
+        self.scopes.pop()
+        self._complete(scope.node, p[0])
+        node = p[0] = self._left = scope.node
+        if scope.descend:
+            self._accept_fields(node, node._fields[node._fields.index('body') + 1:])
+        if self.scopes[-1].descend:
+            self._leave(node)
+
+    def member(self, p):
+        node = p[0]
+        if not isinstance(node, SourceElement):
+            return
+        scope = self.scopes[-1]
+        if not self._starts_member(scope, node._start):
+            # a member of an anonymous or local class
+            return
+        scope.boundary = node._end
+        scope.next = None
+        if node is not self._left and scope.descend:
+            node.accept(self.visitor)
+        if not self.build_tree:
+            p[0] = None
+
+    def finish(self, p):
+        root = self.scopes[0].node
+        self._complete(root, p[0])
+        p[0] = root
+        self._leave(root)
+
+
+class TokenStream(object):
+    """
+    The tokens of a text as a sequence, kept up to date by edit(), which
+    lexes again only from a safe point before the edit to where the tokens
+    are the same as before. The offsets and line numbers of the tokens after
+    that are moved when they are next asked for, so edits near to each other
+    cost the same however long the text is. A token is only valid until the
+    next edit. The lexical errors found by the last lexing are kept in
+    diagnostics, without line and column.
+    """
+
+    def __init__(self, lexer, text, lineno=1):
+        self.text = text
+        self.first_line = lineno
+        self.diagnostics = None
+        self._lexer = lexer
+        self._tokens = []
+        # the tokens from _gap on are stored _offset characters and _lines
+        # lines before where they are
+        self._gap = 0
+        self._offset = self._lines = 0
+        self.edit(0, 0, '')
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._tokens)
+        if index >= self._gap:
+            self._move_gap(index + 1)
+        return self._tokens[index]
+
+    def __iter__(self):
+        self._move_gap(len(self._tokens))
+        return iter(self._tokens)
+
+    def _move_gap(self, index):
+        offset, lines = self._offset, self._lines
+        if not offset and not lines:
+            pass
+        elif index > self._gap:
+            for token in self._tokens[self._gap:index]:
+                token.lexpos += offset
+                token.lineno += lines
+        else:
+            for token in self._tokens[index:self._gap]:
+                token.lexpos -= offset
+                token.lineno -= lines
+        self._gap = index
+
+    def _last_before(self, offset):
+        # the index of the last token ending before offset, -1 if none does
+        tokens = self._tokens
+        lo, hi = 0, len(tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            token = tokens[mid]
+            end = token.lexpos + len(token.value) + (self._offset if mid >= self._gap else 0)
+            if end < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def edit(self, start, end, text):
+        """
+        Replaces the text from start to end with text and updates the tokens.
+        Returns (index, removed, added): from index on removed tokens were
+        replaced by added new ones.
+        """
+        old = self.text
+        self.text = old[:start] + text + old[end:]
+        # a string or character literal may now end in the edit, so lexing
+        # starts again before the line; one that ends a comment may end one
+        # started anywhere after the last that ended before
+        restart = old.rfind('\n', 0, start) + 1
+        if '*/' in self.text[max(start - 1, 0):start + len(text) + 1]:
+            restart = min(restart, max(old.rfind('*/', 0, start), 0))
+        index = self._last_before(restart)
+        tokens = self._tokens
+        if index < 0:
+            index, restart, lineno = 0, 0, self.first_line
+        else:
+            self._move_gap(index + 1)
+            restart, lineno = tokens[index].lexpos, tokens[index].lineno
+        self._move_gap(index)
+        # the first token after the edit
+        stale = index
+        while stale < len(tokens) and tokens[stale].lexpos + self._offset < end:
+            stale += 1
+        delta = len(text) - (end - start)
+
+        lexer = self._lexer
+        # by offset only; a line table would take longer than the lexing
+        self.diagnostics = lexer.diagnostics = Diagnostics()
+        lexer.input(self.text)
+        lexer.lexpos = restart
+        lexer.lineno = lineno
+        added = []
+        try:
+            while True:
+                token = lexer.token()
+                if token is None:
+                    stale = len(tokens)
+                    break
+                while stale < len(tokens) and tokens[stale].lexpos + self._offset + delta < token.lexpos:
+                    stale += 1
+                if stale < len(tokens) and tokens[stale].lexpos + self._offset + delta == token.lexpos:
+                    # the text from here on is the same as before and so are its tokens
+                    self._offset = token.lexpos - tokens[stale].lexpos
+                    self._lines = token.lineno - tokens[stale].lineno
+                    break
+                added.append(token)
+        finally:
+            lexer.input('')
+            lexer.diagnostics = None
+        removed = stale - index
+        tokens[index:stale] = added
+        self._gap = index + len(added)
+        return index, removed, len(added)
+
 
 class Parser(object):
 
-    def __init__(self):
-        self.lexer = lex.lex(module=MyLexer(), optimize=1)
-        self.parser = yacc.yacc(module=MyParser(), start='goal', optimize=1)
+    def __init__(self, max_diagnostics=100, raise_on_error=False, factory=None):
+        """
+        Lexical and syntax errors do not end a parse. They are collected in
+        a new Diagnostics object for every parse, kept as self.diagnostics,
+        which holds up to max_diagnostics of them. With raise_on_error set
+        the first one is raised as a ParseError instead.
+
+        The grammar builds nodes by calling the plyj.model classes. A
+        factory, an object with attributes named after some of those
+        classes, replaces them with whatever those attributes are: other
+        classes or functions taking the same arguments, e.g. returning
+        tuples, or None to drop a kind of node. Only nodes that are
+        SourceElements are positioned. The grammar refines some nodes after
+        building them, so Name, Type, Block and statements that may be
+        labeled must be replaced by objects supporting the same attributes.
+        Without a factory the model is built as is, at no cost.
+        """
+        self.max_diagnostics = max_diagnostics
+        self.raise_on_error = raise_on_error
+        self.factory = factory
+        self.diagnostics = None
+        self.lexer = _new_lexer()
+        self._grammar = MyParser()
+        self._grammar.lexer = self.lexer
+        # the tables are generated into the package on first use and again
+        # whenever the grammar's signature no longer matches them
+        self.parser = yacc.yacc(module=self._grammar, start='goal', debug=False,
+                                outputdir=os.path.dirname(os.path.abspath(__file__)))
+        self._grammar_productions = self.parser.productions
+        self._productions = self._prepare(self._grammar_productions)
+        self.parser.productions = self._productions
+        self._omitting_productions = {frozenset(): self._productions}
+        self._recognizing_productions = None
+        self._streaming_productions = None
+        self._streamer = None
+        # set while the lexer and parser are in use, see _exclusive()
+        self._busy = False
+
+    def _prepare(self, productions):
+        # wraps the grammar's actions to build nodes through the factory and
+        # to position them
+        if self.factory is not None:
+            namespace = dict(globals())
+            for name in _node_class_names:
+                if name != 'SourceElement' and hasattr(self.factory, name):
+                    namespace[name] = getattr(self.factory, name)
+            productions = self._wrap_productions(_building_with(namespace), _constructs_nodes, productions)
+        productions = self._wrap_productions(_positioning, _constructs_nodes, productions)
+        nullable = _nullable(productions)
+
+        def bounded_by_nullable(production):
+            symbols = _right_hand_side(production)
+            return bool(symbols) and (symbols[0] in nullable or symbols[-1] in nullable)
+        return self._wrap_productions(_bounding, bounded_by_nullable, productions)
+
+    def _omitting(self, omit):
+        productions = self._omitting_productions.get(omit)
+        if productions is None:
+            actions = {}
+            for kind, replacements in _OMISSIONS:
+                if kind in omit:
+                    actions.update(replacements)
+            productions = []
+            for production in self._grammar_productions:
+                if production.name in actions:
+                    production = copy.copy(production)
+                    production.callable = actions[production.name]
+                productions.append(production)
+            productions = self._omitting_productions[omit] = self._prepare(productions)
+        return productions
+
+    def _streaming(self):
+        if self._streaming_productions is None:
+            events = dict.fromkeys(_MEMBERS, 'member')
+            events.update(dict.fromkeys(_TYPE_HEADERS, 'open'))
+            events.update(dict.fromkeys(_TYPE_DECLARATIONS, 'close'))
+            events['goal'] = 'finish'
+
+            def streaming(action, event):
+                def streaming_action(p):
+                    action(p)
+                    getattr(self._streamer, event)(p)
+                return streaming_action
+            self._streaming_productions = []
+            for production in self._productions:
+                event = events.get(production.name)
+                if event is not None and production.callable is not None:
+                    production = copy.copy(production)
+                    production.callable = streaming(production.callable, event)
+                self._streaming_productions.append(production)
+        return self._streaming_productions
+
+    def _recognizing(self):
+        if self._recognizing_productions is None:
+            self._recognizing_productions = self._wrap_productions(lambda action: _recognize)
+        return self._recognizing_productions
+
+    def _diagnostics(self, source_file):
+        return Diagnostics(source_file, limit=self.max_diagnostics, raise_on_error=self.raise_on_error)
+
+    def _wrap_productions(self, wrap, predicate=None, productions=None):
+        wrapped = []
+        for production in self._productions if productions is None else productions:
+            if production.callable is not None and (predicate is None or predicate(production)):
+                production = copy.copy(production)
+                production.callable = wrap(production.callable)
+            wrapped.append(production)
+        return wrapped
 
     def tokenize_string(self, code):
+        self.diagnostics = self._diagnostics(SourceFile(code))
+        self.lexer.diagnostics = self.diagnostics
         self.lexer.input(code)
         for token in self.lexer:
             print(token)
@@ -2020,26 +3126,370 @@ class Parser(object):
             content += line
         return self.tokenize_string(content)
 
+    def lex_string(self, code, lineno=1):
+        """Returns the tokens of code as a TokenStream, see there."""
+        return TokenStream(self.lexer, code, lineno)
+
+    def lex_file(self, _file):
+        if type(_file) == str:
+            _file = open(_file)
+        return self.lex_string(_file.read())
+
     def parse_expression(self, code, debug=0, lineno=1):
         return self.parse_string(code, debug, lineno, prefix='--')
 
     def parse_statement(self, code, debug=0, lineno=1):
         return self.parse_string(code, debug, lineno, prefix='* ')
 
-    def parse_string(self, code, debug=0, lineno=1, prefix='++'):
+    def parse_string(self, code, debug=0, lineno=1, prefix='++', index=False, name=None, outline=False,
+                     lazy=False, omit=(), workers=1, max_tokens=None, max_seconds=None):
+        """
+        Every node of the result knows its start and end offset in code and,
+        through a SourceFile shared by the whole tree, its line and column;
+        lineno is the number of the first line and name is reported as the
+        SourceFile's name. Node.source_text() and Node.source_bytes() slice
+        the SourceFile; nothing of the lexer is kept alive. The errors found
+        are the result's diagnostics as well as self.diagnostics.
+
+        With index set the resulting CompilationUnit carries an index from
+        node class to nodes, built as the parse finishes, that answers
+        CompilationUnit.nodes_of_type() without traversing the tree.
+
+        With outline set the bodies of methods, constructors and initializers
+        are skipped by matching their braces rather than parsed. Each is left
+        in the tree as an UnparsedBody, which parse_body() parses on demand.
+
+        With lazy set bodies are skipped as in an outline parse but left as
+        LazyBlocks, which stand in for the Block or statement list a full
+        parse would give and parse themselves when first used; visitors,
+        walk() and queries see the nodes a full parse gives. Errors found
+        then are added to the diagnostics of this parse. A lazy parse cannot
+        be indexed.
+
+        omit names kinds of nodes that are not built at all, for jobs that
+        never look at them: 'annotations' leaves them out of modifier lists,
+        'modifiers' leaves every modifier list empty (annotations are
+        modifiers too) and 'literals' puts None where a Literal would be.
+        Annotations given as an annotation method's default value are None
+        when omitted. Lazily parsed bodies omit the same.
+
+        With workers above 1 the members of the top-level classes of a
+        compilation unit are split into ranges by matching braces, which
+        that many processes parse while this one parses the rest. The tree
+        is the same as a sequential parse would give, but for how errors
+        are recovered from when the classes do not parse. A parallel parse
+        cannot be indexed or lazy, use a factory nor have a budget.
+
+        max_tokens and max_seconds bound how many tokens are parsed and for
+        how long; a parse that goes over either is abandoned by raising
+        BudgetExceeded, after which the parser is ready for the next one.
+        The time is only checked between tokens, every 256 of them. Bodies
+        that a lazy parse leaves are not part of its budget.
+        """
+        if index and lazy:
+            raise ValueError('a lazy parse cannot be indexed')
+        options = {'index': index, 'outline': outline or lazy, 'lazy': lazy, 'omit': _omission(omit)}
+        source_file = SourceFile(code, name=name, first_line=lineno)
+        if workers > 1 and prefix.strip() == '++':
+            if index or lazy or self.factory is not None or max_tokens is not None or max_seconds is not None:
+                raise ValueError('a parallel parse cannot be indexed or lazy, use a factory nor have a budget')
+            tree = self._parse_parallel(source_file, workers, debug=debug, outline=outline,
+                                        omit=options['omit'])
+        else:
+            diagnostics = self._diagnostics(source_file)
+            tree = self._parse(source_file, 0, len(code), prefix, debug=debug, diagnostics=diagnostics,
+                               max_tokens=max_tokens, max_seconds=max_seconds, **options)
+            # also for an expression or a statement; a node a factory made may not take them
+            if isinstance(tree, SourceElement):
+                tree._diagnostics = diagnostics
+        if isinstance(tree, CompilationUnit):
+            tree._parse_options = options
+        return tree
+
+    def parse_body(self, body, debug=0, diagnostics=None, omit=()):
+        """
+        Parses an UnparsedBody left by an outline parse into the Block it
+        stands for, positioned in the same SourceFile as the outline. Errors
+        are added to diagnostics if given, to a new Diagnostics otherwise.
+        omit is as for parse_string().
+        """
+        return self._parse(body.source_file, body.start, body.end, '*', debug=debug,
+                           diagnostics=diagnostics, omit=_omission(omit))
+
+    def reparse(self, tree, start, end, text, debug=0):
+        """
+        Parses the source of tree, a CompilationUnit from parse_string(),
+        after replacing what is between the offsets start and end with text,
+        and returns the result. Its SourceFile is edited in place. The parse
+        is indexed, outlined, lazy and omits nodes as the one that built
+        tree did.
+
+        Only the innermost statement or class member containing the edit is
+        parsed again if that is enough: one that parses without errors
+        replaces the old one in tree and the tree is returned, its other
+        nodes moving with the text when their offsets are next used; an
+        index is rebuilt. Otherwise the next one out is tried, and if none
+        will do, the whole source is parsed into a new CompilationUnit. One
+        that does not contain every error the parse that built tree found
+        will not do either. Either way the result equals what parsing the
+        edited source would give. Of an outlined or lazy tree only members
+        of classes nested in classes are parsed again on their own.
+        """
+        source_file = tree.source_file
+        errors = tree.diagnostics
+        options = {'index': False, 'outline': False, 'lazy': False, 'omit': frozenset()}
+        options.update(tree._parse_options or {})
+        complete = errors is not None and not errors.dropped and \
+            tree.start == 0 and tree.end == len(source_file.text)
+        units = _edited_units(tree, start, end, members=options['outline']) if complete else []
+        # where each was before the edit
+        extents = [(elements[index].start, elements[index].end) for elements, index, _ in units]
+        delta = len(text) - (end - start)
+        source_file.edit(start, end, text)
+        for (elements, index, goal), (old_start, old_end) in zip(units, extents):
+            # errors elsewhere would stay, and a parse of the whole source
+            # might recover from them differently
+            if any(not old_start < error.offset < old_end for error in errors):
+                continue
+            diagnostics = Diagnostics(source_file)
+            new = self._parse(source_file, old_start, old_end + delta, goal, debug=debug,
+                              diagnostics=diagnostics, **options)
+            if diagnostics.total or new is None:
+                continue
+            elements[index:index + 1] = new if goal == '{' else [new]
+            if options['index']:
+                tree._node_index = _index_nodes(tree)
+            self.diagnostics = tree._diagnostics = self._diagnostics(source_file)
+            return tree
+        tree = self._parse(source_file, 0, len(source_file.text), '++', debug=debug, **options)
+        if isinstance(tree, CompilationUnit):
+            tree._parse_options = options
+        return tree
+
+    def stream_string(self, code, visitor, build_tree=True, debug=0, lineno=1, name=None):
+        """
+        Parses the compilation unit in code, handing its nodes to visitor
+        while parsing; see EventStreamer. The visitor's visit_ and leave_
+        handlers are called as with CompilationUnit.accept(). Returns the
+        CompilationUnit, which without build_tree holds nothing of what the
+        visitor was given.
+        """
+        source_file = SourceFile(code, name=name, first_line=lineno)
+        streamer = EventStreamer(visitor, source_file, build_tree=build_tree)
+        return self._parse(source_file, 0, len(code), '++', debug=debug, streamer=streamer)
+
+    def stream_file(self, _file, visitor, build_tree=True, debug=0):
+        if type(_file) == str:
+            _file = open(_file)
+        content = _file.read()
+        return self.stream_string(content, visitor, build_tree=build_tree, debug=debug,
+                                  name=getattr(_file, 'name', None))
+
+    def _parse_parallel(self, source_file, workers, debug=0, outline=False, omit=frozenset()):
+        text = source_file.text
+        bodies = _class_bodies(text)
+        chunks = _member_chunks(bodies, workers * 4)
+        if len(chunks) < 2:
+            return self._parse(source_file, 0, len(text), '++', debug=debug, outline=outline, omit=omit)
+        diagnostics = Diagnostics(source_file)
+        pool = multiprocessing.Pool(workers, _start_worker, (text,))
+        try:
+            results = pool.map_async(_parse_members, [(start, end, outline, omit) for start, end, _ in chunks],
+                                     chunksize=1)
+            # the rest of the file, every class body an empty '{' '}'
+            tree = self._parse(source_file, 0, len(text), '++', debug=debug, outline=outline, omit=omit,
+                               diagnostics=diagnostics,
+                               skipped=dict((brace, close) for brace, close, _ in bodies))
+            results = results.get()
+        finally:
+            pool.terminate()
+            pool.join()
+        # a class declaration ends with the '}' of its body
+        members = dict((close + 1, []) for _, close, _ in bodies)
+        reports = [(d.offset, d.kind, d.message, d.token) for d in diagnostics]
+        for (_, _, close), (pickled, chunk_reports) in zip(chunks, results):
+            members[close + 1].extend(_AttachingUnpickler(io.BytesIO(pickled), source_file).load())
+            reports.extend(chunk_reports)
+        for declaration in getattr(tree, 'type_declarations', []):
+            if isinstance(declaration, ClassDeclaration) and declaration.end in members:
+                declaration.body = members.pop(declaration.end)
+        if members:
+            # a class did not parse with its body left out
+            return self._parse(source_file, 0, len(text), '++', debug=debug, outline=outline, omit=omit)
+        self.diagnostics = tree._diagnostics = self._diagnostics(source_file)
+        for offset, kind, message, token in sorted(reports, key=lambda report: report[0]):
+            self.diagnostics.report(kind, message, offset, token)
+        return tree
+
+    def _exclusive(self, parse, *args, **kwargs):
+        # calls parse, which uses self.lexer and self.parser. One called while
+        # another runs, by a visitor of stream_string() or when a lazy body is
+        # first used, gets a lexer and a parser state of its own and leaves
+        # the productions and diagnostics of the one running alone
+        if not self._busy:
+            self._busy = True
+            try:
+                return parse(*args, **kwargs)
+            finally:
+                self._busy = False
+        saved = self.lexer, self.parser, self.diagnostics, self._streamer
+        self.lexer = self._grammar.lexer = self.lexer.clone()
+        self.parser = copy.copy(self.parser)
+        try:
+            return parse(*args, **kwargs)
+        finally:
+            self.lexer, self.parser, self.diagnostics, self._streamer = saved
+            self._grammar.lexer = self.lexer
+
+    def _parse(self, *args, **kwargs):
+        return self._exclusive(self._parse_range, *args, **kwargs)
+
+    def _parse_range(self, source_file, start, end, prefix, debug=0, index=False, outline=False, lazy=False,
+                     diagnostics=None, streamer=None, omit=frozenset(), skipped=None, max_tokens=None,
+                     max_seconds=None):
+        # parses source_file.text[start:end] with offsets into the whole text
+        self.lexer.input(source_file.text)
+        self.lexer.lexpos = start
+        self.lexer.lexlen = end
+        # counted like the lexer does, without building the SourceFile's line table
+        self.lexer.lineno = source_file.first_line + source_file.text.count('\n', 0, start)
+        self.lexer.source_file = source_file
+        if diagnostics is None:
+            diagnostics = self._diagnostics(source_file)
+        self.diagnostics = self.lexer.diagnostics = diagnostics
+        self.lexer.body_parser = self if lazy else None
+        self.lexer.omit = omit
+        goal = lex.LexToken()
+        goal.type = _goals[prefix.strip()]
+        goal.value = prefix.strip()
+        goal.lineno = self.lexer.lineno
+        goal.lexpos = goal.endlexpos = start
+        if outline:
+            tokens = _outline_token_stream(self.lexer, goal)
+        else:
+            tokens = _token_stream(self.lexer, goal)
+        if skipped:
+            tokens = _skipping_bodies(tokens, self.lexer, skipped)
+        if max_tokens is not None or max_seconds is not None:
+            tokens = _budgeted(tokens, max_tokens, max_seconds)
+        token = lambda: next(tokens, None)
+        if streamer is not None:
+            self._streamer = streamer
+            self.parser.productions = self._streaming()
+        else:
+            self.parser.productions = self._omitting(omit)
+        try:
+            tree = self.parser.parse(lexer=self.lexer, debug=debug, tracking=True, tokenfunc=token)
+            if source_file._edits:
+                _settle(tree, source_file)
+            if isinstance(tree, CompilationUnit):
+                tree._diagnostics = diagnostics
+                if index:
+                    tree._node_index = _index_nodes(tree)
+            return tree
+        finally:
+            # the tree and the diagnostics hold on to the source, the lexer should not
+            self.lexer.input('')
+            self.lexer.source_file = self.lexer.diagnostics = self.lexer.body_parser = self.lexer.omit = None
+            self.parser.productions = self._productions
+            self._streamer = None
+
+    def parse_file(self, _file, debug=0, index=False, outline=False, lazy=False, omit=(), workers=1,
+                   max_tokens=None, max_seconds=None):
+        if type(_file) == str:
+            _file = open(_file)
+        content = _file.read()
+        return self.parse_string(content, debug=debug, index=index, name=getattr(_file, 'name', None),
+                                 outline=outline, lazy=lazy, omit=omit, workers=workers,
+                                 max_tokens=max_tokens, max_seconds=max_seconds)
+
+    def validate_string(self, code, lineno=1, name=None):
+        """
+        Checks that code is a compilation unit without building anything of
+        it: the grammar's actions are skipped and no positions are tracked.
+        Checking stops at the first lexical or syntax error, which is
+        returned as a Diagnostic; None means code parses.
+        """
+        return self._exclusive(self._validate, SourceFile(code, name=name, first_line=lineno))
+
+    def _validate(self, source_file):
+        code, lineno = source_file.text, source_file.first_line
+        self.diagnostics = self.lexer.diagnostics = Diagnostics(source_file, raise_on_error=True)
+        self.lexer.input(code)
         self.lexer.lineno = lineno
-        return self.parser.parse(prefix + code, lexer=self.lexer, debug=debug)
-
-    def parse_file(self, _file, debug=0):
+        goal = lex.LexToken()
+        goal.type = goal.value = 'PLUSPLUS'
+        goal.lineno = lineno
+        goal.lexpos = 0
+        tokens = itertools.chain((goal,), self.lexer)
+        self.parser.productions = self._recognizing()
+        try:
+            self.parser.parse(lexer=self.lexer, tokenfunc=lambda: next(tokens, None))
+        except ParseError as e:
+            return e.diagnostic
+        finally:
+            self.lexer.input('')
+            self.lexer.diagnostics = None
+            self.parser.productions = self._productions
+        return None
+
+    def validate_file(self, _file):
         if type(_file) == str:
             _file = open(_file)
         content = _file.read()
-        return self.parse_string(content, debug=debug)
+        return self.validate_string(content, name=getattr(_file, 'name', None))
+
+    def parse_header_string(self, code, debug=0, lineno=1, name=None):
+        """
+        Parses the package and import declarations at the start of code and
+        nothing after them. The result is a CompilationUnit without type
+        declarations that ends where the first one starts.
+        """
+        source_file = SourceFile(code, name=name, first_line=lineno)
+        return self._parse(source_file, 0, _header_end(code, True), '++', debug=debug)
+
+    def parse_header_file(self, _file, debug=0, chunk_size=8192):
+        """
+        Like parse_header_string() but reads only as much of _file as it
+        takes to find the first type declaration, chunk_size characters at
+        first and twice what has been read whenever that is not enough.
+        """
+        if type(_file) == str:
+            _file = open(_file)
+        content = ''
+        end = None
+        while end is None:
+            chunk = _file.read(max(len(content), chunk_size))
+            content += chunk
+            end = _header_end(content, not chunk)
+        source_file = SourceFile(content, name=getattr(_file, 'name', None))
+        return self._parse(source_file, 0, end, '++', debug=debug)
+
+# the Parser of a process parsing members for a parallel parse and the
+# SourceFile of the text it parses
+_worker = None
+_worker_source = None
+
+
+def _start_worker(text):
+    global _worker, _worker_source
+    _worker = Parser(max_diagnostics=None)
+    _worker_source = SourceFile(text)
+
+
+def _parse_members(job):
+    # parses a range of class members, returning them pickled without their
+    # SourceFile and the diagnostics as (offset, kind, message, token)
+    start, end, outline, omit = job
+    members = _worker._parse(_worker_source, start, end, '{', outline=outline, omit=omit)
+    pickled = io.BytesIO()
+    _DetachingPickler(pickled, _worker_source).dump(members or [])
+    return pickled.getvalue(), [(d.offset, d.kind, d.message, d.token) for d in _worker.diagnostics]
 
 if __name__ == '__main__':
     # for testing
-    lexer = lex.lex(module=MyLexer())
-    parser = yacc.yacc(module=MyParser(), write_tables=0, start='type_parameters')
+    lexer = _new_lexer()
+    parser = yacc.yacc(module=MyParser(), write_tables=0, debug=False, start='type_parameters')
 
     expressions = [
         '<T extends Foo & Bar>'
@@ -2052,7 +3502,7 @@ if __name__ == '__main__':
             print(token)
 
         print('parsing expression {}'.format(expr))
-        t = parser.parse(expr, lexer=lexer, debug=1)
+        t = parser.parse(expr, lexer=lexer, debug=1, tracking=True)
         print('result: {}'.format(t))
         print('--------------------------------')
 
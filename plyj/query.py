@@ -0,0 +1,357 @@
+import re
+
+from . import model
+from .model import _children
+
+# A small selector language for plyj.model trees, modelled after CSS:
+#
+#   MethodInvocation[name="sleep"][target="Thread"]
+#   ClassDeclaration > MethodDeclaration[name=/^test/]
+#   MethodDeclaration[abstract=false] Literal, Assert *
+#
+# A compound selector is a node class name (matching subclasses too) or * for
+# any node, followed by constraints on its fields. [field] requires the field
+# to be set (truthy), [field=value] and [field!=value] compare it. Fields may
+# be dotted paths into child objects (target.value). Values are quoted
+# strings, numbers, true, false, null, bare (qualified) names taken as
+# strings or /regular expressions/ (searched). A Name compares by its value
+# so [target="System.out"] works without spelling out target.value. Compound
+# selectors separated by whitespace match descendants, by > direct children.
+# Comma separated selectors are alternatives.
+
+
+class QueryError(ValueError):
+    pass
+
+
+def compile(source):
+    """Compiles a selector into a reusable Query."""
+    return Query(source)
+
+
+class Match(object):
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def start(self):
+        return self.node.start
+
+    @property
+    def end(self):
+        return self.node.end
+
+    @property
+    def lineno(self):
+        return self.node.lineno
+
+    @property
+    def column(self):
+        return self.node.column
+
+    def __repr__(self):
+        return 'Match({0!r}, lineno={1!r}, column={2!r})'.format(self.node, self.lineno, self.column)
+
+
+class Query(object):
+
+    def __init__(self, source):
+        self.source = source
+        # flattened compound selectors of all alternatives; compound i is
+        # followed by compound i + 1 unless it is the last of its selector
+        self._compounds = []
+        self._initial = []
+        for selector in _Parser(source).parse():
+            self._initial.append(len(self._compounds))
+            for axis, compound in selector:
+                compound.axis = axis
+                compound.index = len(self._compounds)
+                self._compounds.append(compound)
+            self._compounds[-1].final = True
+        self._states = {}
+        self._start = self._state(frozenset(self._initial), frozenset())
+
+    def __repr__(self):
+        return 'Query({0!r})'.format(self.source)
+
+    def matches(self, tree):
+        """
+        Returns a Match for every node of tree the query matches, in pre-order,
+        evaluating all selectors in a single pass over the tree.
+        """
+        found = []
+        stack = [self._start, tree]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node = pop()
+            state = pop()
+            try:
+                typed, constrained = state.by_class[node.__class__]
+            except KeyError:
+                typed, constrained = state.candidates(node.__class__)
+            if constrained:
+                matched = typed + tuple([c.index for c in constrained if c.accepts(node)])
+            else:
+                matched = typed
+            if matched:
+                try:
+                    following, is_match = state.following[matched]
+                except KeyError:
+                    following, is_match = state.advance(matched)
+                if is_match:
+                    found.append(Match(node))
+            else:
+                following = state.unmatched
+            children = _children(node)
+            i = len(children)
+            while i:
+                i -= 1
+                push(following)
+                push(children[i])
+        return found
+
+    def _state(self, descendant, child):
+        key = (descendant, child)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _State(self, descendant, child)
+            state.unmatched = self._state(descendant, frozenset()) if child else state
+        return state
+
+
+class _State(object):
+    # The compound selectors a node may match next: those in descendant
+    # apply to every node below the one that matched their predecessor, those
+    # in child to its direct children only. States are interned per query.
+
+    __slots__ = ('query', 'descendant', 'child', 'by_class', 'following', 'unmatched')
+
+    def __init__(self, query, descendant, child):
+        self.query = query
+        self.descendant = descendant
+        self.child = child
+        # node class -> (indices of compounds matched by the class alone,
+        #                compounds whose constraints must be checked as well)
+        self.by_class = {}
+        # tuple of matched compound indices -> (state for the children,
+        #                                       whether the node is a match)
+        self.following = {}
+        # state for the children of a node that matched nothing
+        self.unmatched = None
+
+    def candidates(self, node_class):
+        typed = []
+        constrained = []
+        for i in sorted(self.descendant | self.child):
+            compound = self.query._compounds[i]
+            if compound.node_class is None or issubclass(node_class, compound.node_class):
+                if compound.constraints:
+                    constrained.append(compound)
+                else:
+                    typed.append(i)
+        result = self.by_class[node_class] = (tuple(typed), constrained)
+        return result
+
+    def advance(self, matched):
+        compounds = self.query._compounds
+        descendant = set(self.descendant)
+        child = set()
+        final = False
+        for i in matched:
+            if compounds[i].final:
+                final = True
+            elif compounds[i + 1].axis == '>':
+                child.add(i + 1)
+            else:
+                descendant.add(i + 1)
+        following = self.following[matched] = (
+            self.query._state(frozenset(descendant), frozenset(child)), final)
+        return following
+
+
+class _Compound(object):
+
+    axis = None
+    final = False
+    index = None
+
+    def __init__(self, node_class, constraints):
+        self.node_class = node_class
+        self.constraints = constraints
+
+    def accepts(self, node):
+        # the node class has already been checked
+        for constraint in self.constraints:
+            if not constraint(node):
+                return False
+        return True
+
+
+_MISSING = object()
+
+
+def _resolve(node, path):
+    for name in path:
+        node = getattr(node, name, _MISSING)
+        if node is _MISSING:
+            return _MISSING
+    if isinstance(node, model.Name):
+        return node.value
+    return node
+
+
+def _constraint(path, op, value):
+    if op is None:
+        def constraint(node):
+            found = _resolve(node, path)
+            return found is not _MISSING and bool(found)
+    elif hasattr(value, 'search'):
+        def constraint(node):
+            found = _resolve(node, path)
+            matched = isinstance(found, str) and value.search(found) is not None
+            return matched if op == '=' else not matched
+    else:
+        def constraint(node):
+            found = _resolve(node, path)
+            if found is _MISSING:
+                return op == '!='
+            return (found == value) if op == '=' else (found != value)
+    return constraint
+
+
+_TOKENS = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<regex>/(?:[^/\\]|\\.)*/)
+  | (?P<number>-?[0-9]+(?:\.[0-9]+)?)
+  | (?P<word>[A-Za-z_$][A-Za-z0-9_$]*)
+  | (?P<op>!=|[=>\[\].,*])
+''', re.VERBOSE)
+
+
+class _Parser(object):
+
+    def __init__(self, source):
+        self.source = source
+        self.tokens = []
+        pos = 0
+        while pos < len(source):
+            m = _TOKENS.match(source, pos)
+            if m is None:
+                raise QueryError('unexpected {0!r} at {1} in {2!r}'.format(source[pos], pos, source))
+            if m.lastgroup == 'space':
+                # whitespace is only significant between compound selectors
+                self.tokens.append(('space', ' ', pos))
+            else:
+                self.tokens.append((m.lastgroup, m.group(), pos))
+            pos = m.end()
+        self.tokens.append(('end', None, pos))
+        self.pos = 0
+
+    def error(self, expected):
+        kind, text, pos = self.tokens[self.pos]
+        found = 'end of query' if kind == 'end' else repr(text)
+        raise QueryError('expected {0} but found {1} at {2} in {3!r}'
+                         .format(expected, found, pos, self.source))
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def next(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def skip_space(self):
+        while self.peek()[0] == 'space':
+            self.pos += 1
+
+    def expect(self, text):
+        self.skip_space()
+        if self.peek()[1] != text:
+            self.error(repr(text))
+        return self.next()
+
+    def parse(self):
+        selectors = [self.parse_selector()]
+        while self.peek()[1] == ',':
+            self.next()
+            selectors.append(self.parse_selector())
+        if self.peek()[0] != 'end':
+            self.error("',' or end of query")
+        return selectors
+
+    def parse_selector(self):
+        self.skip_space()
+        selector = [(None, self.parse_compound())]
+        while True:
+            had_space = self.peek()[0] == 'space'
+            self.skip_space()
+            kind, text, _ = self.peek()
+            if text == '>':
+                self.next()
+                self.skip_space()
+                selector.append(('>', self.parse_compound()))
+            elif had_space and (kind == 'word' or text == '*'):
+                selector.append((' ', self.parse_compound()))
+            else:
+                return selector
+
+    def parse_compound(self):
+        kind, text, _ = self.peek()
+        if text == '*':
+            self.next()
+            node_class = None
+        elif kind == 'word':
+            self.next()
+            node_class = getattr(model, text, None)
+            if not (isinstance(node_class, type) and issubclass(node_class, model.SourceElement)):
+                raise QueryError('unknown node type {0!r} in {1!r}'.format(text, self.source))
+        else:
+            self.error('a node type or *')
+        constraints = []
+        while self.peek()[1] == '[':
+            self.next()
+            constraints.append(self.parse_constraint())
+        return _Compound(node_class, constraints)
+
+    def parse_constraint(self):
+        self.skip_space()
+        path = [self.parse_word()]
+        while self.peek()[1] == '.':
+            self.next()
+            path.append(self.parse_word())
+        self.skip_space()
+        op = value = None
+        if self.peek()[1] in ('=', '!='):
+            op = self.next()[1]
+            self.skip_space()
+            value = self.parse_value()
+        self.expect(']')
+        return _constraint(path, op, value)
+
+    def parse_word(self):
+        if self.peek()[0] != 'word':
+            self.error('a field name')
+        return self.next()[1]
+
+    def parse_value(self):
+        kind, text, _ = self.next()
+        if kind == 'string':
+            return re.sub(r'\\(.)', r'\1', text[1:-1])
+        if kind == 'regex':
+            return re.compile(text[1:-1].replace('\\/', '/'))
+        if kind == 'number':
+            return float(text) if '.' in text else int(text)
+        if kind == 'word':
+            if text in ('true', 'false', 'null'):
+                return {'true': True, 'false': False, 'null': None}[text]
+            # bare qualified names such as java.util.List
+            while self.peek()[1] == '.':
+                self.next()
+                text += '.' + self.parse_word()
+            return text
+        self.pos -= 1
+        self.error('a value')
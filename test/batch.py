@@ -0,0 +1,222 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+import plyj.model as model
+from plyj.batch import BatchParser, TreeCache, _read_blobs
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = os.path.join(self.directory, 'trees.db')
+        self.batches = []
+        self.paths = [self.write('A.java', 'class A { void f() { g(); } }'),
+                      self.write('B.java', 'class B { int x = ; }')]
+
+    def tearDown(self):
+        for batch in self.batches:
+            batch.cache.close()
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text, mtime=1000000000):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def parse(self, paths=None):
+        batch = BatchParser(cache=self.cache)
+        results = batch.parse_files(paths or self.paths)
+        self.batches.append(batch)
+        return batch.stats, results
+
+    def test_no_cache(self):
+        batch = BatchParser()
+        a, b = batch.parse_files(self.paths)
+        self.assertEqual((a.status, b.status), ('parsed', 'parsed'))
+        self.assertEqual(a.tree.type_declarations[0].name, 'A')
+        self.assertEqual([d.message for d in b.diagnostics], ["unexpected ';'"])
+        self.assertEqual((batch.stats.files, batch.stats.parsed, batch.stats.cached), (2, 2, 0))
+
+    def test_unchanged_files_are_loaded(self):
+        _, first = self.parse()
+        stats, results = self.parse()
+        self.assertEqual((stats.parsed, stats.cached), (0, 2))
+        self.assertEqual([r.status for r in results], ['cached', 'cached'])
+        self.assertEqual([r.digest for r in results], [r.digest for r in first])
+        self.assertEqual(results[0].tree, first[0].tree)
+        call = results[0].tree.find_all(model.MethodInvocation)[0]
+        self.assertEqual((call.lineno, call.source_text()), (1, 'g()'))
+        self.assertEqual([(d.line, d.column) for d in results[1].diagnostics], [(1, 19)])
+
+    def test_changed_files_are_parsed(self):
+        self.parse()
+        self.write('A.java', 'class A { void f() { h(); } }', mtime=1000000001)
+        # touched, same content: read and hashed but not parsed
+        self.write('B.java', 'class B { int x = ; }', mtime=1100000000)
+        stats, (a, b) = self.parse()
+        self.assertEqual((a.status, b.status), ('parsed', 'cached'))
+        self.assertEqual(a.tree.find_all(model.MethodInvocation)[0].name, 'h')
+        cache = TreeCache(self.cache)
+        self.assertEqual(cache.fingerprint(b.path)[1], 1100000000)
+        cache.close()
+
+    def test_duplicates(self):
+        copies = [self.write('C{0}.java'.format(i), 'class A { void f() { g(); } }') for i in range(3)]
+        batch = BatchParser()
+        results = batch.parse_files(self.paths + copies)
+        self.assertEqual([r.status for r in results], ['parsed', 'parsed', 'duplicate', 'duplicate', 'duplicate'])
+        for copy in results[2:]:
+            self.assertIs(copy.original, results[0])
+            self.assertIs(copy.tree, results[0].tree)
+            self.assertEqual(copy.tree.source_file.name, self.paths[0])
+        stats = batch.stats
+        self.assertEqual((stats.files, stats.parsed, stats.duplicates, stats.duplicate_bytes), (5, 2, 3, 87))
+
+    def test_cached_duplicates(self):
+        copy = self.write('C.java', 'class A { void f() { g(); } }')
+        self.parse()
+        stats, results = self.parse(self.paths + [copy])
+        self.assertEqual([r.status for r in results], ['cached', 'cached', 'duplicate'])
+        self.assertIs(results[2].tree, results[0].tree)
+        self.assertEqual((stats.cached, stats.duplicates), (2, 1))
+
+    def test_budget(self):
+        big = self.write('Big.java', 'class Big { int[] xs = {' + '1, ' * 500 + '}; }')
+        batch = BatchParser(cache=self.cache, max_tokens=200)
+        self.batches.append(batch)
+        a, b, c = batch.parse_files(self.paths[:1] + [big] + self.paths[1:])
+        self.assertEqual([r.status for r in (a, b, c)], ['parsed', 'aborted', 'parsed'])
+        self.assertEqual(b.reason, 'more than 200 tokens')
+        self.assertIsNone(b.tree)
+        self.assertEqual(batch.stats.aborted, 1)
+        # not cached, so tried again
+        stats, results = self.parse([big])
+        self.assertEqual(results[0].status, 'parsed')
+
+    def test_deep_tree(self):
+        deep = self.write('Deep.java', 'class Deep { String s = ' + ' + '.join(['"x"'] * 5000) + '; }')
+        _, (parsed,) = self.parse([deep])
+        self.assertEqual(parsed.status, 'parsed')
+        stats, (cached,) = self.parse([deep])
+        self.assertEqual(cached.status, 'cached')
+        # too deep to be compared with ==
+        walk = lambda tree: [(n.__class__, n.start, n.end) for n in tree.walk()]
+        self.assertEqual(walk(cached.tree), walk(parsed.tree))
+        self.assertEqual(cached.tree.find_all(model.Literal)[-1].source_text(), '"x"')
+
+    def test_undecodable(self):
+        latin = os.path.join(self.directory, 'Latin.java')
+        with open(latin, 'wb') as f:
+            f.write(b'class Latin { String s = "\xe9"; }')
+        stats, (a, l, b) = self.parse(self.paths[:1] + [latin] + self.paths[1:])
+        self.assertEqual([r.status for r in (a, l, b)], ['parsed', 'failed', 'parsed'])
+        self.assertIn('utf-8', l.reason)
+        self.assertIsNone(l.tree)
+        self.assertEqual((stats.parsed, stats.failed), (2, 1))
+        # not cached, so tried again
+        stats, (l,) = self.parse([latin])
+        self.assertEqual(l.status, 'failed')
+        batch = BatchParser(encoding='latin-1')
+        l, = batch.parse_files([latin])
+        self.assertEqual(l.status, 'parsed')
+
+    def test_same_content_elsewhere(self):
+        self.parse()
+        copy = self.write('C.java', 'class A { void f() { g(); } }')
+        stats, (c,) = self.parse([copy])
+        self.assertEqual(c.status, 'cached')
+        self.assertEqual(c.tree.type_declarations[0].name, 'A')
+        self.assertEqual(c.tree.source_file.name, copy)
+        self.assertEqual(c.tree.type_declarations[0].source_file.name, copy)
+
+def has_git():
+    try:
+        return subprocess.call(['git', '--version'], stdout=subprocess.PIPE) == 0
+    except OSError:
+        return False
+
+
+@unittest.skipUnless(has_git(), 'git is not installed')
+class GitBatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.repository = os.path.join(self.directory, 'repository')
+        os.mkdir(self.repository)
+        self.git('init', '-q')
+        self.commit({'src/A.java': 'class A { }', 'src/B.java': 'class B { }',
+                     'Copy.java': 'class A { }', 'README': 'not java'})
+        self.commit({'src/B.java': 'class B { int x; }', 'D.java': 'class D { }', 'Copy.java': None})
+        self.batch = BatchParser(cache=os.path.join(self.directory, 'trees.db'))
+
+    def tearDown(self):
+        self.batch.cache.close()
+        shutil.rmtree(self.directory)
+
+    def git(self, *args):
+        subprocess.check_call(('git', '-C', self.repository, '-c', 'user.name=plyj',
+                               '-c', 'user.email=plyj@example.com') + args, stdout=subprocess.PIPE)
+
+    def commit(self, files):
+        for name, text in files.items():
+            path = os.path.join(self.repository, name)
+            if text is None:
+                os.remove(path)
+                continue
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(text)
+        self.git('add', '-A')
+        self.git('commit', '-q', '-m', 'change')
+
+    def test_revision(self):
+        results = self.batch.parse_revision(self.repository, 'HEAD~1')
+        self.assertEqual([(r.path, r.status) for r in results],
+                         [('Copy.java', 'parsed'), ('src/A.java', 'duplicate'), ('src/B.java', 'parsed')])
+        # the same blob, parsed once
+        self.assertIs(results[0].tree, results[1].tree)
+        self.assertEqual(results[0].blob, results[1].blob)
+        self.assertEqual(results[0].tree.source_file.name, 'Copy.java')
+        stats = self.batch.stats
+        self.assertEqual((stats.parsed, stats.duplicates, stats.duplicate_bytes), (2, 1, 11))
+        self.assertEqual(results[2].tree.type_declarations[0].name, 'B')
+
+    def test_changes(self):
+        self.batch.parse_revision(self.repository, 'HEAD~1')
+        results = self.batch.parse_changes(self.repository, 'HEAD~1', 'HEAD')
+        self.assertEqual([(r.path, r.status) for r in results], [('D.java', 'parsed'), ('src/B.java', 'parsed')])
+        self.assertEqual(len(results[1].tree.type_declarations[0].body), 1)
+        back = self.batch.parse_changes(self.repository, 'HEAD', 'HEAD~1')
+        self.assertEqual([(r.path, r.status) for r in back], [('Copy.java', 'cached'), ('src/B.java', 'cached')])
+
+    def test_blobs_are_not_parsed_again(self):
+        self.batch.parse_revision(self.repository, 'HEAD~1')
+        results = self.batch.parse_revision(self.repository, 'HEAD')
+        self.assertEqual([r.status for r in results], ['parsed', 'cached', 'parsed'])
+        self.commit({'src/B.java': 'class B { }'})
+        results = self.batch.parse_changes(self.repository, 'HEAD~1', 'HEAD')
+        self.assertEqual([(r.path, r.status) for r in results], [('src/B.java', 'cached')])
+        self.assertEqual(results[0].tree.type_declarations[0].body, [])
+
+    def test_blobs_read_one_by_one(self):
+        listing = subprocess.check_output(('git', '-C', self.repository, 'ls-tree', 'HEAD~1', 'src/'))
+        blobs = [line.split()[2] for line in listing.splitlines()]
+        contents = _read_blobs(self.repository, blobs)
+        self.assertEqual(next(contents), b'class A { }')
+        self.assertEqual(list(contents), [b'class B { }'])
+        missing = _read_blobs(self.repository, [blobs[0], b'0' * 40])
+        self.assertEqual(next(missing), b'class A { }')
+        self.assertRaises(ValueError, next, missing)
+
+    def test_unknown_revision(self):
+        self.assertRaises(ValueError, self.batch.parse_changes, self.repository, 'HEAD', 'nonexistent')
+
+if __name__ == '__main__':
+    unittest.main()
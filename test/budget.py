@@ -0,0 +1,43 @@
+import unittest
+
+import plyj.parser as plyj
+from plyj.diagnostics import BudgetExceeded
+
+source = 'class A { int[] xs = {' + ', '.join(str(i) for i in range(1000)) + '}; }'
+
+
+class BudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_within_budget(self):
+        tree = self.parser.parse_string('class A { }', max_tokens=5, max_seconds=60)
+        self.assertEqual(tree.type_declarations[0].name, 'A')
+
+    def test_tokens(self):
+        try:
+            self.parser.parse_string(source, max_tokens=100)
+        except BudgetExceeded as e:
+            self.assertEqual(e.reason, 'more than 100 tokens')
+            self.assertEqual(source[e.offset:e.offset + 2], '45')
+        else:
+            self.fail('no BudgetExceeded')
+
+    def test_seconds(self):
+        with self.assertRaises(BudgetExceeded) as raised:
+            self.parser.parse_string(source, max_seconds=0)
+        self.assertEqual(raised.exception.reason, 'more than 0 seconds')
+
+    def test_parser_is_ready_again(self):
+        full = self.parser.parse_string(source)
+        self.assertRaises(BudgetExceeded, self.parser.parse_string, source, max_tokens=10, lazy=True)
+        self.assertRaises(BudgetExceeded, self.parser.parse_string, 'class A { int x = ; ' * 100, max_tokens=50)
+        self.assertEqual(self.parser.parse_string(source), full)
+        self.assertEqual(len(self.parser.diagnostics), 0)
+
+    def test_not_parallel(self):
+        self.assertRaises(ValueError, self.parser.parse_string, source, workers=2, max_tokens=10)
+
+if __name__ == '__main__':
+    unittest.main()
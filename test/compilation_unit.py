@@ -126,6 +126,38 @@ class CompilationUnitTest(unittest.TestCase):
         v = model.Visitor()
         m.accept(v)
 
+    def test_node_index(self):
+        code = '''
+        package foo;
+        import bar.Baz;
+        class Foo {
+            int x = foo.bar(1, 2);
+            java.util.List<String> f;
+            Map<String, List<? super T>>[] g;
+            void foo(int i, Map<? extends K, V> m) {
+                for (String s : list) { baz(s + i); }
+                Outer<A>.Inner<B> o = new Outer<A>.Inner<B>();
+            }
+        }
+        '''
+        indexed = self.parser.parse_string(code, index=True)
+        plain = self.parser.parse_string(code)
+        self.assertEqual(indexed, plain)
+
+        for node_type in (model.MethodInvocation, model.Name, model.Variable, model.Expression,
+                          model.CompilationUnit, model.ForEach, model.Type, model.Wildcard,
+                          model.WildcardBound, model.SourceElement):
+            found = indexed.nodes_of_type(node_type)
+            expected = indexed.find_all(node_type)
+            self.assertEqual(list(map(id, found)), list(map(id, expected)))
+        found = indexed.nodes_of_type(model.Name, model.Literal, model.MethodInvocation)
+        expected = indexed.find_all(model.Name, model.Literal, model.MethodInvocation)
+        self.assertEqual(list(map(id, found)), list(map(id, expected)))
+        self.assertEqual(len(indexed.nodes_of_type(model.Wildcard)), 2)
+
+        invocations = plain.nodes_of_type(model.MethodInvocation)
+        self.assertEqual([i.name for i in invocations], ['bar', 'baz'])
+
     def _assert_declaration(self, compilation_unit, name, index=0, type=model.ClassDeclaration):
         self.assertIsInstance(compilation_unit, model.CompilationUnit)
         self.assertTrue(len(compilation_unit.type_declarations) >= index + 1)
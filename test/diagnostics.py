@@ -0,0 +1,83 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+import plyj.diagnostics as diagnostics
+
+
+class DiagnosticsTest(unittest.TestCase):
+
+    def test_clean_parse(self):
+        parser = plyj.Parser()
+        parser.parse_string('class Foo {}')
+        self.assertEqual(len(parser.diagnostics), 0)
+        self.assertEqual(parser.diagnostics.total, 0)
+
+    def test_records(self):
+        parser = plyj.Parser()
+        tree = parser.parse_string('class Foo {\n  int x = = 3;\n  int # y;\n}')
+        self.assertIsNotNone(tree)
+        first, second = parser.diagnostics
+        self.assertEqual((first.kind, first.offset, first.line, first.column, first.token),
+                         (diagnostics.SYNTAX, 22, 2, 11, '='))
+        self.assertEqual((second.kind, second.line, second.column, second.token),
+                         (diagnostics.LEXICAL, 3, 7, '#'))
+        self.assertIn('illegal character', second.message)
+
+    def test_end_of_input(self):
+        parser = plyj.Parser()
+        parser.parse_string('class Foo { void foo() {')
+        self.assertEqual([d.message for d in parser.diagnostics], ['2 unclosed braces at end of input'])
+        self.assertIsNone(parser.parse_expression('1 +'))
+        self.assertEqual(parser.diagnostics[0].token, None)
+
+    def test_kept_by_the_result(self):
+        parser = plyj.Parser()
+        tree = parser.parse_string('class Foo { int x = ; }')
+        self.assertIs(tree.diagnostics, parser.diagnostics)
+        expression = parser.parse_expression('a + # b')
+        statement = parser.parse_statement('{ int y = ; }')
+        self.assertEqual([d.column for d in tree.diagnostics], [21])
+        self.assertEqual([(d.kind, d.column) for d in expression.diagnostics], [(diagnostics.LEXICAL, 5)])
+        self.assertEqual([d.column for d in statement.diagnostics], [11])
+        self.assertIs(statement.diagnostics, parser.diagnostics)
+        self.assertIsNone(statement.statements[0].diagnostics)
+        self.assertIsNone(model.Name('a').diagnostics)
+
+    def test_lexer_on_its_own(self):
+        lexer = plyj.lex.lex(module=plyj.MyLexer())
+        lexer.input('int # x;')
+        self.assertEqual([t.value for t in lexer], ['int', 'x', ';'])
+        self.assertEqual([(d.kind, d.offset, d.message) for d in lexer.diagnostics],
+                         [(diagnostics.LEXICAL, 4, "illegal character '#' (0x23)")])
+        # a Parser's lexer between parses
+        parser = plyj.Parser()
+        parser.parse_string('class Foo {}')
+        parser.lexer.input('a # b')
+        self.assertEqual([t.value for t in parser.lexer], ['a', 'b'])
+        self.assertEqual(len(parser.lexer.diagnostics), 1)
+        parser.lexer.diagnostics = None
+        parser.parse_string('class Foo { # }')
+        self.assertEqual(len(parser.diagnostics), 1)
+
+    def test_limit(self):
+        parser = plyj.Parser(max_diagnostics=2)
+        parser.parse_string('class Foo { # # # # }')
+        self.assertEqual(len(parser.diagnostics), 2)
+        self.assertEqual(parser.diagnostics.total, 4)
+        self.assertEqual(parser.diagnostics.dropped, 2)
+
+    def test_raise_on_error(self):
+        parser = plyj.Parser(raise_on_error=True)
+        try:
+            parser.parse_string('class Foo { int x = ; }')
+        except plyj.ParseError as e:
+            self.assertEqual(e.diagnostic.token, ';')
+            self.assertEqual(e.diagnostic.column, 21)
+        else:
+            self.fail('no ParseError raised')
+        # the parser is still usable afterwards
+        self.assertIsNotNone(parser.parse_string('class Foo {}'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''
+class Foo {
+    @Deprecated int x = 1 + 2;
+    void foo(String s) { bar("x", 3); }
+}
+'''
+
+
+class Tuples(object):
+    # literals and method invocations as tuples
+
+    @staticmethod
+    def Literal(value):
+        return ('Literal', value)
+
+    @staticmethod
+    def MethodInvocation(name, arguments=None, type_arguments=None, target=None):
+        return ('MethodInvocation', name, tuple(arguments or ()))
+
+
+class NoAnnotations(object):
+    Annotation = staticmethod(lambda *args, **kwargs: None)
+
+
+class SlottedLiteral(object):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+class FactoryTest(unittest.TestCase):
+
+    def test_default(self):
+        tree = plyj.Parser().parse_string(source)
+        self.assertIsInstance(tree.type_declarations[0].body[0].variable_declarators[0].initializer.lhs,
+                              model.Literal)
+        self.assertEqual(plyj.Parser(factory=model).parse_string(source), tree)
+        self.assertEqual(plyj.Parser(factory=object()).parse_string(source), tree)
+
+    def test_tuples(self):
+        tree = plyj.Parser(factory=Tuples).parse_string(source)
+        field, method = tree.type_declarations[0].body
+        self.assertEqual(field.variable_declarators[0].initializer.lhs, ('Literal', '1'))
+        self.assertEqual(method.body[0].expression, ('MethodInvocation', 'bar', (('Literal', '"x"'), ('Literal', '3'))))
+        # everything else is still the model, positioned as usual
+        self.assertEqual(method.source_text(), 'void foo(String s) { bar("x", 3); }')
+
+    def test_dropped_and_slotted(self):
+        tree = plyj.Parser(factory=NoAnnotations).parse_string(source)
+        self.assertEqual(tree.type_declarations[0].body[0].modifiers, [None])
+        tree = plyj.Parser(factory=type('Slotted', (object,), {'Literal': SlottedLiteral})).parse_string(source)
+        literal = tree.type_declarations[0].body[0].variable_declarators[0].initializer.rhs
+        self.assertIsInstance(literal, SlottedLiteral)
+        self.assertEqual(literal.value, '2')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''/* license */
+package a.b; // the package
+import java.util.*;
+import static java.lang.Math.max;
+
+/** doc */
+@Deprecated
+public class A { void f() { } }
+'''
+
+
+def text_file(text):
+    # io.StringIO takes unicode text only, under Python 2 as well
+    return io.StringIO(text.encode('utf-8').decode('utf-8'))
+
+
+class HeaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_header_string(self):
+        tree = self.parser.parse_header_string(source)
+        self.assertEqual(tree.package_declaration.name.value, 'a.b')
+        self.assertEqual([i.name.value for i in tree.import_declarations], ['java.util', 'java.lang.Math.max'])
+        self.assertEqual(tree.type_declarations, [])
+        self.assertEqual(tree.end, source.index('@Deprecated'))
+        self.assertEqual(tree.import_declarations[1].lineno, 4)
+
+    def test_where_header_ends(self):
+        for code, header in [('import a.B; @interface C { }', 'import a.B; '),
+                             ('@A(x = ")") @b.C package d;', '@A(x = ")") @b.C package d;'),
+                             ('package a; ; import b.C;', 'package a; '),
+                             ('class A { }', ''),
+                             ('', '')]:
+            tree = self.parser.parse_header_string(code)
+            self.assertEqual(tree.source_text(), header)
+            self.assertEqual(len(self.parser.diagnostics), 0)
+
+    def test_header_file(self):
+        expected = self.parser.parse_header_string(source)
+        for chunk_size in range(1, len(source) + 1):
+            tree = self.parser.parse_header_file(text_file(source), chunk_size=chunk_size)
+            self.assertEqual(tree, expected)
+            self.assertEqual(tree.end, expected.end)
+
+    def test_reads_only_header(self):
+        _file = text_file(source + 'class B { }\n' * 10000)
+        self.parser.parse_header_file(_file, chunk_size=64)
+        self.assertLessEqual(_file.tell(), 256)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+import plyj.query as query
+
+source = '''
+class A {
+    static { init(); }
+    A() { super(); }
+    void f() { int x = 1; g(x); }
+    void g(int x) { if (x > 0) { h(); } }
+    abstract void h();
+}
+'''
+
+
+class LazyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_parsed_on_first_use(self):
+        tree = self.parser.parse_string(source, lazy=True)
+        initializer, constructor, f, g, h = tree.type_declarations[0].body
+        bodies = [initializer.block, constructor.block, f.body, g.body]
+        for body in bodies:
+            self.assertIsInstance(body, model.LazyBlock)
+            self.assertFalse(body.parsed)
+        self.assertIsNone(h.body)
+        self.assertEqual(f.body.source_text(), '{ int x = 1; g(x); }')
+        self.assertEqual(f.body.lineno, 5)
+
+        self.assertEqual(len(f.body), 2)
+        self.assertTrue(f.body.parsed)
+        self.assertFalse(g.body.parsed)
+        statements = f.body.statements
+        self.assertIs(f.body.statements, statements)
+        self.assertIsInstance(f.body[1].expression, model.MethodInvocation)
+        self.assertEqual(f.body[1].source_text(), 'g(x);')
+        self.assertEqual([s.__class__ for s in g.body], [model.IfThenElse])
+        self.assertEqual(initializer.block.statements[0].expression.name, 'init')
+
+    def test_same_as_full_parse(self):
+        full = self.parser.parse_string(source)
+        tree = self.parser.parse_string(source, lazy=True)
+        self.assertEqual(tree, full)
+        self.assertEqual(full, tree)
+        names = [n.name for n in tree.find_all(model.MethodInvocation)]
+        self.assertEqual(names, ['init', 'g', 'h'])
+
+    def test_traversed_as_full_parse(self):
+        full = self.parser.parse_string(source)
+        tree = self.parser.parse_string(source, lazy=True)
+
+        def classes(tree):
+            return [(n.__class__.__name__.replace('Lazy', ''), p.__class__.__name__.replace('Lazy', ''))
+                    for n, p in tree.walk(parents=True)]
+        self.assertEqual(classes(tree), classes(full))
+        self.assertEqual(len(tree.find_all(model.Block)), len(full.find_all(model.Block)))
+        self.assertEqual(len(tree.find_all(model.Statement)), len(full.find_all(model.Statement)))
+
+        class Recorder(model.Visitor):
+            def __init__(self):
+                super(Recorder, self).__init__()
+                self.visited = []
+
+            def visit_Block(self, block):
+                self.visited.append(('Block', len(block.statements)))
+                return True
+
+            def visit_MethodInvocation(self, invocation):
+                self.visited.append(('MethodInvocation', invocation.name))
+                return True
+
+        visitors = [Recorder(), Recorder()]
+        full.accept(visitors[0])
+        self.parser.parse_string(source, lazy=True).accept(visitors[1])
+        self.assertEqual(visitors[1].visited, visitors[0].visited)
+        self.assertEqual(visitors[0].visited[0], ('Block', 1))
+
+        for selector in ('MethodDeclaration > VariableDeclaration', 'ClassInitializer > Block',
+                         'Block MethodInvocation', 'IfThenElse > Block'):
+            matches = query.compile(selector).matches
+            self.assertEqual([m.node for m in matches(tree)], [m.node for m in matches(full)], selector)
+
+    def test_empty_bodies(self):
+        code = 'class A { { } void f() { } }'
+        full = self.parser.parse_string(code)
+        tree = self.parser.parse_string(code, lazy=True)
+        self.assertEqual(len(list(tree.walk())), len(list(full.walk())))
+        self.assertEqual(len(tree.find_all(model.Block)), 1)
+
+    def test_diagnostics(self):
+        tree = self.parser.parse_string('class A { void f() { int x = ; } void g() { } }', lazy=True)
+        diagnostics = self.parser.diagnostics
+        self.assertEqual(len(diagnostics), 0)
+        f, g = tree.type_declarations[0].body
+        list(g.body)
+        self.parser.parse_string('class B { }')
+        list(f.body)
+        self.assertEqual([d.column for d in diagnostics], [30])
+        self.assertIsInstance(f.body[-1], model.Erroneous)
+
+    def test_used_while_parsing(self):
+        tree = self.parser.parse_string(source, lazy=True)
+        errors = self.parser.diagnostics
+        f, g = tree.type_declarations[0].body[2:4]
+        parser = self.parser
+        sizes = []
+
+        class Sizes(model.Visitor):
+            def visit_MethodDeclaration(self, method):
+                sizes.append((len(f.body), parser.validate_string('class C {}')))
+                return True
+
+        code = 'class B { void f() { } void g() { int x = ; } void h() { } }'
+        streamed = self.parser.stream_string(code, Sizes())
+        self.assertEqual(sizes, [(2, None)] * 3)
+        self.assertEqual(streamed, self.parser.parse_string(code))
+        self.assertEqual([d.column for d in self.parser.diagnostics], [43])
+        self.assertEqual(len(errors), 0)
+        self.assertEqual(len(g.body), 1)
+        self.assertEqual(self.parser.stream_string(code, Sizes()), streamed)
+
+    def test_not_indexed(self):
+        self.assertRaises(ValueError, self.parser.parse_string, source, lazy=True, index=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''
+@Deprecated package p;
+@A(x = 1, y = @B) public final class C {
+    @Override protected static int f(final @N int a) { return a > 0 ? 2 : g("s"); }
+    @interface I { int v() default 1; B b() default @B; }
+}
+'''
+
+
+class OmitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_annotations(self):
+        tree = self.parser.parse_string(source, omit=['annotations'])
+        self.assertEqual(len(self.parser.diagnostics), 0)
+        self.assertEqual(tree.find_all(model.Annotation), [])
+        self.assertEqual(tree.package_declaration.modifiers, [])
+        cls = tree.type_declarations[0]
+        self.assertEqual(cls.modifiers, ['public', 'final'])
+        f, i = cls.body
+        self.assertEqual(f.modifiers, ['protected', 'static'])
+        self.assertEqual(f.parameters[0].modifiers, ['final'])
+        self.assertIsNone(i.body[1].default)
+        # but for the one in @A
+        self.assertEqual(len(tree.find_all(model.Literal)), 4)
+
+    def test_modifiers(self):
+        tree = self.parser.parse_string(source, omit=['modifiers'])
+        self.assertEqual(tree.find_all(model.Annotation), [])
+        f = tree.type_declarations[0].body[0]
+        self.assertEqual(f.modifiers, [])
+        self.assertEqual(f.parameters[0].modifiers, [])
+
+    def test_literals(self):
+        full = self.parser.parse_string(source)
+        tree = self.parser.parse_string(source, omit=['literals'])
+        self.assertEqual(tree.find_all(model.Literal), [])
+        self.assertEqual(len(tree.find_all(model.Annotation)), 6)
+        conditional = tree.type_declarations[0].body[0].body[0].result
+        self.assertIsNone(conditional.predicate.rhs)
+        self.assertIsNone(conditional.if_true)
+        self.assertEqual(conditional.if_false.arguments, [None])
+        # positions do not depend on what was omitted
+        self.assertEqual(conditional.source_text(), 'a > 0 ? 2 : g("s")')
+        self.assertEqual([(n.__class__, n.start, n.end) for n in tree.walk()],
+                         [(n.__class__, n.start, n.end) for n in full.walk()
+                          if not isinstance(n, model.Literal)])
+
+    def test_lazy_and_indexed(self):
+        omit = ('annotations', 'literals')
+        tree = self.parser.parse_string(source, omit=omit)
+        lazy = self.parser.parse_string(source, omit=omit, lazy=True)
+        self.assertEqual(lazy, tree)
+        indexed = self.parser.parse_string(source, omit=omit, index=True)
+        self.assertEqual(indexed, tree)
+        self.assertEqual(indexed.nodes_of_type(model.Literal), [])
+        self.assertEqual(len(indexed.nodes_of_type(model.MethodDeclaration)), 1)
+        # the parser goes back to building everything
+        self.assertEqual(len(self.parser.parse_string(source).find_all(model.Literal)), 5)
+
+    def test_unknown(self):
+        self.assertRaises(ValueError, self.parser.parse_string, source, omit=['comments'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = r'''
+class A<T> extends B {
+    static int[] xs = {1, 2};
+    Runnable r = new Runnable() { public void run() { go("}"); } };
+    static { init('{'); }
+    { inst(); /* } */ }
+    A() throws E { super(); }
+    <U> U f(U u) { if (u == null) { return u; } // }
+        return u; }
+    abstract void g();
+    class Inner { void h() { } }
+    enum E { X(1) { void k() { } }, Z; E(int i) { } }
+    @interface Ann { int[] v() default {1}; }
+}
+'''
+
+
+def expand(parser, tree):
+    # replaces every UnparsedBody the way a full parse would have it
+    for node in list(tree.walk()):
+        for field in node._fields:
+            body = getattr(node, field)
+            if isinstance(body, model.UnparsedBody):
+                block = parser.parse_body(body)
+                setattr(node, field, block if isinstance(node, model.ClassInitializer) else block.statements)
+
+
+class OutlineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_skipped_bodies(self):
+        tree = self.parser.parse_string(source, outline=True)
+        self.assertEqual(len(self.parser.diagnostics), 0)
+        bodies = [body.source_text() for body in tree.find_all(model.UnparsedBody)]
+        self.assertEqual(bodies, ["{ init('{'); }", '{ inst(); /* } */ }', '{ super(); }',
+                                  '{ if (u == null) { return u; } // }\n        return u; }',
+                                  '{ }', '{ }', '{ }'])
+        # field initializers are parsed, anonymous classes and all
+        self.assertEqual([n.name for n in tree.find_all(model.MethodInvocation)], ['go'])
+        names = [n.name for n in tree.find_all(model.MethodDeclaration)]
+        self.assertEqual(names, ['run', 'f', 'g', 'h', 'k'])
+
+    def test_parse_body(self):
+        full = self.parser.parse_string(source)
+        tree = self.parser.parse_string(source, outline=True)
+        method = tree.type_declarations[0].body[5]
+        block = self.parser.parse_body(method.body)
+        self.assertIsInstance(block, model.Block)
+        self.assertEqual(block.start, method.body.start)
+        self.assertEqual(block.statements[0].lineno, 8)
+        self.assertEqual(block.statements[1].source_text(), 'return u;')
+        expand(self.parser, tree)
+        self.assertEqual(tree, full)
+        spans = [(n.__class__, n.start, n.end) for n in tree.walk()]
+        self.assertEqual(spans, [(n.__class__, n.start, n.end) for n in full.walk()])
+
+    def test_unclosed_body(self):
+        tree = self.parser.parse_string('class A { void f() { if (x) { }', outline=True)
+        body = tree.type_declarations[0].body[0].body
+        self.assertEqual(body.source_text(), '{ if (x) { }')
+        self.assertEqual([d.message for d in self.parser.diagnostics],
+                         ['2 unclosed braces at end of input'])
+
+if __name__ == '__main__':
+    unittest.main()
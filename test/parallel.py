@@ -0,0 +1,70 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''package p;
+
+@A({1}) public class C<T> extends B {
+    int[] xs = {1, 2}, ys = {3};
+    Runnable r = new Runnable() { public void run() { } };
+    static { init(); }
+    ;
+    @B({2}) C() { }
+    class Inner { void h() { } }
+    void f() { if (x) { g(); } }
+    abstract int g();
+}
+
+interface I { void k(); }
+
+class D { int q; void w() { } }
+'''
+
+
+def spans(tree):
+    return [(n.__class__, n.start, n.end, n.source_file is tree.source_file) for n in tree.walk()]
+
+
+class ParallelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_member_ranges(self):
+        bodies = plyj._class_bodies(source)
+        self.assertEqual([source[brace:close + 1][:10] for brace, close, _ in bodies],
+                         ['{\n    int[', '{ int q; v'])
+        members = [source[start:end].strip() for start, end, _ in plyj._member_chunks(bodies, 100)]
+        self.assertEqual(members, ['int[] xs = {1, 2}, ys = {3};',
+                                   'Runnable r = new Runnable() { public void run() { } };',
+                                   'static { init(); }', ';', '@B({2}) C() { }',
+                                   'class Inner { void h() { } }', 'void f() { if (x) { g(); } }',
+                                   'abstract int g();', '', 'int q;', 'void w() { }', ''])
+
+    def test_same_as_sequential(self):
+        sequential = self.parser.parse_string(source)
+        tree = self.parser.parse_string(source, workers=2)
+        self.assertEqual(len(self.parser.diagnostics), 0)
+        self.assertEqual(tree, sequential)
+        self.assertEqual(spans(tree), spans(sequential))
+
+    def test_outline_and_omit(self):
+        sequential = self.parser.parse_string(source, outline=True, omit=['literals'])
+        tree = self.parser.parse_string(source, workers=2, outline=True, omit=['literals'])
+        self.assertEqual(tree, sequential)
+        self.assertEqual(len(tree.find_all(model.UnparsedBody)), 5)
+
+    def test_diagnostics(self):
+        code = source.replace('abstract int g();', 'abstract int g( ;').replace('void w()', 'void w(')
+        self.parser.parse_string(code)
+        expected = [(d.offset, d.line, d.column, d.message) for d in self.parser.diagnostics]
+        self.parser.parse_string(code, workers=2)
+        self.assertEqual([(d.offset, d.line, d.column, d.message) for d in self.parser.diagnostics],
+                         expected)
+
+    def test_not_indexed(self):
+        self.assertRaises(ValueError, self.parser.parse_string, source, workers=2, index=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+
+class PositionsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def text(self, tree, node):
+        return tree.source_file.text[node.start:node.end]
+
+    def test_spans(self):
+        code = ('class Foo {\n'
+                '    List<List<String>> xs;\n'
+                '    void foo(int a) { int b = a + 1; bar(b); }\n'
+                '}\n')
+        tree = self.parser.parse_string(code)
+        self.assertEqual((tree.start, tree.end), (0, len(code)))
+        method = tree.find_all(model.MethodDeclaration)[0]
+        self.assertEqual(self.text(tree, method), 'void foo(int a) { int b = a + 1; bar(b); }')
+        self.assertEqual((method.lineno, method.column), (3, 5))
+        self.assertEqual((method.end_lineno, method.end_column), (3, 47))
+        texts = [self.text(tree, n) for n in tree.find_all(model.Type)]
+        self.assertEqual(texts[:3], ['List<List<String>>', 'List<String>', 'String'])
+        self.assertEqual(self.text(tree, tree.find_all(model.VariableDeclaration)[0]), 'int b = a + 1;')
+        self.assertEqual(self.text(tree, tree.find_all(model.Additive)[0]), 'a + 1')
+
+    def test_children_within_parents(self):
+        tree = self.parser.parse_string('''
+        @Deprecated public class Foo<T extends Comparable<T>> extends Bar<Map<String, ? extends T>> {
+            private final int[] xs = {1, 2}, ys[];
+            abstract <V> V id(final V v) throws E;
+            void foo() {
+                label: for (String s : list) { Object o = (Foo<T>.Inner[]) s; }
+                switch (x) { case 1: default: }
+            }
+        }
+        ''')
+        for node, parent in tree.walk(parents=True):
+            self.assertIsNotNone(node.start, node)
+            self.assertIs(node.source_file, tree.source_file)
+            if parent is not None:
+                self.assertTrue(parent.start <= node.start <= node.end <= parent.end, node)
+
+    def test_line_terminators(self):
+        tree = self.parser.parse_string('class A {}\r\n\r\nclass B {}\rclass C {}\n', lineno=10)
+        positions = [(decl.lineno, decl.column) for decl in tree.type_declarations]
+        self.assertEqual(positions, [(10, 1), (12, 1), (13, 1)])
+
+    def test_expression_offsets(self):
+        expr = self.parser.parse_expression('a + b * c')
+        self.assertEqual((expr.start, expr.end), (0, 9))
+        self.assertEqual((expr.rhs.start, expr.rhs.column), (4, 5))
+
+    def test_source_text(self):
+        code = 'class Foo {\n    void foo() { /* keep */ bar("\u00e9t\u00e9", 1); }\n}\n'
+        tree = self.parser.parse_string(code)
+        invocation = tree.find_all(model.MethodInvocation)[0]
+        self.assertEqual(invocation.source_text(), 'bar("\u00e9t\u00e9", 1)')
+        body = tree.find_all(model.MethodDeclaration)[0]
+        self.assertEqual(body.source_text(), 'void foo() { /* keep */ bar("\u00e9t\u00e9", 1); }')
+        self.assertEqual(tree.source_text(), code)
+
+        data = invocation.source_bytes()
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(data.tobytes(), 'bar("\u00e9t\u00e9", 1)'.encode('utf-8'))
+        literal = tree.find_all(model.Literal)[1]
+        self.assertEqual(literal.source_bytes().tobytes(), b'1')
+
+    def test_hand_built_nodes(self):
+        name = model.Name('foo')
+        self.assertIsNone(name.start)
+        self.assertIsNone(name.lineno)
+        self.assertIsNone(name.source_text())
+        self.assertIsNone(name.source_bytes())
+        self.assertEqual(self.parser.parse_expression('foo'), name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+import plyj.query as query
+
+
+class QueryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+        self.tree = self.parser.parse_string('''
+        class Foo {
+            void testFoo() { Thread.sleep(1); foo(); }
+            abstract void bar();
+            void baz() {
+                System.out.println("x");
+                new Runnable() {
+                    public void run() { Thread.sleep(2); }
+                };
+            }
+        }
+        ''')
+
+    def names(self, source):
+        return [getattr(m.node, 'name', m.node.__class__.__name__)
+                for m in query.compile(source).matches(self.tree)]
+
+    def test_type_and_constraints(self):
+        self.assertEqual(self.names('MethodInvocation'), ['sleep', 'foo', 'println', 'sleep'])
+        self.assertEqual(self.names('MethodInvocation[name="sleep"][target="Thread"]'), ['sleep', 'sleep'])
+        self.assertEqual(self.names('MethodInvocation[target.value=System.out]'), ['println'])
+        self.assertEqual(self.names('MethodInvocation[target]'), ['sleep', 'println', 'sleep'])
+        self.assertEqual(self.names('MethodDeclaration[name=/^test/]'), ['testFoo'])
+        self.assertEqual(self.names('MethodDeclaration[abstract=true]'), ['bar'])
+        self.assertEqual(self.names('MethodDeclaration[name!=baz][abstract=false]'), ['testFoo', 'run'])
+
+    def test_subclasses_and_wildcard(self):
+        literals = query.compile('Expression > Literal').matches(self.tree)
+        self.assertEqual([m.node.value for m in literals], ['1', '"x"', '2'])
+        self.assertEqual(len(query.compile('*').matches(self.tree)),
+                         len(list(self.tree.walk())))
+
+    def test_axes(self):
+        self.assertEqual(self.names('MethodDeclaration[name=baz] MethodInvocation'), ['println', 'sleep'])
+        self.assertEqual(self.names('ClassDeclaration > MethodDeclaration'), ['testFoo', 'bar', 'baz'])
+        self.assertEqual(self.names('InstanceCreation MethodDeclaration > ExpressionStatement > MethodInvocation'),
+                         ['sleep'])
+        self.assertEqual(self.names('MethodDeclaration > MethodInvocation'), [])
+
+    def test_alternatives(self):
+        self.assertEqual(self.names('MethodDeclaration[abstract=true], MethodInvocation[name=foo]'),
+                         ['foo', 'bar'])
+
+    def test_reuse(self):
+        q = query.compile('MethodInvocation[name="sleep"]')
+        other = self.parser.parse_statement('Thread.sleep(5);')
+        self.assertEqual(len(q.matches(self.tree)), 2)
+        self.assertEqual(len(q.matches(other)), 1)
+        self.assertEqual(len(q.matches(self.tree)), 2)
+
+    def test_errors(self):
+        for source in ['Foo', 'MethodInvocation[', 'MethodInvocation >', '[name]',
+                       'MethodInvocation[name=]', 'MethodInvocation # foo']:
+            self.assertRaises(query.QueryError, query.compile, source)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+
+class RecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def errors(self, tree):
+        return [e.source_text() for e in tree.find_all(model.Erroneous)]
+
+    def methods(self, tree):
+        return [m.name for m in tree.find_all(model.MethodDeclaration)]
+
+    def test_statement(self):
+        tree = self.parser.parse_string('class A { void f() { int x = = 3; foo(); } void g() {} }')
+        self.assertEqual(self.errors(tree), ['int x = = 3;'])
+        self.assertEqual(self.methods(tree), ['f', 'g'])
+        self.assertEqual([i.name for i in tree.find_all(model.MethodInvocation)], ['foo'])
+
+    def test_missing_semicolon(self):
+        tree = self.parser.parse_string('class A { void f() { foo() } void g() { bar(); } }')
+        self.assertEqual(self.errors(tree), ['foo()'])
+        self.assertEqual(self.methods(tree), ['f', 'g'])
+
+    def test_member(self):
+        tree = self.parser.parse_string('class A { int x = ; void f(int) { foo(); } int y; }')
+        self.assertEqual(self.errors(tree), ['int x = ;', 'void f(int) { foo(); }'])
+        # what follows the skipped source is kept
+        erroneous = tree.find_all(model.Erroneous)[1]
+        self.assertEqual(erroneous.body, [model.ExpressionStatement(model.MethodInvocation('foo'))])
+        self.assertEqual(len(tree.find_all(model.FieldDeclaration)), 1)
+
+    def test_type_declaration(self):
+        tree = self.parser.parse_string('class A extends { void f() {} } class B {}')
+        self.assertEqual(self.errors(tree), ['class A extends { void f() {} }'])
+        self.assertEqual([t.__class__ for t in tree.type_declarations], [model.Erroneous, model.ClassDeclaration])
+
+    def test_after_type_declarations(self):
+        for source, skipped, token in [('class A {} }', '}', '}'),
+                                       ('class A { void f() {} } }', '}', '}'),
+                                       ('class A { void f() {} } foo', 'foo', 'foo'),
+                                       ('package p; import q; class A {} } }\n', '} }', '}')]:
+            tree = self.parser.parse_string(source)
+            self.assertEqual(self.errors(tree), [skipped])
+            self.assertEqual([t.__class__ for t in tree.type_declarations], [model.ClassDeclaration, model.Erroneous])
+            self.assertEqual([d.token for d in tree.diagnostics], [token])
+
+    def test_unclosed_braces(self):
+        tree = self.parser.parse_string('class A { void f() { foo();\n')
+        self.assertEqual(self.methods(tree), ['f'])
+
+    def test_index(self):
+        tree = self.parser.parse_string('class A { void f() { int x = bar( = 3; foo(); } }', index=True)
+        self.assertEqual([i.name for i in tree.nodes_of_type(model.MethodInvocation)], ['foo'])
+        self.assertEqual(tree.nodes_of_type(model.Name), tree.find_all(model.Name))
+
+if __name__ == '__main__':
+    unittest.main()
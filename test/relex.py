@@ -0,0 +1,68 @@
+import unittest
+
+import plyj.parser as plyj
+
+source = '''class A {
+    /* a comment */
+    String s = "a string";
+    int f() { return 1 + x; }\r
+    char c = 'c';
+}
+'''
+
+
+def tokens(stream):
+    return [(t.type, t.value, t.lexpos, t.lineno) for t in stream]
+
+
+class RelexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def assertRelexed(self, stream, start, end, text):
+        result = stream.edit(start, end, text)
+        self.assertEqual(tokens(stream), tokens(self.parser.lex_string(stream.text)))
+        return result
+
+    def test_lex(self):
+        stream = self.parser.lex_string(source)
+        self.assertEqual([t.value for t in stream][:6], ['class', 'A', '{', 'String', 's', '='])
+        self.assertEqual(stream[-1].lineno, 6)
+        self.assertEqual(len(stream.diagnostics), 0)
+
+    def test_edit(self):
+        stream = self.parser.lex_string(source)
+        at = source.index('1 + x')
+        # the line is lexed again from the token before it
+        self.assertEqual(self.assertRelexed(stream, at, at + 1, '42'), (7, 8, 8))
+        self.assertEqual(stream[15].value, '+')
+        self.assertEqual(stream[15].lexpos, at + 3)
+        # a new line moves every token after it a line down
+        self.assertRelexed(stream, at, at, '\n')
+        self.assertEqual(stream[-1].lineno, 7)
+
+    def test_strings_and_comments(self):
+        stream = self.parser.lex_string(source)
+        at = source.index('string"')
+        self.assertRelexed(stream, at + 6, at + 7, '')
+        self.assertEqual([d.offset for d in stream.diagnostics], [source.index('"a')])
+        self.assertRelexed(stream, at + 6, at + 6, '"')
+        # ending a comment before where it did is followed by tokens
+        at = source.index('comment */')
+        self.assertRelexed(stream, at, at, '*/')
+        self.assertRelexed(stream, at, at + 2, '')
+        # opening one that nothing ends, and ending it after
+        self.assertRelexed(stream, source.index('int f'), source.index('int f'), '/*')
+        self.assertRelexed(stream, len(stream.text), len(stream.text), '*/')
+        self.assertEqual(stream[-1].value, ';')
+
+    def test_typing(self):
+        stream = self.parser.lex_string(source)
+        at = source.index('}\r')
+        for char in 'if (a) { s = "x\\"/*"; } // //':
+            self.assertRelexed(stream, at, at, char)
+            at += 1
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''package p;
+
+class A {
+    int x = 1;
+    void f(int a) {
+        int y = a + 1;
+        if (y > 2) { g(y); } else { h(); }
+        switch (a) { case 1: k(); break; default: }
+        out: while (true) { break out; }
+    }
+    A() { super(); }
+    Runnable r = new Runnable() { public void run() { go(); } };
+}
+'''
+
+
+def spans(tree):
+    return [(n.__class__, n.start, n.end, n.source_file is tree.source_file) for n in tree.walk()]
+
+
+class ReparseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def assertReparsed(self, code, start, end, text, **options):
+        tree = self.parser.parse_string(code, **options)
+        result = self.parser.reparse(tree, start, end, text)
+        diagnostics = [(d.offset, d.message) for d in self.parser.diagnostics]
+        edited = code[:start] + text + code[end:]
+        full = self.parser.parse_string(edited, **options)
+        if full is None:
+            self.assertIsNone(result)
+            return False
+        self.assertEqual(result.source_file.text, edited)
+        self.assertEqual(result, full)
+        self.assertEqual(spans(result), spans(full))
+        self.assertEqual(diagnostics, [(d.offset, d.message) for d in self.parser.diagnostics])
+        return result is tree
+
+    def test_statement(self):
+        start = source.index('g(y)')
+        self.assertTrue(self.assertReparsed(source, start, start + 1, 'gg'))
+        start = source.index('k();')
+        self.assertTrue(self.assertReparsed(source, start + 1, start + 3, '(1, 2);\n m()'))
+
+    def test_member(self):
+        start = source.index('super')
+        self.assertTrue(self.assertReparsed(source, start, start + 7, 'this(1)'))
+        start = source.index('run')
+        self.assertTrue(self.assertReparsed(source, start, start + 3, 'walk'))
+        # one member becomes two
+        start = source.index('A()')
+        self.assertTrue(self.assertReparsed(source, start + 1, start + 1, '() { } void b'))
+
+    def test_whole(self):
+        # between members, and errors
+        start = source.index('    A()')
+        self.assertFalse(self.assertReparsed(source, start, start, 'int z;'))
+        self.assertFalse(self.assertReparsed(source, source.index('g(y)'), source.index('g(y)'), '}'))
+
+    def test_every_offset(self):
+        for start in range(len(source) + 1):
+            for end, text in [(start, 'x'), (start, ';'), (min(start + 1, len(source)), '')]:
+                self.assertReparsed(source, start, end, text)
+
+    def test_typing(self):
+        tree = self.parser.parse_string(source)
+        code = source
+        at = source.index('g(y);') + 5
+        for char in ' z = y * 2;':
+            tree = self.parser.reparse(tree, at, at, char)
+            code = code[:at] + char + code[at:]
+            at += 1
+        self.assertEqual(tree, self.parser.parse_string(code))
+        self.assertEqual(spans(tree), spans(self.parser.parse_string(code)))
+
+    def test_edits_apart(self):
+        # offsets are only used after several edits in different places
+        tree = self.parser.parse_string(source)
+        code = source
+        for anchor, replaced, text in [('go()', 2, 'stop'), ('int x', 5, 'long wide'), ('h()', 1, 'hh'),
+                                       ('super()', 7, 'this(1, 2)'), ('stop', 4, 's'), ('y > 2', 5, 'y')]:
+            at = code.index(anchor)
+            tree = self.parser.reparse(tree, at, at + replaced, text)
+            code = code[:at] + text + code[at + replaced:]
+        full = self.parser.parse_string(code)
+        self.assertEqual(tree, full)
+        self.assertEqual(spans(tree), spans(full))
+        self.assertEqual([n.source_text() for n in tree.walk()], [n.source_text() for n in full.walk()])
+
+    def test_lazy_bodies_after_edits(self):
+        tree = self.parser.parse_string(source, lazy=True)
+        at = source.index('1;')
+        self.assertIs(self.parser.reparse(tree, at, at + 1, '100'), tree)
+        code = source[:at] + '100' + source[at + 1:]
+        at = code.index('super')
+        self.assertIs(self.parser.reparse(tree, at, at + 5, 'this'), tree)
+        code = code[:at] + 'this' + code[at + 5:]
+        full = self.parser.parse_string(code)
+        self.assertEqual(spans(tree), spans(full))
+
+    def test_index_rebuilt(self):
+        tree = self.parser.parse_string(source, index=True)
+        start = source.index('g(y)')
+        self.assertIs(self.parser.reparse(tree, start, start + 1, 'gg'), tree)
+        names = [n.name for n in tree.nodes_of_type(model.MethodInvocation)]
+        self.assertIn('gg', names)
+        self.assertEqual(tree.nodes_of_type(model.MethodInvocation), tree.find_all(model.MethodInvocation))
+        # and kept by a parse of the whole source
+        start = source.index('    A()')
+        tree = self.parser.reparse(tree, start, start, 'int z = g();')
+        self.assertIsNotNone(tree._node_index)
+        self.assertEqual(tree.nodes_of_type(model.MethodInvocation), tree.find_all(model.MethodInvocation))
+
+    def test_options(self):
+        edits = [('g(y)', 1, 'gg'), ('super', 5, 'this'), ('run', 3, 'walk'), ('1;', 1, '100'),
+                 ('    A()', 0, 'int z;')]
+        for options in [{'omit': ('literals',)}, {'outline': True}, {'lazy': True}]:
+            for anchor, replaced, text in edits:
+                at = source.index(anchor)
+                self.assertReparsed(source, at, at + replaced, text, **options)
+        tree = self.parser.parse_string(source, omit=('literals',))
+        for anchor, replaced, text in edits:
+            at = tree.source_file.text.index(anchor)
+            tree = self.parser.reparse(tree, at, at + replaced, text)
+            self.assertEqual(tree.find_all(model.Literal), [])
+        start = source.index('g(y)')
+        tree = self.parser.reparse(self.parser.parse_string(source, outline=True), start, start + 1, 'gg')
+        self.assertEqual(len(tree.find_all(model.UnparsedBody)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+source = '''
+package a;
+import b.C;
+@Ann class A extends B {
+    int x = new Runnable() { public void run() { class L { void l() { } } } }.hashCode();
+    static { foo(); }
+    void f() { bar(); }
+    class Inner { void g() { } ; enum E { X { void h() { } }, Y; void i() { } } }
+    @interface Q { int v(); class N { } }
+}
+interface I { void j(); }
+'''
+
+
+class Recorder(object):
+    # records every handler call along with what has been parsed so far
+
+    def __init__(self, parser=None):
+        self.events = []
+        self.parser = parser
+
+    def __getattr__(self, name):
+        if not name.startswith(('visit_', 'leave_')):
+            raise AttributeError(name)
+
+        def handler(node):
+            self.events.append((name, getattr(node, 'name', None)))
+            return True
+        return handler
+
+
+class Declarations(model.Visitor):
+
+    def __init__(self, parser):
+        super(Declarations, self).__init__()
+        self.parser = parser
+        self.events = []
+        self.lexpos = {}
+
+    def visit_ClassDeclaration(self, class_decl):
+        self.events.append(('visit', class_decl.name))
+        self.lexpos[class_decl.name] = self.parser.lexer.lexpos
+        return class_decl.name != 'Inner'
+
+    def leave_ClassDeclaration(self, class_decl):
+        self.events.append(('leave', class_decl.name, len(class_decl.body)))
+
+    def visit_MethodDeclaration(self, method_decl):
+        self.events.append(('visit', method_decl.name))
+        return True
+
+
+class StreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_same_as_accept(self):
+        tree = self.parser.parse_string(source)
+        expected = Recorder()
+        tree.accept(expected)
+        streamed = Recorder()
+        self.assertEqual(self.parser.stream_string(source, streamed), tree)
+        self.assertEqual(streamed.events, expected.events)
+
+        without_tree = Recorder()
+        root = self.parser.stream_string(source, without_tree, build_tree=False)
+        self.assertEqual(without_tree.events, expected.events)
+        self.assertEqual(root.import_declarations, [])
+        self.assertEqual(root.type_declarations, [])
+        self.assertEqual((root.start, root.end), (0, len(source)))
+
+    def test_visitor(self):
+        v = Declarations(self.parser)
+        self.parser.stream_string(source, v)
+        self.assertEqual(v.events, [('visit', 'A'), ('visit', 'run'), ('visit', 'L'), ('visit', 'l'),
+                                    ('leave', 'L', 1), ('visit', 'f'), ('visit', 'Inner'),
+                                    ('leave', 'Inner', 3), ('visit', 'N'), ('leave', 'N', 0),
+                                    ('leave', 'A', 5), ('visit', 'j')])
+        # member level classes are visited as soon as their header is parsed
+        self.assertLess(v.lexpos['A'], source.index('int x'))
+        self.assertLess(v.lexpos['Inner'], source.index('void g'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+
+class ValidateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+
+    def test_valid(self):
+        self.assertIsNone(self.parser.validate_string('''
+        package a;
+        import b.*;
+        class A<T> { void f() { for (int i = 0; i < 10; i++) { g(i); } } }
+        '''))
+        self.assertIsNone(self.parser.validate_string(''))
+
+    def test_first_error(self):
+        error = self.parser.validate_string('class A {\n  void f() { int x = ; y = ; }\n}')
+        self.assertEqual((error.kind, error.line, error.column, error.token), (plyj.SYNTAX, 2, 22, ';'))
+        error = self.parser.validate_string('class A { # void f() { int x = ; } }')
+        self.assertEqual((error.kind, error.offset), (plyj.LEXICAL, 10))
+        error = self.parser.validate_string('class A { void f() {')
+        self.assertEqual((error.message, error.offset), ('unexpected end of input', 20))
+
+    def test_parser_still_builds_trees(self):
+        self.parser.validate_string('class A { void f() { int x = ; } }')
+        tree = self.parser.parse_string('class A { }')
+        self.assertIsInstance(tree.type_declarations[0], model.ClassDeclaration)
+        self.assertEqual(tree.type_declarations[0].end, 11)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import unittest
+
+import plyj.parser as plyj
+import plyj.model as model
+
+
+class RecordingVisitor(model.Visitor):
+
+    def __init__(self):
+        super(RecordingVisitor, self).__init__()
+        self.events = []
+
+    def visit_MethodDeclaration(self, method_decl):
+        self.events.append(('visit', method_decl.name))
+        return method_decl.name != 'skipped'
+
+    def leave_MethodDeclaration(self, method_decl):
+        self.events.append(('leave', method_decl.name))
+
+    def visit_MethodInvocation(self, invocation):
+        self.events.append(('visit', invocation.name))
+        return True
+
+
+class SubclassedVisitor(RecordingVisitor):
+
+    def visit_MethodInvocation(self, invocation):
+        self.events.append(('sub', invocation.name))
+        return True
+
+
+class VisitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = plyj.Parser()
+        self.tree = self.parser.parse_string('''
+        class Foo {
+            void foo() { bar(); }
+            void skipped() { baz(); }
+        }
+        ''')
+
+    def test_visit_and_leave_order(self):
+        v = RecordingVisitor()
+        self.tree.accept(v)
+        self.assertEqual(v.events, [('visit', 'foo'), ('visit', 'bar'), ('leave', 'foo'),
+                                    ('visit', 'skipped'), ('leave', 'skipped')])
+
+    def test_dispatch_per_visitor_class(self):
+        self.tree.accept(RecordingVisitor())
+        v = SubclassedVisitor()
+        self.tree.accept(v)
+        self.assertIn(('sub', 'bar'), v.events)
+        self.assertNotIn(('visit', 'bar'), v.events)
+
+    def test_instance_handlers(self):
+        v = RecordingVisitor()
+        self.tree.accept(v)
+        names = []
+        v.visit_MethodInvocation = lambda invocation: names.append(invocation.name) or True
+        self.tree.accept(v)
+        self.assertEqual(names, ['bar'])
+        self.tree.accept(model.MultiVisitor([v]))
+        self.assertEqual(names, ['bar', 'bar'])
+
+    def test_handlers_replaced_on_the_class(self):
+        class Counter(model.Visitor):
+            def visit_MethodInvocation(self, invocation):
+                return True
+        v = Counter()
+        self.tree.accept(v)
+        names = []
+        Counter.visit_MethodInvocation = lambda self, invocation: names.append(invocation.name) or True
+        self.tree.accept(v)
+        self.assertEqual(names, ['bar', 'baz'])
+
+    def test_duck_typed_visitor(self):
+        class Names(object):
+            def __init__(self):
+                self.names = []
+
+            def __getattr__(self, name):
+                if name.startswith('visit_'):
+                    return lambda element: self.names.append(name) or True
+                return lambda element: None
+
+        v = Names()
+        self.tree.accept(v)
+        self.assertEqual(v.names.count('visit_MethodInvocation'), 2)
+
+    def test_deep_expression(self):
+        # far deeper than the recursion limit
+        expr = self.parser.parse_expression(' + '.join(['"x"'] * 5000))
+
+        class Counter(model.Visitor):
+            literals = 0
+            leaves = 0
+
+            def visit_Literal(self, literal):
+                self.literals += 1
+                return True
+
+            def leave_Additive(self, additive):
+                self.leaves += 1
+
+        v = Counter()
+        expr.accept(v)
+        self.assertEqual(v.literals, 5000)
+        self.assertEqual(v.leaves, 4999)
+
+    def test_try_keeps_own_accept(self):
+        tree = self.parser.parse_statement('try { foo(); } catch (Exception e) { bar(); }')
+        v = RecordingVisitor()
+        tree.accept(v)
+        self.assertEqual(v.events, [('visit', 'foo')])
+
+    def test_walk(self):
+        methods = [n.name for n in self.tree.walk()
+                   if isinstance(n, (model.MethodDeclaration, model.MethodInvocation))]
+        self.assertEqual(methods, ['foo', 'bar', 'skipped', 'baz'])
+
+    def test_walk_parents(self):
+        pairs = list(self.tree.walk(parents=True))
+        self.assertEqual(pairs[0], (self.tree, None))
+        parents = dict((n.name, p) for n, p in pairs if isinstance(n, model.MethodDeclaration))
+        self.assertIs(parents['foo'], self.tree.type_declarations[0])
+
+    def test_find_all(self):
+        tree = self.parser.parse_string('''
+        class Foo {
+            void foo() {
+                bar(new Runnable() {
+                    public void run() { baz(); }
+                });
+            }
+        }
+        ''')
+        names = [n.name for n in tree.find_all(model.MethodInvocation)]
+        self.assertEqual(names, ['bar', 'baz'])
+        names = [n.name for n in tree.find_all(model.MethodInvocation, model.MethodDeclaration)]
+        self.assertEqual(names, ['foo', 'bar', 'run', 'baz'])
+
+        pruned = tree.find_all(model.MethodInvocation, prune=[model.InstanceCreation])
+        self.assertEqual([n.name for n in pruned], ['bar'])
+        self.assertRaises(TypeError, tree.find_all, model.Name, skip=[model.Name])
+
+    def test_multi_visitor(self):
+        tree = self.parser.parse_string('''
+        class Foo {
+            void foo() { bar(); }
+            void skipped() { baz(); try { qux(); } finally { quux(); } }
+        }
+        ''')
+
+        class Skipper(RecordingVisitor):
+            def visit_MethodDeclaration(self, method_decl):
+                self.events.append(('visit', method_decl.name))
+                return method_decl.name == 'skipped'
+
+        separate = [RecordingVisitor(), SubclassedVisitor(), Skipper(), model.Visitor()]
+        for v in separate:
+            tree.accept(v)
+        fused = [RecordingVisitor(), SubclassedVisitor(), Skipper(), model.Visitor()]
+        tree.accept(model.MultiVisitor(fused))
+        for v, w in zip(separate, fused[:3]):
+            self.assertEqual(v.events, w.events)
+        self.assertIn(('visit', 'qux'), fused[2].events)
+        self.assertNotIn(('visit', 'bar'), fused[2].events)
+
+    def test_unimplemented_handlers(self):
+        v = model.Visitor()
+        self.assertTrue(v.visit_Foo(None))
+        self.assertIsNone(v.leave_Foo(None))
+        self.assertRaises(AttributeError, getattr, v, 'foo')
+
+if __name__ == '__main__':
+    unittest.main()